@@ -1,58 +1,188 @@
+import functools
+import os
 import sys
+import threading
+import time
+
+from startup import BackgroundLoader, StartupClock
+
+# Marcos da inicialização (janela exibida, modelo pronto, primeira inferência),
+# medidos a partir daqui, antes dos imports pesados
+inicio = StartupClock()
+
 import cv2
-import mediapipe as mp
 import numpy as np
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 
-# --- Funções de Cálculo do MediaPipe ---
-
-
-# Inicializa o MediaPipe Pose
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-# Ajuste 'min_detection_confidence' se a detecção estiver falhando
-pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-def calcular_angulo(a, b, c):
-    """Calcula o ângulo entre três pontos (landmarks)"""
-    a = np.array(a)  # Primeiro ponto
-    b = np.array(b)  # Ponto do meio (vértice)
-    c = np.array(c)  # Terceiro ponto
-    
-    # Calcula os vetores
-    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - \
-              np.arctan2(a[1] - b[1], a[0] - b[0])
-    
-    # Converte para graus
-    angle = np.abs(radians * 180.0 / np.pi)
-    
-    # Garante que o ângulo esteja entre 0 e 180
-    if angle > 180.0:
-        angle = 360 - angle
-        
-    return angle
+from backends import backend_factory
+from capture import CameraCapture
+from counting import RepCounter
+from drawing import SkeletonRenderer, StatusBox
+from events import make_bus
+from metrics import Metrics, MetricsOverlay, MetricsServer
+from multiperson import MultiPersonCounter, draw_tracks
+from pipeline import BufferRing, FramePipeline, LatestFrame
+from pose_process import PoseProcess, build_scheduler
+from recording import LandmarkRecorder
+from timing import StageTimer
+from ui import load_ui
+
+FPS_ALVO = 30
+
+# Máximo de pessoas contadas ao mesmo tempo no modo "GRUPO"
+MAX_PESSOAS_GRUPO = 6
+
+# Com LANDMARKS_POSE_PROCESS=1 a inferência roda num processo separado, liberando o processo da interface
+PROCESSO_POSE = os.environ.get("LANDMARKS_POSE_PROCESS", "") == "1"
+
+# Modelo de pose (backends.py): mediapipe, ou onnx:caminho/modelo.onnx para rodar no ONNX Runtime
+BACKEND_POSE = os.environ.get("LANDMARKS_POSE_BACKEND", "mediapipe")
+
+# Com LANDMARKS_PROFILE=1 os marcos da inicialização são impressos quando atingidos,
+# e o relatório de tempo por estágio ao fechar
+PERFILAR = os.environ.get("LANDMARKS_PROFILE", "") == "1"
+if PERFILAR:
+    inicio.log = print
+
+# Pasta onde as gravações de landmarks (recording.py) são salvas quando "GRAVAR" está marcado
+PASTA_SESSOES = "sessions"
+
+# Eventos da sessão (events.py: início, fim, fases e repetições) vão para estes destinos,
+# separados por vírgula; LANDMARKS_EVENTS pode apontar para o backend (tcp://, ws://, ...)
+DESTINOS_EVENTOS = os.environ.get("LANDMARKS_EVENTS", os.path.join(PASTA_SESSOES, "events.jsonl"))
+
+# Resolução (largura, altura) usada na inferência, independente do tamanho da janela
+TAMANHO_INFERENCIA = (640, 480)
+
+# Modo pedido à câmera (o driver escolhe o mais próximo); MJPG permite 30 FPS em USB 2
+TAMANHO_CAMERA = (640, 480)
+FPS_CAMERA = 30
+FOURCC_CAMERA = "MJPG"
+
+# Desenho do esqueleto criado uma única vez (cores em RGB, pois desenhamos no frame RGB)
+ESQUELETO = SkeletonRenderer(landmark_color=(66, 117, 245), connection_color=(230, 66, 245))
+
+# Caixa de status: fundo e rótulos fixos são desenhados uma vez; por frame só a
+# contagem e o estado mudam
+CAIXA_STATUS = StatusBox(
+    (450, 70),
+    labels=[('REPETICOES', (15, 25), 0.7, 1), ('ESTADO', (200, 25), 0.7, 1)],
+    fields=[((20, 60), 1.2, 2), ((205, 60), 1.2, 2)],
+)
+
+# As métricas são servidas no formato do Prometheus em http://127.0.0.1:PORTA_METRICAS/metrics
+PORTA_METRICAS = 9108
+
+# Texto exibido para cada fase (armado, contado) de cada exercício do registro
+ROTULOS_ESTADO = {
+    "bicep_curl": ("RELAXADO", "CONTRAIDO"),
+    "squat": ("RELAXADO", "CONTRAIDO"),
+    "jumping_jack": ("BAIXO", "CIMA"),
+    "abdominal": ("DEITADO", "SUBIU"),
+}
+
+# Texto exibido no lugar do estado quando uma restrição de postura é violada
+ROTULOS_RESTRICAO = {
+    "back": "COSTAS!",
+    "elbow_in": "COTOVELO!",
+}
+
+# Criado por construir_pose() numa thread em segundo plano, depois que a janela aparece
+pose = None
+
+# Métricas do pipeline (contadores, histogramas por estágio, exceções por tipo)
+metricas = Metrics()
+metricas.gauge("inference_fps", lambda: pose.fps if pose else 0.0)
+metricas.gauge("model_complexity", lambda: pose.complexity if pose else -1)
+metricas.counter("pose_cache_hits", lambda: pose.cache_hits if pose else 0)
+metricas.counter("pose_cache_misses", lambda: pose.cache_misses if pose else 0)
+
+# Tempo gasto em cada estágio do frame (relatório impresso ao fechar se PERFILAR); cada amostra
+# também alimenta os histogramas das métricas
+cronometro = StageTimer(listener=metricas.observe)
+
+
+def construir_pose():
+    """Carrega o modelo de pose (MediaPipe, por padrão), cria o escalonador e aquece o modelo com um frame vazio."""
+    # Ajuste 'min_detection_confidence' se a detecção estiver falhando.
+    # O escalonador (pose_process.build_scheduler, o mesmo do main.py) troca a complexidade
+    # do modelo (ou pula frames) para manter o FPS alvo; começa na complexidade 1, o padrão
+    # do MediaPipe. Com a cena parada (descanso, antes do START) o MotionGate reaproveita o
+    # último resultado.
+    opcoes = dict(min_detection_confidence=0.5, min_tracking_confidence=0.5, target_fps=FPS_ALVO, mode=1,
+                  backend=BACKEND_POSE)
+    if PROCESSO_POSE:
+        # Frames e landmarks passam por memória compartilhada; só o processo filho importa o MediaPipe
+        return PoseProcess(TAMANHO_INFERENCIA, opcoes)
+    # O import do mediapipe leva cerca de um segundo, por isso o build_scheduler o faz só aqui
+    escalonador = build_scheduler(**opcoes)
+    # A primeira inferência inicializa o grafo; melhor pagar esse custo aqui
+    largura, altura = TAMANHO_INFERENCIA
+    escalonador.warm_up(np.zeros((altura, largura, 3), dtype=np.uint8))
+    return escalonador
+
+
+def construir_grupo(exercicio, ouvinte=None):
+    """Cria o contador de várias pessoas: um modelo de pose e um RepCounter por pessoa detectada."""
+    # Mesmo backend do modo individual (BACKEND_POSE); um backend sem estado é compartilhado
+    criar_pose = backend_factory(BACKEND_POSE, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    # Complexidade 0: o custo cresce com o número de pessoas na imagem
+    return MultiPersonCounter(
+        lambda: criar_pose(0),
+        exercicio, max_people=MAX_PESSOAS_GRUPO, landmark_filter="one_euro", listener=ouvinte
+    )
+
+
+def contar_frame_descartado():
+    """Frame da câmera substituído por um mais novo antes de chegar à inferência."""
+    metricas.incr("frames_captured")
+    metricas.incr("frames_dropped")
+
+
+def descrever_ritmo(ritmo):
+    """Médias de tempo por repetição e por fase e a amplitude do movimento (tempo.TempoTracker)."""
+    if not ritmo.rep_seconds.count:
+        return ""
+    return (f"repetição {ritmo.rep_seconds.mean:.1f} s (concêntrica {ritmo.concentric.mean:.1f} s, "
+            f"excêntrica {ritmo.eccentric.mean:.1f} s) | amplitude {ritmo.rom.mean:.0f}°")
+
 
 # --- Classe Principal da Aplicação ---
 
 class ContadorExercicioApp(QtWidgets.QMainWindow):
+    # Emitido pela thread de renderização com o frame RGB pronto e a contagem
+    frame_pronto = pyqtSignal()
+    # Emitidos pela thread que carrega o modelo
+    modelo_pronto = pyqtSignal(object)
+    modelo_falhou = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         # Carrega a interface do usuário (UI) a partir do arquivo
-        uic.loadUi("tela_exercicio.ui", self)
+        # (usa o módulo compilado por ui.py, se existir e estiver atualizado)
+        load_ui("tela_exercicio.ui", self)
         
         # Variáveis de estado
         self.cap = None
-        self.timer = None
+        self.pipeline = None
+        largura, altura = TAMANHO_INFERENCIA
+        self.frame_redimensionado = np.empty((altura, largura, 3), dtype=np.uint8)
+        self.buffers_rgb = BufferRing((altura, largura, 3))
         self.camera_ligada = False
         self.exercicio_iniciado = False
         
-        self.exercicio_selecionado = 0  # 1: Rosca, 2: Agachamento, 3: Polichinelo, 4: Abdominal
+        self.exercicio_selecionado = None  # Nome do exercício no registro (counting.EXERCISES)
         self.meta_repeticoes = 0
-        self.contador_repeticoes = 0
-        self.estado_exercicio = None  # "subindo", "descendo", "baixo", etc.
+        self.contador = None  # RepCounter do exercício em andamento
+        # O update() roda na thread de renderização; finish() e reset() na da GUI
+        self.trava_contador = threading.Lock()
+        self.grupo = None  # MultiPersonCounter do exercício em grupo (modo "GRUPO")
+        self.gravador = None  # LandmarkRecorder da sessão em andamento (opcional)
+        self.sessao = None  # Identificador da sessão em andamento, presente em todos os eventos
+        self.reps_cronometradas = 0  # Repetições com tempo já exibidas em label_ritmo
 
         # Conectar os botões às suas funções
         self.btn_start_camera.clicked.connect(self.alternar_camera)
@@ -63,19 +193,114 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
         self.btn_initial_position.setEnabled(False)
         self.btn_start_exercise.setEnabled(False)
 
+        # FPS alvo da inferência e modo atual do escalonador na barra de status
+        self.spin_fps_alvo = QtWidgets.QSpinBox()
+        self.spin_fps_alvo.setRange(5, 60)
+        self.spin_fps_alvo.setSuffix(" FPS alvo")
+        self.spin_fps_alvo.setValue(FPS_ALVO)
+        self.spin_fps_alvo.valueChanged.connect(self.definir_fps_alvo)
+        self.label_inferencia = QtWidgets.QLabel()
+        # Ritmo médio (tempo de cada repetição e de cada fase, amplitude) da sessão em andamento
+        self.label_ritmo = QtWidgets.QLabel()
+        self.statusbar.addPermanentWidget(self.label_ritmo)
+        self.statusbar.addPermanentWidget(self.label_inferencia)
+        self.statusbar.addPermanentWidget(self.spin_fps_alvo)
+
+        # Gravação opcional dos landmarks da sessão
+        self.check_gravar = QtWidgets.QCheckBox("GRAVAR")
+        self.check_gravar.setToolTip(f"Grava os landmarks em {PASTA_SESSOES}/ durante o exercício")
+        self.statusbar.addPermanentWidget(self.check_gravar)
+
+        # Modo em grupo: uma contagem separada para cada pessoa na câmera
+        self.check_grupo = QtWidgets.QCheckBox("GRUPO")
+        self.check_grupo.setToolTip(f"Conta as repetições de até {MAX_PESSOAS_GRUPO} pessoas ao mesmo tempo")
+        self.statusbar.addPermanentWidget(self.check_grupo)
+
+        # Painel opcional de métricas desenhado abaixo da caixa de status
+        self.mostrar_metricas = False
+        self.painel_metricas = MetricsOverlay(metricas, cronometro, origin=(10, 95))
+        self.check_metricas = QtWidgets.QCheckBox("MÉTRICAS")
+        self.check_metricas.setToolTip("Mostra as métricas do pipeline sobre o vídeo")
+        self.check_metricas.toggled.connect(self.definir_mostrar_metricas)
+        self.statusbar.addPermanentWidget(self.check_metricas)
+        metricas.gauge("camera_fps", lambda: self.cap.fps if self.cap else 0.0)
+
+        # O que não pôde ser ativado é avisado quando a janela aparecer; o app funciona sem isso
+        desativados = []
+
+        # Endpoint local de métricas (desativado se a porta estiver ocupada)
+        try:
+            self.servidor_metricas = MetricsServer(metricas, PORTA_METRICAS).start()
+        except OSError as e:
+            self.servidor_metricas = None
+            desativados.append(f"Endpoint de métricas desativado: {e}")
+
+        # Barramento de eventos: a emissão só enfileira; uma thread grava em lotes
+        try:
+            self.eventos = make_bus(DESTINOS_EVENTOS, {"app": "ContadorExercicioApp"},
+                                    on_error=metricas.record_exception)
+        except (OSError, ValueError) as e:
+            self.eventos = None
+            desativados.append(f"Eventos da sessão desativados: {e}")
+        if desativados:
+            QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Aviso", "\n".join(desativados)))
+
+        # Frames chegam das threads do pipeline via sinal (executado na thread da GUI); só um
+        # frame fica à espera da GUI, os mais novos o substituem
+        self.ultimo_frame = LatestFrame(self.frame_pronto.emit, on_drop=lambda: metricas.incr("frames_dropped"))
+        self.frame_pronto.connect(self.ao_receber_frame)
+
+        # O botão da câmera espera o modelo, que carrega em segundo plano
+        self.btn_start_camera.setEnabled(False)
+        self.statusbar.showMessage("Carregando o modelo de pose...")
+        self.modelo_pronto.connect(self.ao_carregar_modelo)
+        self.modelo_falhou.connect(self.ao_falhar_modelo)
+        BackgroundLoader(construir_pose, self.modelo_pronto.emit,
+                         lambda e: self.modelo_falhou.emit(str(e))).start()
+
+    def ao_carregar_modelo(self, escalonador):
+        """Recebe o modelo pronto e libera o botão da câmera."""
+        global pose
+        pose = escalonador
+        pose.target_fps = self.spin_fps_alvo.value()
+        if isinstance(pose, PoseProcess):
+            # O frame RGB é escrito direto nos slots compartilhados com o processo de inferência
+            self.buffers_rgb = pose.buffers
+        inicio.mark("modelo pronto")
+        self.statusbar.showMessage("Modelo de pose pronto", 3000)
+        self.btn_start_camera.setEnabled(True)
+
+    def ao_falhar_modelo(self, mensagem):
+        """Mostra o erro de carregamento; a câmera continua desabilitada."""
+        self.statusbar.clearMessage()
+        QMessageBox.critical(self, "Erro Modelo", f"Não foi possível carregar o modelo de pose: {mensagem}")
+
     def alternar_camera(self):
         """Liga ou desliga a câmera."""
         if not self.camera_ligada:
-            # Tenta ligar a câmera
-            self.cap = cv2.VideoCapture(0)
+            # Tenta ligar a câmera; a captura roda na própria thread e guarda só o frame mais novo
+            self.cap = CameraCapture(0, TAMANHO_CAMERA, FPS_CAMERA, FOURCC_CAMERA,
+                                     on_drop=contar_frame_descartado)
             if not self.cap.isOpened():
+                self.cap.release()
+                self.cap = None
                 QMessageBox.critical(self, "Erro Câmera", "Não foi possível abrir a câmera.")
                 return
+            self.cap.start()
+            config = self.cap.settings
+            self.statusbar.showMessage(
+                f"Câmera {config['width']}x{config['height']} {config['fps']:.0f} FPS {config['fourcc']}")
             
-            # Inicia o QTimer para atualizar os frames
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.atualizar_frame)
-            self.timer.start(30)  # Aprox. 33 FPS
+            # Inicia o pipeline (inferência e renderização em threads separadas; a inferência
+            # lê diretamente o frame mais novo da câmera)
+            self.pipeline = FramePipeline(
+                self.ler_frame, self.inferir_frame, self.renderizar_frame,
+                self.ultimo_frame.put,
+                on_drop=lambda: metricas.incr("frames_dropped"),
+                on_error=metricas.record_exception,
+                threaded_capture=False
+            )
+            self.pipeline.start()
 
             self.btn_start_camera.setText("DESLIGAR CÂMERA")
             self.btn_start_camera.setStyleSheet("background-color: rgb(200, 50, 50); color: white;")
@@ -86,10 +311,12 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
             self.btn_start_exercise.setEnabled(True)
         else:
             # Desligar a câmera
-            if self.timer:
-                self.timer.stop()
+            if self.pipeline:
+                self.pipeline.stop()
+                self.pipeline = None
             if self.cap:
                 self.cap.release()
+                self.cap = None
             
             self.camera_feed.clear()
             self.camera_feed.setText("CÂMERA DESLIGADA")
@@ -111,13 +338,11 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
             QMessageBox.warning(self, "Aviso", "Ligue a câmera primeiro.")
             return
 
-        self.contador_repeticoes = 0
-        
-        # Define um estado inicial padrão (ex: braço/perna esticados)
-        if self.exercicio_selecionado == 4: # Abdominal começa "deitado"
-            self.estado_exercicio = "baixo"
-        else: # Outros começam "em pé"
-            self.estado_exercicio = "descendo" # Estado "baixo" ou "esticado"
+        # Zera a contagem e volta o estado para a fase inicial do exercício; sob a trava,
+        # para não cair no meio de um update() da thread de renderização
+        with self.trava_contador:
+            if self.contador:
+                self.contador.reset()
         
         QMessageBox.information(self, "Posição Definida", 
                                 "Posição inicial definida! O contador foi zerado. "
@@ -134,24 +359,38 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
             
             # 1. Identificar o exercício selecionado
             if self.radio_ex1.isChecked():
-                self.exercicio_selecionado = 1  # Rosca Direta
+                self.exercicio_selecionado = "bicep_curl"  # Rosca Direta
             elif self.radio_ex2.isChecked():
-                self.exercicio_selecionado = 2  # Agachamento
+                self.exercicio_selecionado = "squat"  # Agachamento
             elif self.radio_ex3.isChecked():
-                self.exercicio_selecionado = 3  # Polichinelo
+                self.exercicio_selecionado = "jumping_jack"  # Polichinelo
             elif self.radio_ex4.isChecked():
-                self.exercicio_selecionado = 4  # Abdominal
+                self.exercicio_selecionado = "abdominal"  # Abdominal
 
             # 2. Ler meta de repetições
             self.meta_repeticoes = self.spin_repetitions.value()
             
-            # 3. Resetar contador e estado
-            self.contador_repeticoes = 0
-            # Define o estado inicial correto para cada exercício
-            if self.exercicio_selecionado == 4: # Abdominal começa "deitado"
-                self.estado_exercicio = "baixo"
-            else: # Outros começam "em pé"
-                self.estado_exercicio = "descendo" # Estado "baixo" ou "esticado"
+            # 3. Criar o contador (índices dos landmarks resolvidos uma única vez aqui);
+            #    o filtro One Euro suaviza o tremor dos landmarks antes do ângulo
+            #    No modo em grupo cada pessoa tem o seu contador; a gravação guarda uma
+            #    pessoa só, então não é usada nesse modo
+            #    Fases e repetições viram eventos da sessão (se houver destinos configurados)
+            if self.exercicio_selecionado is not None:
+                self.sessao = f"{self.exercicio_selecionado}-{time.strftime('%Y%m%d-%H%M%S')}"
+                ouvinte = functools.partial(self.eventos.emit, session=self.sessao) if self.eventos else None
+                if self.check_grupo.isChecked():
+                    self.contador = None
+                    self.grupo = construir_grupo(self.exercicio_selecionado, ouvinte)
+                else:
+                    self.contador = RepCounter(self.exercicio_selecionado, landmark_filter="one_euro",
+                                               listener=ouvinte)
+                    if self.check_gravar.isChecked():
+                        self.iniciar_gravacao()
+                if ouvinte:
+                    ouvinte("session_start", exercise=self.exercicio_selecionado, target=self.meta_repeticoes,
+                            group=self.grupo is not None)
+                self.label_ritmo.clear()
+                self.reps_cronometradas = 0
             
             # 4. Atualizar estado e UI
             self.exercicio_iniciado = True
@@ -162,6 +401,7 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
             self.group_exercicios.setEnabled(False)
             self.group_repeticoes.setEnabled(False)
             self.btn_initial_position.setEnabled(False)
+            self.check_grupo.setEnabled(False)
             
         else:
             # --- Parar Exercício ---
@@ -174,172 +414,202 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
             self.group_exercicios.setEnabled(True)
             self.group_repeticoes.setEnabled(True)
             self.btn_initial_position.setEnabled(True)
+            self.check_grupo.setEnabled(True)
+            self.parar_gravacao()
+            resumo = self.parar_grupo()
+            # exercicio_iniciado já é False: nenhum update() acontece depois deste, sob a trava
+            with self.trava_contador:
+                if self.contador:
+                    self.contador.finish()  # cronometra a última repetição
+            if self.eventos and self.sessao:
+                reps = self.contador.reps if self.contador else max((p["reps"] for p in resumo), default=0)
+                self.eventos.emit("session_stop", session=self.sessao, exercise=self.exercicio_selecionado,
+                                  reps=reps, faults=self.contador.faults if self.contador else None, people=resumo,
+                                  tempo=self.contador.tempo.summary() if self.contador else None)
+            self.sessao = None
 
-            QMessageBox.information(self, "Exercício Finalizado", 
-                                    f"Parabéns! Você completou {self.contador_repeticoes} repetições.")
+            if resumo:
+                linhas = "\n".join(f"Pessoa {p['id']}: {p['reps']} repetições" for p in resumo)
+                QMessageBox.information(self, "Exercício Finalizado", f"Parabéns!\n{linhas}")
+            else:
+                reps = self.contador.reps if self.contador else 0
+                falhas = self.contador.faults if self.contador else 0
+                aviso = f"\n{falhas} com a postura incorreta." if falhas else ""
+                ritmo = descrever_ritmo(self.contador.tempo) if self.contador else ""
+                if ritmo:
+                    aviso += f"\nMédia: {ritmo}"
+                QMessageBox.information(self, "Exercício Finalizado",
+                                        f"Parabéns! Você completou {reps} repetições.{aviso}")
 
-    def atualizar_frame(self):
-        """Função principal chamada pelo Timer. Lê, processa e exibe o frame."""
-        ret, frame = self.cap.read()
-        if not ret:
-            return
-            
-        # Redimensiona o frame para o tamanho do QLabel (camera_feed)
-        frame = cv2.resize(frame, (self.camera_feed.width(), self.camera_feed.height()))
+    def iniciar_gravacao(self):
+        """Abre um arquivo de gravação de landmarks para a sessão."""
+        os.makedirs(PASTA_SESSOES, exist_ok=True)
+        nome = f"{self.sessao}.lmk"
+        self.gravador = LandmarkRecorder(os.path.join(PASTA_SESSOES, nome))
+
+    def parar_gravacao(self):
+        """Fecha a gravação em andamento (gera o arquivo colunar)."""
+        gravador, self.gravador = self.gravador, None
+        if gravador:
+            gravador.close()
+            self.statusbar.showMessage(f"{gravador.frames} frames gravados em {gravador.path}")
+
+    def parar_grupo(self):
+        """Encerra o modo em grupo e devolve a contagem de cada pessoa."""
+        grupo, self.grupo = self.grupo, None
+        if not grupo:
+            return []
+        grupo.finish()  # cronometra a última repetição de cada pessoa
+        resumo = grupo.summary()
+        grupo.close()
+        return resumo
+
+    def ler_frame(self):
+        """Estágio de captura: pega o frame mais novo da câmera (None encerra o pipeline)."""
+        # Só espera se o frame mais novo já foi processado
+        with cronometro.measure("capture"):
+            frame = self.cap.read()
+        if frame is not None:
+            metricas.incr("frames_captured")
+        return frame
+
+    def inferir_frame(self, frame):
+        """Estágio de inferência: prepara o frame e executa o MediaPipe."""
+        # Instante da captura, usado pelo contador e pela gravação
+        instante = self.cap.timestamp
+
+        # Redimensiona o frame para a resolução fixa de inferência
+        with cronometro.measure("resize"):
+            frame = cv2.resize(frame, TAMANHO_INFERENCIA, dst=self.frame_redimensionado)
         
-        # Inverte a imagem horizontalmente (efeito espelho)
-        frame = cv2.flip(frame, 1)
+        # Única conversão de cor: este buffer RGB também é desenhado e exibido
+        with cronometro.measure("color"):
+            imagem_rgb = self.buffers_rgb.next()
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=imagem_rgb)
+            # Inverte a imagem horizontalmente (efeito espelho)
+            cv2.flip(imagem_rgb, 1, dst=imagem_rgb)
         
-        # Processamento MediaPipe
-        imagem_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        imagem_rgb.flags.writeable = False
-        resultado = pose.process(imagem_rgb)
-        imagem_rgb.flags.writeable = True
-        frame_processado = cv2.cvtColor(imagem_rgb, cv2.COLOR_RGB2BGR)
+        # Processamento MediaPipe (no modo em grupo o resultado é a lista de pessoas,
+        # já contadas pelo MultiPersonCounter)
+        grupo = self.grupo
+        with cronometro.measure("inference"):
+            imagem_rgb.flags.writeable = False
+            if self.exercicio_iniciado and grupo:
+                resultado = grupo.process(imagem_rgb, instante)
+            else:
+                resultado = pose.process(imagem_rgb)
+            imagem_rgb.flags.writeable = True
+        inicio.mark("primeira inferência")
+        return imagem_rgb, resultado, instante
+
+    def renderizar_frame(self, item):
+        """Estágio de renderização: conta as repetições e desenha o frame."""
+        imagem_rgb, resultado, instante = item
+        if isinstance(resultado, list):
+            return self.renderizar_grupo(imagem_rgb, resultado)
+        frame_processado = imagem_rgb
 
         # Lógica de contagem (apenas se o exercício estiver ativo)
-        try:
-            if self.exercicio_iniciado and resultado.pose_landmarks:
-                landmarks = resultado.pose_landmarks.landmark
-                
-                # --- LÓGICA EXERCÍCIO 1: ROSCA DIRETA (Braço Direito) ---
-                if self.exercicio_selecionado == 1:
-                    # Obter coordenadas (Ombro, Cotovelo, Pulso)
-                    ombro = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    cotovelo = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-                    pulso = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                    
-                    # Calcular ângulo do cotovelo
-                    angulo = calcular_angulo(ombro, cotovelo, pulso)
-                    
-                    # Lógica de Contagem
-                    if angulo > 160 and self.estado_exercicio == "subindo":
-                        self.estado_exercicio = "descendo"
-                    if angulo < 40 and self.estado_exercicio == "descendo":
-                        self.estado_exercicio = "subindo"
-                        self.contador_repeticoes += 1
-                
-                # --- LÓGICA EXERCÍCIO 2: AGACHAMENTO (Perna Direita) ---
-                elif self.exercicio_selecionado == 2:
-                    # Obter coordenadas (Quadril, Joelho, Tornozelo)
-                    quadril = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                               landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    joelho = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                              landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-                    tornozelo = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                                 landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-                    # Calcular ângulo do joelho
-                    angulo = calcular_angulo(quadril, joelho, tornozelo)
-
-                    # Lógica de Contagem
-                    if angulo > 170 and self.estado_exercicio == "subindo":
-                        self.estado_exercicio = "descendo"
-                    if angulo < 90 and self.estado_exercicio == "descendo":
-                        self.estado_exercicio = "subindo"
-                        self.contador_repeticoes += 1
-                        
-                # --- LÓGICA EXERCÍCIO 3: POLICHINELO (Braço Direito) ---
-                elif self.exercicio_selecionado == 3:
-                    # Obter coordenadas (Quadril, Ombro, Pulso)
-                    # Mede o ângulo do braço em relação ao tronco
-                    quadril = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                               landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    ombro = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    pulso = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                    
-                    # Calcular ângulo do braço
-                    angulo = calcular_angulo(quadril, ombro, pulso)
-                    
-                    # Lógica de Contagem (estado "descendo" = braços para baixo)
-                    if angulo < 40 and self.estado_exercicio == "subindo":
-                        self.estado_exercicio = "descendo" # Braços voltaram para baixo
-                    if angulo > 140 and self.estado_exercicio == "descendo":
-                        self.estado_exercicio = "subindo" # Braços levantaram
-                        self.contador_repeticoes += 1
-                        
-                # --- LÓGICA EXERCÍCIO 4: ABDOMINAL (Lado Direito) ---
-                elif self.exercicio_selecionado == 4:
-                    # Obter coordenadas (Ombro, Quadril, Joelho)
-                    # Mede o ângulo do tronco em relação à coxa
-                    ombro = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    quadril = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                               landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    joelho = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                              landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-
-                    # Calcular ângulo do quadril (flexão do tronco)
-                    angulo = calcular_angulo(ombro, quadril, joelho)
-
-                    # Lógica de Contagem (estado "baixo" = deitado)
-                    if angulo > 150 and self.estado_exercicio == "subindo":
-                        self.estado_exercicio = "baixo" # Deitou
-                    if angulo < 90 and self.estado_exercicio == "baixo":
-                        self.estado_exercicio = "subindo" # Subiu (contrai o abdômen)
-                        self.contador_repeticoes += 1
-
-        except Exception as e:
-            # print(f"Erro ao processar landmarks: {e}") # Descomente para depurar
-            pass # Continua mesmo se o corpo sair da tela
+        contador = self.contador
+        gravador = self.gravador
+        metricas.incr("frames_processed")
+        if resultado.pose_landmarks:
+            metricas.incr("detections")
+        with cronometro.measure("count"):
+            try:
+                # Verificado sob a trava: depois do finish() ou do reset() na GUI, não há mais update()
+                with self.trava_contador:
+                    if self.exercicio_iniciado and contador and resultado.pose_landmarks:
+                        contador.update(resultado.pose_landmarks.landmark, instante)
+                # Grava também os frames sem detecção (NaN) para manter a linha do tempo
+                if self.exercicio_iniciado and gravador:
+                    gravador.write(resultado.pose_landmarks.landmark if resultado.pose_landmarks else None, instante)
+
+            except Exception as e:
+                # Continua mesmo se o corpo sair da tela, mas conta a falha por tipo
+                metricas.record_exception(e)
 
         # Desenhar os landmarks na imagem
-        if resultado.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                frame_processado, 
-                resultado.pose_landmarks, 
-                mp_pose.POSE_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2), 
-                mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-            )
+        with cronometro.measure("draw"):
+            if resultado.pose_landmarks:
+                ESQUELETO.draw(frame_processado, resultado.pose_landmarks.landmark)
 
         # Exibir contagem e estado na tela
+        if self.exercicio_iniciado and contador:
+            # Nome da fase atual (armado ou contado) para o exercício; um aviso de
+            # postura tem prioridade sobre o estado
+            estado_display = ROTULOS_ESTADO[contador.exercise.name][contador.counted]
+            if contador.violations:
+                estado_display = ROTULOS_RESTRICAO.get(contador.violations[0], estado_display)
+
+            # Caixa de status com REPETIÇÕES e ESTADO
+            with cronometro.measure("overlay"):
+                CAIXA_STATUS.draw(frame_processado, str(contador.reps), estado_display)
+
+        if self.mostrar_metricas:
+            self.painel_metricas.draw(frame_processado)
+
+        # A GUI só recebe o frame RGB pronto
+        reps = contador.reps if contador else 0
+        return frame_processado, reps
+
+    def renderizar_grupo(self, imagem_rgb, pessoas):
+        """Renderização do modo em grupo: esqueleto e contagem de cada pessoa."""
+        metricas.incr("frames_processed")
+        if any(p.landmarks is not None for p in pessoas):
+            metricas.incr("detections")
+        with cronometro.measure("draw"):
+            draw_tracks(imagem_rgb, pessoas, ESQUELETO)
+
+        # A caixa de status mostra quem está na frente e quantas pessoas estão na câmera;
+        # a meta é atingida quando a primeira pessoa chega lá
+        reps = max((p.counter.reps for p in pessoas), default=0)
         if self.exercicio_iniciado:
-            # Caixa de status (Fundo preto semi-transparente)
-            cv2.rectangle(frame_processado, (0, 0), (450, 70), (20, 20, 20), -1)
-            
-            # Texto REPETIÇÕES
-            cv2.putText(frame_processado, 'REPETICOES', (15, 25), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.putText(frame_processado, str(self.contador_repeticoes), (20, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2, cv2.LINE_AA)
-            
-            # Texto ESTADO
-            cv2.putText(frame_processado, 'ESTADO', (200, 25), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1, cv2.LINE_AA)
-            
-            # Ajusta o nome do estado para Polichinelo/Abdominal
-            estado_display = self.estado_exercicio
-            if self.exercicio_selecionado == 3: # Polichinelo
-                estado_display = "CIMA" if self.estado_exercicio == "subindo" else "BAIXO"
-            elif self.exercicio_selecionado == 4: # Abdominal
-                estado_display = "SUBIU" if self.estado_exercicio == "subindo" else "DEITADO"
-            elif self.exercicio_selecionado == 1 or self.exercicio_selecionado == 2:
-                estado_display = "CONTRAIDO" if self.estado_exercicio == "subindo" else "RELAXADO"
-
-            cv2.putText(frame_processado, estado_display.upper(), (205, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2, cv2.LINE_AA)
-            
-            # Checar se atingiu a meta
-            if self.contador_repeticoes >= self.meta_repeticoes:
-                self.alternar_exercicio() # Para o exercício automaticamente
+            with cronometro.measure("overlay"):
+                CAIXA_STATUS.draw(imagem_rgb, str(reps), f"{len(pessoas)} PESSOAS")
+
+        if self.mostrar_metricas:
+            self.painel_metricas.draw(imagem_rgb)
+        return imagem_rgb, reps
+
+    def ao_receber_frame(self):
+        """Executado na thread da GUI: exibe o frame mais novo e verifica a meta."""
+        item = self.ultimo_frame.take()
+        if item is None or not self.camera_ligada:
+            return
+        rgb, contador = item
+
+        # O ritmo só muda uma vez por repetição, quando o contador se rearma
+        if self.exercicio_iniciado and self.contador:
+            ritmo = self.contador.tempo
+            if ritmo.rep_seconds.count != self.reps_cronometradas:
+                self.reps_cronometradas = ritmo.rep_seconds.count
+                self.label_ritmo.setText(descrever_ritmo(ritmo))
+
+        # Checar se atingiu a meta
+        if self.exercicio_iniciado and contador >= self.meta_repeticoes:
+            self.alternar_exercicio() # Para o exercício automaticamente
 
         # Exibir o frame processado na interface
-        self.exibir_frame_na_tela(frame_processado)
+        self.label_inferencia.setText(f"{pose.describe()} | {pose.fps:.0f} FPS | câmera {self.cap.fps:.0f} FPS")
+        with cronometro.measure("display"):
+            self.exibir_frame_na_tela(rgb)
+
+    def definir_fps_alvo(self, valor):
+        """Atualiza o FPS que o escalonador de inferência tenta manter."""
+        if pose:
+            pose.target_fps = valor
+
+    def definir_mostrar_metricas(self, marcado):
+        """Liga ou desliga o painel de métricas sobre o vídeo."""
+        self.mostrar_metricas = marcado
 
-    def exibir_frame_na_tela(self, frame):
-        """Converte o frame (BGR) do OpenCV para QPixmap e exibe no QLabel 'camera_feed'."""
-        # Converte o frame BGR para RGB
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def exibir_frame_na_tela(self, rgb):
+        """Converte o frame RGB para QPixmap e exibe no QLabel 'camera_feed'."""
         h, w, ch = rgb.shape
         # Calcula os bytes por linha
         bytes_per_line = ch * w
-        # Cria a QImage
+        # Cria a QImage sobre o próprio buffer (sem cópia); o QLabel escala ao pintar
         img = QImage(rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
         # Exibe a QImage no QLabel
         self.camera_feed.setPixmap(QPixmap.fromImage(img))
@@ -347,14 +617,24 @@ class ContadorExercicioApp(QtWidgets.QMainWindow):
     def closeEvent(self, event):
         """Função chamada quando a janela é fechada."""
         # Garantir que a câmera seja liberada ao fechar
-        if self.timer:
-            self.timer.stop()
+        if self.pipeline:
+            self.pipeline.stop()
         if self.cap:
             self.cap.release()
+        self.parar_gravacao()
+        self.parar_grupo()
+        if self.servidor_metricas:
+            self.servidor_metricas.stop()
+        if self.eventos:
+            self.eventos.close()
         
         print("Câmera liberada. Encerrando aplicação.")
-        # Libera o objeto 'pose' do MediaPipe
-        pose.close() 
+        # Libera o objeto 'pose' do MediaPipe (se já tiver carregado)
+        if pose:
+            pose.close()
+        # Relatório de tempo por estágio, só quando pedido
+        if PERFILAR:
+            print(cronometro.report())
         event.accept()
 
 # --- Execução da Aplicação ---
@@ -362,4 +642,6 @@ if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     janela = ContadorExercicioApp()
     janela.show()
+    # Executa na primeira volta do loop de eventos, com a janela já exibida
+    QTimer.singleShot(0, lambda: inicio.mark("janela exibida"))
     sys.exit(app.exec_())
\ No newline at end of file
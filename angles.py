@@ -0,0 +1,106 @@
+"""Vectorized joint-angle kernel over the 33 pose landmarks."""
+import numpy as np
+
+from landmarks import INDEX, NUM_LANDMARKS, fill_array
+
+# name: (first point, vertex, last point)
+JOINTS = {
+    "left_elbow": ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST"),
+    "right_elbow": ("RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST"),
+    "left_shoulder": ("LEFT_HIP", "LEFT_SHOULDER", "LEFT_ELBOW"),
+    "right_shoulder": ("RIGHT_HIP", "RIGHT_SHOULDER", "RIGHT_ELBOW"),
+    "left_arm": ("LEFT_HIP", "LEFT_SHOULDER", "LEFT_WRIST"),
+    "right_arm": ("RIGHT_HIP", "RIGHT_SHOULDER", "RIGHT_WRIST"),
+    "left_hip": ("LEFT_SHOULDER", "LEFT_HIP", "LEFT_KNEE"),
+    "right_hip": ("RIGHT_SHOULDER", "RIGHT_HIP", "RIGHT_KNEE"),
+    "left_knee": ("LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE"),
+    "right_knee": ("RIGHT_HIP", "RIGHT_KNEE", "RIGHT_ANKLE"),
+}
+
+
+def triplet_indices(triplets):
+    """Resolves (a, b, c) landmark names to three index arrays."""
+    idx = np.array([[INDEX[name] for name in triplet] for triplet in triplets], dtype=np.intp)
+    return idx[:, 0].copy(), idx[:, 1].copy(), idx[:, 2].copy()
+
+
+def _angles_from_vectors(u, v, use_z):
+    # |u x v| and u . v give the unsigned angle in [0, 180] directly, which is
+    # what the scalar arctan2 difference folded at 180 degrees computes.
+    if use_z:
+        cross = np.linalg.norm(np.cross(u[..., :3], v[..., :3]), axis=-1)
+        dot = np.einsum("...i,...i->...", u[..., :3], v[..., :3])
+    else:
+        cross = np.abs(u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0])
+        dot = u[..., 0] * v[..., 0] + u[..., 1] * v[..., 1]
+    return np.degrees(np.arctan2(cross, dot))
+
+
+def batch_angles(points, joints=JOINTS, use_z=False):
+    """Angles in degrees for points shaped (..., 33, >=2); returns (..., len(joints))."""
+    points = np.asarray(points, dtype=np.float32)
+    a, b, c = triplet_indices(joints.values())
+    vertex = points[..., b, :]
+    return _angles_from_vectors(points[..., a, :] - vertex, points[..., c, :] - vertex, use_z)
+
+
+class AngleEngine:
+    """Computes a table of joint angles per frame from one preallocated landmark buffer."""
+
+    def __init__(self, joints=JOINTS, use_z=False):
+        self.names = tuple(joints)
+        self.use_z = use_z
+        self._a, self._b, self._c = triplet_indices(joints.values())
+        self._column = {name: i for i, name in enumerate(self.names)}
+
+        n = len(self.names)
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self.angles = np.zeros(n, dtype=np.float32)
+        self._u = np.empty((n, 3), dtype=np.float32)
+        self._v = np.empty((n, 3), dtype=np.float32)
+        self._vertex = np.empty((n, 3), dtype=np.float32)
+        self._cross = np.empty((n, 3), dtype=np.float32)
+        self._s0 = np.empty(n, dtype=np.float32)
+        self._s1 = np.empty(n, dtype=np.float32)
+        self._t = np.empty(n, dtype=np.float32)
+
+    def update(self, landmarks):
+        """Copies a MediaPipe landmark list into the buffer and recomputes every angle."""
+        fill_array(landmarks, self.points)
+        return self.compute()
+
+    def compute(self):
+        u, v, s0, s1 = self._u, self._v, self._s0, self._s1
+        np.take(self.points, self._b, axis=0, out=self._vertex)
+        np.take(self.points, self._a, axis=0, out=u)
+        np.take(self.points, self._c, axis=0, out=v)
+        u -= self._vertex
+        v -= self._vertex
+
+        if self.use_z:
+            cross, t = self._cross, self._t
+            for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+                np.multiply(u[:, j], v[:, k], out=cross[:, i])
+                np.multiply(u[:, k], v[:, j], out=t)
+                cross[:, i] -= t
+            np.einsum("ij,ij->i", cross, cross, out=s0)
+            np.sqrt(s0, out=s0)
+            np.einsum("ij,ij->i", u, v, out=s1)
+        else:
+            np.multiply(u[:, 0], v[:, 1], out=s0)
+            np.multiply(u[:, 1], v[:, 0], out=s1)
+            s0 -= s1
+            np.abs(s0, out=s0)
+            np.multiply(u[:, 0], v[:, 0], out=s1)
+            np.multiply(u[:, 1], v[:, 1], out=self._t)
+            s1 += self._t
+
+        np.arctan2(s0, s1, out=self.angles)
+        np.degrees(self.angles, out=self.angles)
+        return self.angles
+
+    def angle(self, name):
+        return float(self.angles[self._column[name]])
+
+    def column(self, name):
+        return self._column[name]
@@ -0,0 +1,239 @@
+"""Pluggable pose backends: MediaPipe Pose or a pose landmark model run by ONNX Runtime.
+
+Every backend has the interface the apps already call on MediaPipe's Pose:
+process(image_rgb) returns a result whose pose_landmarks.landmark holds the
+33 landmarks in the MediaPipe layout (normalized x, y, z and visibility;
+see landmarks.py), or pose_landmarks None without a detection. On top of
+that, process_batch(images) returns one result per frame: MediaPipe runs
+them one by one, while ONNX Runtime stacks them into one inference call so
+batch and offline paths amortize its cost across frames and stations.
+
+Backends are built from a spec string, "mediapipe" or "onnx:MODEL.onnx".
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, PoseResult, to_landmarks
+
+
+class PoseBackend:
+    """Base class; subclasses override process() or process_batch(), each defaults to the other.
+
+    A stateless backend keeps nothing between frames, so one instance can
+    serve several streams; a stateful one (MediaPipe tracks the person from
+    frame to frame) needs its own instance per stream. batch_size is the
+    largest batch a single inference call takes.
+    """
+    stateless = False
+    batch_size = 1
+
+    def process(self, image_rgb):
+        return self.process_batch([image_rgb])[0]
+
+    def process_batch(self, images):
+        return [self.process(image) for image in images]
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MediaPipeBackend(PoseBackend):
+    """MediaPipe Pose; detection and tracking across frames, no batching or thread control."""
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 smooth_landmarks=True):
+        import mediapipe as mp
+
+        self._pose = mp.solutions.pose.Pose(
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            model_complexity=model_complexity,
+            smooth_landmarks=smooth_landmarks
+        )
+
+    def process(self, image_rgb):
+        return self._pose.process(image_rgb)
+
+    def reset(self):
+        self._pose.reset()
+
+    def close(self):
+        self._pose.close()
+
+
+class OnnxBackend(PoseBackend):
+    """A BlazePose-style landmark model on the CPU with ONNX Runtime.
+
+    The model takes float RGB frames, NHWC or NCHW (read from its input
+    shape), scaled to value_range; its first output holds 5 values per
+    landmark (x, y, z in input pixels, visibility and presence logits) for
+    at least 33 landmarks, and an optional second output the pose presence
+    score, compared with min_detection_confidence. MediaPipe's
+    pose_landmark_*.tflite models converted to ONNX have this layout. Frames
+    of any size are letterboxed into the input; there is no person detector
+    or tracking, so wrap it in roi.RoiTracker to crop around the person.
+
+    intra_op_threads and inter_op_threads set the ONNX Runtime thread pools
+    (0 leaves its default: one intra-op thread per physical core). A model
+    with a dynamic batch dimension runs up to batch_size frames per call,
+    one with a fixed batch runs that many.
+    """
+    stateless = True
+
+    def __init__(self, model_path, min_detection_confidence=0.5, intra_op_threads=0, inter_op_threads=0,
+                 batch_size=8, value_range=(0.0, 1.0), providers=("CPUExecutionProvider",)):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        # Independent branches only run on the inter-op pool in parallel mode
+        options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                                  else ort.ExecutionMode.ORT_SEQUENTIAL)
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, options, providers=list(providers))
+        self.min_detection_confidence = min_detection_confidence
+
+        model_input = self._session.get_inputs()[0]
+        shape = model_input.shape
+        if len(shape) != 4 or not all(isinstance(d, int) for d in shape[1:]):
+            raise ValueError(f"{model_path}: expected a (batch, height, width, 3) or (batch, 3, height, width) "
+                             f"input with a fixed frame size, got {shape}")
+        self._input = model_input.name
+        self.channels_first = shape[1] == 3
+        height, width = shape[2:] if self.channels_first else shape[1:3]
+        self.input_size = (width, height)
+        self._fixed_batch = isinstance(shape[0], int) and shape[0] > 0
+        self.batch_size = shape[0] if self._fixed_batch else batch_size
+        self._outputs = [output.name for output in self._session.get_outputs()[:2]]
+
+        low, high = value_range
+        self._scale = (high - low) / 255.0
+        self._offset = low
+        self._local = threading.local()
+
+    def process_batch(self, images):
+        buffers = self._buffers()
+        results = []
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start:start + self.batch_size]
+            for i, image_rgb in enumerate(chunk):
+                self._fill(buffers, i, image_rgb)
+            results.extend(self._run(buffers, len(chunk)))
+        return results
+
+    def close(self):
+        self._session = None
+
+    def _buffers(self):
+        # Per thread, since stations on different worker threads share one backend
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            width, height = self.input_size
+            shape = (self.batch_size, 3, height, width) if self.channels_first else (self.batch_size, height, width, 3)
+            buffers = self._local.buffers = _Buffers(
+                np.zeros(shape, dtype=np.float32), np.zeros((height, width, 3), dtype=np.uint8),
+                np.empty((self.batch_size, 5), dtype=np.float32), {})
+        return buffers
+
+    def _fill(self, buffers, i, image_rgb):
+        # Letterboxes image_rgb into the input size, keeping its aspect ratio, and scales it into batch row i
+        h, w = image_rgb.shape[:2]
+        placement = buffers.placements.get((w, h))
+        if placement is None:
+            width, height = self.input_size
+            scale = min(width / w, height / h)
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            placement = buffers.placements[w, h] = (scale, (width - size[0]) // 2, (height - size[1]) // 2, size)
+        scale, x0, y0, size = placement
+        letterbox = buffers.letterbox
+        if buffers.placement != placement:
+            letterbox[:] = 0
+            buffers.placement = placement
+        cv2.resize(image_rgb, size, dst=letterbox[y0:y0 + size[1], x0:x0 + size[0]], interpolation=cv2.INTER_AREA)
+        source = letterbox.transpose(2, 0, 1) if self.channels_first else letterbox
+        np.multiply(source, self._scale, out=buffers.batch[i], casting="unsafe")
+        if self._offset:
+            buffers.batch[i] += self._offset
+        buffers.boxes[i] = (scale, x0, y0, w, h)
+
+    def _run(self, buffers, n):
+        # A fixed batch dimension takes the whole batch; rows past n are left over from earlier frames
+        batch = buffers.batch if self._fixed_batch or n == len(buffers.batch) else buffers.batch[:n]
+        outputs = [output[:n] for output in self._session.run(self._outputs, {self._input: batch})]
+        raw = outputs[0].reshape(n, -1, 5)[:, :NUM_LANDMARKS]
+        scale, x0, y0, w, h = (column[:, None] for column in buffers.boxes[:n].T)
+        points = np.empty((n, NUM_LANDMARKS, 4), dtype=np.float32)
+        # Input pixels -> frame pixels -> normalized; z on the same scale as x, as in MediaPipe
+        points[..., 0] = (raw[..., 0] - x0) / (scale * w)
+        points[..., 1] = (raw[..., 1] - y0) / (scale * h)
+        points[..., 2] = raw[..., 2] / (scale * w)
+        points[..., 3] = 1.0 / (1.0 + np.exp(-raw[..., 3]))
+        if len(outputs) > 1:
+            detected = outputs[1].reshape(n) >= self.min_detection_confidence
+        else:
+            detected = np.ones(n, dtype=bool)
+        return [PoseResult(to_landmarks(p) if found else None) for p, found in zip(points, detected)]
+
+
+class _Buffers:
+    # One thread's input batch, letterbox frame and (scale, x0, y0, w, h) of each batch row
+    def __init__(self, batch, letterbox, boxes, placements):
+        self.batch = batch
+        self.letterbox = letterbox
+        self.boxes = boxes
+        self.placements = placements  # (w, h) -> (scale, x0, y0, resized size)
+        self.placement = None  # the one the letterbox borders were cleared for
+
+
+BACKENDS = {"mediapipe": MediaPipeBackend, "onnx": OnnxBackend}
+
+
+def make_backend(spec="mediapipe", model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 smooth_landmarks=True, intra_op_threads=0, inter_op_threads=0, batch_size=8):
+    """Builds a backend from a spec: "mediapipe" or "onnx:path/to/model.onnx".
+
+    MediaPipe ignores the thread and batch settings; an ONNX model is a
+    single model, so it ignores model_complexity, tracking and smoothing.
+    """
+    name, path = parse_backend(spec)
+    if name == "mediapipe":
+        return MediaPipeBackend(model_complexity, min_detection_confidence, min_tracking_confidence, smooth_landmarks)
+    return OnnxBackend(path, min_detection_confidence, intra_op_threads, inter_op_threads, batch_size)
+
+
+def parse_backend(spec):
+    """(name, model path) of a backend spec; raises ValueError for an unknown backend or a missing model file."""
+    name, _, path = spec.partition(":")
+    if name == "mediapipe" and not path:
+        return name, None
+    if name == "onnx" and path:
+        if not os.path.isfile(path):
+            raise ValueError(f"ONNX model not found: {path}")
+        return name, path
+    raise ValueError(f"unknown pose backend {spec!r}; expected mediapipe or onnx:MODEL.onnx")
+
+
+def backend_factory(spec="mediapipe", **options):
+    """make_pose(complexity) for scheduler.AdaptiveScheduler over make_backend(spec, **options).
+
+    Each complexity gets its own backend, except that a stateless backend
+    is built once and shared by every complexity.
+    """
+    shared = []
+
+    def make_pose(complexity):
+        if shared:
+            return shared[0]
+        backend = make_backend(spec, model_complexity=complexity, **options)
+        if backend.stateless:
+            shared.append(backend)
+        return backend
+
+    return make_pose
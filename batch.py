@@ -0,0 +1,269 @@
+"""Headless rep counting over recorded videos, spread across a process pool.
+
+Usage:
+    python batch.py --exercise squat --output results.csv "videos/*.mp4"
+
+By default frames are sampled at a stride chosen from the exercise's
+fastest rep (see video.py); --verify also counts every frame and reports
+whether the two counts match, to check the sampling on a reference set.
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from backends import make_backend, parse_backend
+from counting import EXERCISES, RepCounter
+from filters import FILTERS
+from video import FrameSampler, auto_stride, hw_acceleration, open_video
+
+# One pose backend per worker process, created by the pool initializer
+_pose = None
+_options = None
+
+# Thread pools sized from these variables when a runtime starts after the worker does (OpenMP, BLAS)
+THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _init_worker(options):
+    global _pose, _options
+    _options = options
+    # Each worker gets its share of the cores, so N workers do not run N full-size thread pools
+    threads = options["threads"]
+    cv2.setNumThreads(threads)
+    for name in THREAD_ENV:
+        os.environ[name] = str(threads)
+    _pose = make_backend(
+        options["backend"],
+        model_complexity=options["model_complexity"],
+        min_detection_confidence=options["min_confidence"],
+        min_tracking_confidence=options["min_confidence"],
+        smooth_landmarks=True,
+        intra_op_threads=options["intra_op_threads"],
+        inter_op_threads=options["inter_op_threads"],
+        batch_size=options["batch_size"],
+    )
+
+
+def count_video(path, exercise, pose, flip=True, size=None, smoothing=None, stride=1, interval=None,
+                hw_accel=True):
+    """Runs the rep state machine over a video file.
+
+    Only every stride-th frame (or one frame per interval seconds) is
+    decoded and processed; stride="auto" derives it from the exercise's
+    fastest rep and the file's frame rate. A backend with a batch_size
+    above one (see backends.py) gets that many sampled frames per call.
+    """
+    if isinstance(exercise, str):
+        exercise = EXERCISES[exercise]
+    cap = open_video(path, hw_accel)
+    if not cap.isOpened():
+        raise IOError(f"unable to open {path}")
+    if stride == "auto":
+        stride = auto_stride(exercise, cap.get(cv2.CAP_PROP_FPS))
+
+    counter = RepCounter(exercise, landmark_filter=smoothing)
+    sampler = FrameSampler(cap, stride, interval, size)
+    batch_size = getattr(pose, "batch_size", 1)
+    images = [None] * batch_size  # RGB buffers, reused from batch to batch
+    timestamps = []
+    detected = 0
+    try:
+        for _, timestamp, frame in sampler:
+            i = len(timestamps)
+            image_rgb = images[i] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=images[i])
+            if flip:
+                cv2.flip(image_rgb, 1, dst=image_rgb)
+            timestamps.append(timestamp)
+            if len(timestamps) == batch_size:
+                detected += _count_batch(pose, images, timestamps, counter)
+                timestamps.clear()
+        if timestamps:
+            detected += _count_batch(pose, images, timestamps, counter)
+        accel = hw_acceleration(cap)
+    finally:
+        cap.release()
+
+    if sampler.sampled:
+        counter.finish(timestamp)  # the end of the file closes the last rep
+    tempo = counter.tempo
+    # Means over the reps timed from the file's own clock; None without a complete rep
+    means = {name: round(stat.mean, 2) if stat.count else None
+             for name, stat in (("rep_seconds", tempo.rep_seconds), ("concentric_seconds", tempo.concentric),
+                                ("eccentric_seconds", tempo.eccentric), ("rom_degrees", tempo.rom))}
+    return {"reps": counter.reps, "faults": counter.faults, "frames": sampler.frames,
+            "processed_frames": sampler.sampled, "detected_frames": detected,
+            "stride": stride if interval is None else None, "hw_accel": accel, **means}
+
+
+def _count_batch(pose, images, timestamps, counter):
+    # Inference over the buffered frames, then the counter in frame order; returns the frames with a pose
+    images = images[:len(timestamps)]
+    for image_rgb in images:
+        image_rgb.flags.writeable = False
+    results = pose.process_batch(images) if len(images) > 1 else [pose.process(images[0])]
+    for image_rgb in images:
+        image_rgb.flags.writeable = True
+    detected = 0
+    for result, timestamp in zip(results, timestamps):
+        if result.pose_landmarks:
+            detected += 1
+            counter.update(result.pose_landmarks.landmark, timestamp)
+    return detected
+
+
+def _run_file(job):
+    path, exercise = job
+    start = time.perf_counter()
+    row = {"file": path, "exercise": exercise, "reps": None, "faults": None, "frames": 0,
+           "processed_frames": 0, "detected_frames": 0, "stride": None, "hw_accel": "",
+           "rep_seconds": None, "concentric_seconds": None, "eccentric_seconds": None, "rom_degrees": None,
+           "seconds": 0.0, "fps": 0.0, "error": ""}
+    if _options["verify"]:
+        row.update({"reps_full": None, "match": None})
+    options = {name: _options[name] for name in ("flip", "size", "smoothing", "hw_accel")}
+    try:
+        # A fresh tracker per file: landmarks must not leak between videos
+        _pose.reset()
+        row.update(count_video(path, exercise, _pose, stride=_options["stride"],
+                               interval=_options["interval"], **options))
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    if row["seconds"] > 0:
+        row["fps"] = round(row["frames"] / row["seconds"], 1)
+
+    if _options["verify"] and not row["error"]:
+        try:
+            _pose.reset()
+            row["reps_full"] = count_video(path, exercise, _pose, **options)["reps"]
+            row["match"] = row["reps_full"] == row["reps"]
+        except Exception as e:
+            row["error"] = f"verify: {type(e).__name__}: {e}"
+    return row
+
+
+def expand_inputs(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(matches)
+    return files
+
+
+def write_results(rows, output):
+    if output.endswith(".csv"):
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+def parse_stride(value):
+    return value if value == "auto" else int(value)
+
+
+def parse_size(value):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count exercise reps in recorded videos.")
+    parser.add_argument("inputs", nargs="+", help="video files or glob patterns")
+    parser.add_argument("--exercise", required=True, choices=sorted(EXERCISES))
+    parser.add_argument("--output", default="results.json", help="results file (.json or .csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", default="mediapipe",
+                        help="pose backend: mediapipe (default) or onnx:MODEL.onnx (see backends.py)")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--min-confidence", type=float, default=0.7)
+    parser.add_argument("--smoothing", default="one_euro", choices=["none"] + sorted(FILTERS),
+                        help="temporal filter applied to the landmarks before counting")
+    parser.add_argument("--size", type=parse_size, default=None, help="resize frames to WxH before inference")
+    parser.add_argument("--no-flip", dest="flip", action="store_false",
+                        help="do not mirror frames (the GUI mirrors the camera)")
+    parser.add_argument("--stride", type=parse_stride, default="auto",
+                        help="process every Nth frame; 'auto' picks N from the exercise's pace (default)")
+    parser.add_argument("--sample-fps", type=float, default=None,
+                        help="process frames by timestamp at this rate instead of a stride")
+    parser.add_argument("--no-hw-accel", dest="hw_accel", action="store_false",
+                        help="decode in software even when hardware decoding is available")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="frames per inference call for backends that batch (onnx)")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="ONNX Runtime threads per operator in each worker (default: cores / workers)")
+    parser.add_argument("--inter-op-threads", type=int, default=0,
+                        help="ONNX Runtime threads across independent operators (default: its own)")
+    parser.add_argument("--verify", action="store_true",
+                        help="also count every frame and report whether the counts match")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        parser.error("no input files matched")
+    try:
+        parse_backend(args.backend)
+    except ValueError as e:
+        parser.error(f"invalid --backend: {e}")
+
+    jobs = [(path, args.exercise) for path in files]
+    workers = max(1, min(args.workers, len(files)))
+    # Every worker runs its own inference; left at their defaults, OpenCV and ONNX Runtime would each give
+    # every worker all the cores
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    intra_op_threads = threads if args.intra_op_threads is None else args.intra_op_threads
+
+    options = {
+        "backend": args.backend,
+        "model_complexity": args.model_complexity,
+        "min_confidence": args.min_confidence,
+        "flip": args.flip,
+        "size": args.size,
+        "smoothing": args.smoothing,
+        "stride": args.stride,
+        "interval": 1.0 / args.sample_fps if args.sample_fps else None,
+        "hw_accel": args.hw_accel,
+        "verify": args.verify,
+        "batch_size": args.batch_size,
+        "threads": threads,
+        "intra_op_threads": intra_op_threads,
+        "inter_op_threads": args.inter_op_threads,
+    }
+
+    start = time.perf_counter()
+    rows = []
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        for row in pool.imap_unordered(_run_file, jobs):
+            rows.append(row)
+            status = row["error"] or f"{row['reps']} reps, {row['fps']} fps"
+            if args.verify and not row["error"]:
+                status += f", full rate {row['reps_full']} reps" + ("" if row["match"] else " MISMATCH")
+            print(f"[{len(rows)}/{len(jobs)}] {row['file']}: {status}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    rows.sort(key=lambda r: r["file"])
+    write_results(rows, args.output)
+    total_frames = sum(r["frames"] for r in rows)
+    print(f"{len(rows)} files, {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / elapsed:.1f} fps with {workers} workers) -> {args.output}",
+          file=sys.stderr)
+    ok = all(not r["error"] for r in rows)
+    if args.verify:
+        matched = sum(1 for r in rows if r["match"])
+        print(f"verify: {matched}/{len(rows)} files match the full-rate count", file=sys.stderr)
+        ok = ok and matched == len(rows)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Micro-benchmark: scalar calculate_angle vs the vectorized AngleEngine.
+
+Run from the repository root:
+    python -m benchmarks.bench_angles
+"""
+import argparse
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+from angles import JOINTS, AngleEngine, batch_angles
+from counting import calculate_angle
+from landmarks import INDEX, NUM_LANDMARKS
+
+
+def fake_landmarks(rng):
+    return [SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=1.0)
+            for x, y, z in rng.random((NUM_LANDMARKS, 3))]
+
+
+def scalar_table(landmarks):
+    angles = []
+    for a, b, c in JOINTS.values():
+        pa, pb, pc = landmarks[INDEX[a]], landmarks[INDEX[b]], landmarks[INDEX[c]]
+        angles.append(calculate_angle([pa.x, pa.y], [pb.x, pb.y], [pc.x, pc.y]))
+    return angles
+
+
+def report(label, seconds, calls, unit):
+    per_call = seconds / calls
+    print(f"{label:<40} {per_call * 1e6:9.2f} us/{unit}  {1 / per_call:12.0f} {unit}/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    landmarks = fake_landmarks(rng)
+    engine2d = AngleEngine()
+    engine3d = AngleEngine(use_z=True)
+    n = len(JOINTS)
+
+    print(f"{n} joints per frame, {args.repeat} frames")
+    t = timeit.timeit(lambda: calculate_angle([0.1, 0.2], [0.3, 0.4], [0.5, 0.1]), number=args.repeat)
+    report("calculate_angle (one joint)", t, args.repeat, "call")
+    t = timeit.timeit(lambda: scalar_table(landmarks), number=args.repeat)
+    report(f"calculate_angle x {n} joints", t, args.repeat, "frame")
+    t = timeit.timeit(lambda: engine2d.update(landmarks), number=args.repeat)
+    report("AngleEngine.update 2D (incl. copy)", t, args.repeat, "frame")
+    t = timeit.timeit(engine2d.compute, number=args.repeat)
+    report("AngleEngine.compute 2D", t, args.repeat, "frame")
+    t = timeit.timeit(lambda: engine3d.update(landmarks), number=args.repeat)
+    report("AngleEngine.update 3D (incl. copy)", t, args.repeat, "frame")
+
+    points = rng.random((args.frames, NUM_LANDMARKS, 3)).astype(np.float32)
+    t = min(timeit.repeat(lambda: batch_angles(points), number=1, repeat=3))
+    report(f"batch_angles 2D ({args.frames} frames)", t, args.frames, "frame")
+    t = min(timeit.repeat(lambda: batch_angles(points, use_z=True), number=1, repeat=3))
+    report(f"batch_angles 3D ({args.frames} frames)", t, args.frames, "frame")
+
+    engine2d.update(landmarks)
+    error = np.max(np.abs(np.array(scalar_table(landmarks)) - engine2d.angles))
+    print(f"max |scalar - vectorized| = {error:.2e} deg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Pose backend throughput: one frame per call vs batches, and ONNX Runtime thread settings.
+
+Runs the same frames through each backend spec (see backends.py) and
+reports milliseconds per frame and frames per second for every batch size
+and thread count. MediaPipe has no batching, so its batches are the
+per-frame baseline. Frames come from a video, or are synthetic noise when
+none is given; ONNX models run without any detector, on letterboxed
+full frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_backends --backend mediapipe --backend onnx:pose_landmark_full.onnx \
+        --batch-size 1 4 8 16 --intra-op-threads 1 2 4
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from backends import make_backend
+
+
+def load_frames(video, count, size):
+    if video is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8) for _ in range(count)]
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            if not frames:
+                raise IOError(f"unable to read {video}")
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frames.append(cv2.cvtColor(cv2.resize(frame, size), cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def run(backend, frames, batch_size, repeat):
+    """Best seconds per frame over repeat passes, with batch_size frames per call."""
+    backend.process_batch(frames[:batch_size])  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch_size):
+            if batch_size == 1:
+                backend.process(frames[i])
+            else:
+                backend.process_batch(frames[i:i + batch_size])
+        best = min(best, (time.perf_counter() - start) / len(frames))
+    return best
+
+
+def parse_size(value):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", action="append", default=None,
+                        help="backend spec, e.g. mediapipe or onnx:MODEL.onnx (repeatable; default mediapipe)")
+    parser.add_argument("--video", default=None, help="take frames from this file instead of noise")
+    parser.add_argument("--frames", type=int, default=128)
+    parser.add_argument("--size", type=parse_size, default=(640, 480))
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--intra-op-threads", type=int, nargs="+", default=[0])
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.video, args.frames, args.size)
+    print(f"{'backend':<40} {'threads':>7} {'batch':>5} {'ms/frame':>9} {'frames/s':>9}")
+    for spec in args.backend or ["mediapipe"]:
+        threads = args.intra_op_threads if spec.startswith("onnx:") else [0]
+        for intra in threads:
+            for batch_size in args.batch_size:
+                backend = make_backend(spec, batch_size=batch_size, intra_op_threads=intra,
+                                       inter_op_threads=args.inter_op_threads)
+                seconds = run(backend, frames, batch_size, args.repeat)
+                backend.close()
+                print(f"{spec:<40} {intra or 'auto':>7} {batch_size:>5} {seconds * 1000:9.2f} {1 / seconds:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Per-stage cost of the old frame path (widget-size resize, three color
+conversions) against the current one (fixed inference size, one RGB buffer).
+
+Run from the repository root:
+    python -m benchmarks.bench_frame_path --camera 1280x720 --label 1000x700
+"""
+import argparse
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QImage, QPainter, QPixmap
+
+from pipeline import BufferRing
+from timing import StageTimer
+
+
+def parse_size(value):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+def paint(pixmap, target, scaled):
+    # What QLabel does on repaint: draw the pixmap into the label's area
+    painter = QPainter(target)
+    if scaled:
+        painter.drawPixmap(QRect(0, 0, target.width(), target.height()), pixmap)
+    else:
+        painter.drawPixmap(0, 0, pixmap)
+    painter.end()
+
+
+def legacy_frame(frame, label_size, target, timer, pose):
+    with timer.measure("resize"):
+        frame = cv2.resize(frame, label_size)
+    with timer.measure("color"):
+        frame = cv2.flip(frame, 1)
+        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if pose is not None:
+        with timer.measure("inference"):
+            pose.process(image_rgb)
+    with timer.measure("color"):
+        processed = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+    with timer.measure("display"):
+        rgb = cv2.cvtColor(processed, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb.shape
+        pixmap = QPixmap.fromImage(QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888))
+        paint(pixmap, target, scaled=False)
+
+
+def current_frame(frame, inference_size, resized, buffers, target, timer, pose):
+    with timer.measure("resize"):
+        frame = cv2.resize(frame, inference_size, dst=resized)
+    with timer.measure("color"):
+        image_rgb = buffers.next()
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=image_rgb)
+        cv2.flip(image_rgb, 1, dst=image_rgb)
+    if pose is not None:
+        with timer.measure("inference"):
+            pose.process(image_rgb)
+    with timer.measure("display"):
+        h, w, ch = image_rgb.shape
+        pixmap = QPixmap.fromImage(QImage(image_rgb.data, w, h, ch * w, QImage.Format_RGB888))
+        paint(pixmap, target, scaled=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--camera", type=parse_size, default=(1280, 720), help="camera frame size WxH")
+    parser.add_argument("--label", type=parse_size, default=(1000, 700), help="camera_feed label size WxH")
+    parser.add_argument("--inference", type=parse_size, default=(640, 480), help="inference size WxH")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=None,
+                        help="also time pose.process at this complexity")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication([])
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (args.camera[1], args.camera[0], 3), dtype=np.uint8) for _ in range(8)]
+    target = QImage(args.label[0], args.label[1], QImage.Format_RGB32)
+
+    pose = None
+    if args.model_complexity is not None:
+        import mediapipe as mp
+        pose = mp.solutions.pose.Pose(model_complexity=args.model_complexity)
+
+    legacy = StageTimer(window=args.frames)
+    for i in range(args.frames):
+        legacy_frame(frames[i % len(frames)], args.label, target, legacy, pose)
+
+    current = StageTimer(window=args.frames)
+    width, height = args.inference
+    resized = np.empty((height, width, 3), dtype=np.uint8)
+    buffers = BufferRing((height, width, 3))
+    for i in range(args.frames):
+        current_frame(frames[i % len(frames)], args.inference, resized, buffers, target, current, pose)
+
+    print(f"camera {args.camera[0]}x{args.camera[1]}, label {args.label[0]}x{args.label[1]}, "
+          f"inference {width}x{height}, {args.frames} frames")
+    print("\nold path")
+    print(legacy.report())
+    print("\ncurrent path")
+    print(current.report(baseline=legacy.summary()))
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Offline vectorized counting (offline.count_points) vs the online RepCounter.
+
+Times both on long synthetic sessions with noisy, wandering joints, side
+swaps and timestamp jitter. That the two count identically is checked by
+tests/test_offline.py on the same sessions.
+
+Run from the repository root:
+    python -m benchmarks.bench_offline_count
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from counting import EXERCISES
+from offline import count_points
+from tests.synthetic import online, synthetic_session
+
+
+def report(label, seconds, frames):
+    print(f"{label:<44} {seconds * 1000:9.1f} ms  {frames / seconds:14,.0f} frames/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--online-frames", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    points, timestamps = synthetic_session(rng, args.frames, drop_rate=0.0)
+    names = ", ".join(EXERCISES)
+    start = time.perf_counter()
+    results = count_points(points, timestamps)
+    report(f"count_points, all {len(EXERCISES)} exercises", time.perf_counter() - start, args.frames)
+    for name in EXERCISES:
+        start = time.perf_counter()
+        count_points(points, timestamps, [name])
+        report(f"count_points, {name}", time.perf_counter() - start, args.frames)
+
+    n = args.online_frames
+    start = time.perf_counter()
+    for name in EXERCISES:
+        online(points[:n], timestamps[:n], EXERCISES[name], None, None)
+    report(f"RepCounter.update, all {len(EXERCISES)} exercises", time.perf_counter() - start, n)
+    print(f"reps over {args.frames} frames ({names}): " + ", ".join(str(r.reps) for r in results.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
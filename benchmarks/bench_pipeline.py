@@ -0,0 +1,251 @@
+"""Benchmark of the frame hot path, stage by stage, without a camera or display.
+
+Feeds a synthetic or recorded frame stream through the same stages as the
+apps (capture, resize, color, pose.process, counting, the skeleton, the
+status box and QPixmap.fromImage) on Qt's offscreen platform, for
+each requested model_complexity, and reports p50/p95/p99 latency and FPS.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --complexity 0 1 2 --output bench.json
+    python -m benchmarks.bench_pipeline --video session.mp4 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from PyQt5 import QtWidgets
+from PyQt5.QtGui import QImage, QPixmap
+
+from counting import EXERCISES, RepCounter
+from drawing import SkeletonRenderer, StatusBox
+from landmarks import INDEX, NUM_LANDMARKS
+from pipeline import BufferRing
+from timing import StageTimer
+
+mp_pose = mp.solutions.pose
+
+STAGES = ("capture", "resize", "color", "inference", "count", "draw", "overlay", "display")
+
+# A standing figure, used for the stages after inference when the synthetic
+# stream (or a recording) has nobody in it
+_STANDING = {
+    "NOSE": (0.50, 0.15), "LEFT_SHOULDER": (0.58, 0.28), "RIGHT_SHOULDER": (0.42, 0.28),
+    "LEFT_ELBOW": (0.62, 0.42), "RIGHT_ELBOW": (0.38, 0.42), "LEFT_WRIST": (0.63, 0.55),
+    "RIGHT_WRIST": (0.37, 0.55), "LEFT_HIP": (0.55, 0.55), "RIGHT_HIP": (0.45, 0.55),
+    "LEFT_KNEE": (0.55, 0.72), "RIGHT_KNEE": (0.45, 0.72), "LEFT_ANKLE": (0.55, 0.90),
+    "RIGHT_ANKLE": (0.45, 0.90),
+}
+
+
+def standing_pose():
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for i in range(NUM_LANDMARKS):
+        landmarks.landmark.add(x=0.5, y=0.15, z=0.0, visibility=0.9)
+    for name, (x, y) in _STANDING.items():
+        landmarks.landmark[INDEX[name]].x = x
+        landmarks.landmark[INDEX[name]].y = y
+    return landmarks
+
+
+class SyntheticSource:
+    """Moving test pattern at a fixed camera resolution."""
+
+    def __init__(self, size, count=30):
+        w, h = size
+        self._frames = []
+        for i in range(count):
+            frame = np.full((h, w, 3), 40 + 4 * i, dtype=np.uint8)
+            cv2.circle(frame, (w * i // count, h // 2), h // 6, (0, 0, 255), -1)
+            self._frames.append(frame)
+        self._next = 0
+        self.name = f"synthetic {w}x{h}"
+
+    def read(self):
+        frame = self._frames[self._next].copy()  # a camera hands out a new array per read
+        self._next = (self._next + 1) % len(self._frames)
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class VideoSource:
+    """Recorded file, rewound at the end so any frame count can be requested."""
+
+    def __init__(self, path):
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise IOError(f"unable to open {path}")
+        self.name = path
+
+    def read(self):
+        ret, frame = self._cap.read()
+        if not ret:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return ret, frame
+
+    def release(self):
+        self._cap.release()
+
+
+def status_box():
+    # Same panel as T4.py
+    return StatusBox((450, 70), labels=[('REPETICOES', (15, 25), 0.7, 1), ('ESTADO', (200, 25), 0.7, 1)],
+                     fields=[((20, 60), 1.2, 2), ((205, 60), 1.2, 2)])
+
+
+def run(source, complexity, frames, warmup, size, exercise):
+    pose = mp_pose.Pose(model_complexity=complexity, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    counter = RepCounter(exercise)
+    fallback = standing_pose()
+    skeleton = SkeletonRenderer()
+    status = status_box()
+    width, height = size
+    resized = np.empty((height, width, 3), dtype=np.uint8)
+    buffers = BufferRing((height, width, 3))
+    timer = StageTimer(window=frames)
+    detected = 0
+
+    for i in range(warmup + frames):
+        if i == warmup:
+            timer = StageTimer(window=frames)
+            detected = 0
+        with timer.measure("frame"):
+            with timer.measure("capture"):
+                ret, frame = source.read()
+            if not ret:
+                break
+            with timer.measure("resize"):
+                cv2.resize(frame, size, dst=resized)
+            with timer.measure("color"):
+                image_rgb = buffers.next()
+                cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=image_rgb)
+                cv2.flip(image_rgb, 1, dst=image_rgb)
+            with timer.measure("inference"):
+                image_rgb.flags.writeable = False
+                result = pose.process(image_rgb)
+                image_rgb.flags.writeable = True
+
+            landmarks = result.pose_landmarks
+            if landmarks:
+                detected += 1
+            else:
+                landmarks = fallback
+            with timer.measure("count"):
+                counter.update(landmarks.landmark)
+            with timer.measure("draw"):
+                skeleton.draw(image_rgb, landmarks.landmark)
+            with timer.measure("overlay"):
+                status.draw(image_rgb, str(counter.reps), counter.state.upper())
+            with timer.measure("display"):
+                h, w, ch = image_rgb.shape
+                QPixmap.fromImage(QImage(image_rgb.data, w, h, ch * w, QImage.Format_RGB888))
+
+    pose.close()
+    summary = timer.summary()
+    summary["detection_rate"] = detected / max(1, summary.get("frame", {}).get("count", 0))
+    return summary
+
+
+def print_table(complexity, summary):
+    print(f"\nmodel_complexity={complexity}  detection rate {summary['detection_rate']:.0%}")
+    print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for stage in STAGES + ("frame",):
+        stats = summary.get(stage)
+        if stats:
+            print(f"{stage:<12}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{stats['fps']:>10.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Lists (complexity, stage, before, after) whose p50 regressed by more than tolerance."""
+    regressions = []
+    for key, summary in results.items():
+        before = baseline.get("results", {}).get(key)
+        if not before:
+            continue
+        for stage in STAGES + ("frame",):
+            if stage in summary and stage in before:
+                old, new = before[stage]["p50_ms"], summary[stage]["p50_ms"]
+                if old > 0 and new > old * (1 + tolerance):
+                    regressions.append((key, stage, old, new))
+    return regressions
+
+
+def parse_size(value):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=None, help="recorded video instead of the synthetic stream")
+    parser.add_argument("--camera", type=parse_size, default=(1280, 720), help="synthetic frame size WxH")
+    parser.add_argument("--size", type=parse_size, default=(640, 480), help="inference size WxH")
+    parser.add_argument("--complexity", type=int, nargs="+", choices=(0, 1, 2), default=[1])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--exercise", default="squat", choices=sorted(EXERCISES))
+    parser.add_argument("--output", default=None, help="write machine-readable results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON from a previous --output")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p50 slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication([])
+    source = VideoSource(args.video) if args.video else SyntheticSource(args.camera)
+    results = {}
+    errors = {}
+    try:
+        for complexity in args.complexity:
+            key = f"complexity_{complexity}"
+            try:
+                results[key] = run(source, complexity, args.frames, args.warmup, args.size, args.exercise)
+            except Exception as e:  # e.g. the complexity 0/2 model cannot be downloaded
+                errors[key] = f"{type(e).__name__}: {e}"
+                print(f"\nmodel_complexity={complexity}: {errors[key]}", file=sys.stderr)
+                continue
+            print_table(complexity, results[key])
+    finally:
+        source.release()
+        app.quit()
+
+    report = {
+        "meta": {
+            "source": source.name,
+            "inference_size": list(args.size),
+            "frames": args.frames,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "opencv": cv2.__version__,
+            "mediapipe": mp.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+        "errors": errors,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, stage, old, new in regressions:
+            print(f"REGRESSION {key} {stage}: p50 {old:.2f} ms -> {new:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Crop-around-the-person inference (roi.RoiTracker) vs the full frame: latency and landmark error.
+
+Runs the same video through a pose backend on full frames, which is the
+reference, and through RoiTracker. It reports milliseconds per frame and
+how many frames used the crop. It also reports how far the landmarks land
+from the reference: mean and 95th percentile pixel distance over landmarks
+visible in both, and frames where only one of them found the person.
+--shared also runs RoiTracker with one backend instance for crops and full
+frames, which lets MediaPipe's tracking mix the two coordinate frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_roi --video videos/squat.mp4 --model-complexity 1
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from backends import make_backend
+from landmarks import NUM_LANDMARKS, fill_array
+from roi import RoiTracker
+
+
+def load_frames(video, count):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise IOError(f"unable to read {video}")
+    return frames
+
+
+def run(pose, frames):
+    """(seconds per frame, (frames, 33, 4) landmarks with NaN where nothing was found)."""
+    points = np.full((len(frames), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    pose.process(frames[0])  # warm-up
+    pose.reset()
+    elapsed = 0.0
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        result = pose.process(frame)
+        elapsed += time.perf_counter() - start
+        if result.pose_landmarks:
+            fill_array(result.pose_landmarks.landmark, points[i])
+    return elapsed / len(frames), points
+
+
+def landmark_error(points, reference, size, min_visibility=0.5):
+    """(mean px, p95 px, frames found by only one of the two) over landmarks visible in both."""
+    found, expected = ~np.isnan(points[:, 0, 0]), ~np.isnan(reference[:, 0, 0])
+    both = found & expected
+    visible = (points[both, :, 3] >= min_visibility) & (reference[both, :, 3] >= min_visibility)
+    distance = np.hypot(*((points[both, :, :2] - reference[both, :, :2]) * size).transpose(2, 0, 1))[visible]
+    if not len(distance):
+        return float("nan"), float("nan"), int(np.count_nonzero(found != expected))
+    return float(distance.mean()), float(np.percentile(distance, 95)), int(np.count_nonzero(found != expected))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", required=True, help="a recording with one person in it")
+    parser.add_argument("--backend", default="mediapipe", help="backend spec (see backends.py)")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--crop-size", type=int, default=256)
+    parser.add_argument("--shared", action="store_true", help="also run RoiTracker with a single backend instance")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.video, args.frames)
+    h, w = frames[0].shape[:2]
+
+    def backend():
+        return make_backend(args.backend, model_complexity=args.model_complexity)
+
+    variants = [("full frame", backend, None)]
+    variants.append(("RoiTracker", lambda: RoiTracker(backend(), backend(), size=args.crop_size), "crop"))
+    if args.shared:
+        def shared():
+            pose = backend()
+            return RoiTracker(pose, pose, size=args.crop_size)
+        variants.append(("RoiTracker, one instance", shared, "crop"))
+
+    print(f"{len(frames)} frames of {w}x{h} from {args.video}, {args.backend} complexity {args.model_complexity}")
+    print(f"{'variant':<26} {'ms/frame':>9} {'speedup':>8} {'cropped':>8} {'err px':>7} {'p95 px':>7} {'missed':>7}")
+    reference = base = None
+    for label, build, kind in variants:
+        pose = build()
+        seconds, points = run(pose, frames)
+        if reference is None:
+            reference, base = points, seconds
+        mean, p95, missed = landmark_error(points, reference, (w, h))
+        cropped = f"{pose.crops / max(1, pose.crops + pose.full_frames):.0%}" if kind else "-"
+        print(f"{label:<26} {seconds * 1000:9.2f} {base / seconds:7.2f}x {cropped:>8} {mean:7.1f} {p95:7.1f} {missed:7d}")
+        pose.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Camera capture on its own thread, keeping only the newest frame."""
+import threading
+import time
+
+import cv2
+
+
+class CameraCapture:
+    """Reads a cv2.VideoCapture continuously into three reused buffers.
+
+    The capture thread fills one buffer while another holds the newest
+    complete frame (a double buffer); the third is the frame last handed to
+    the consumer, which stays valid until the consumer's next read(). An
+    unread frame is overwritten by a newer one, so the driver queue is
+    drained at the camera's rate and the consumer never sees stale frames.
+
+    size, fps and fourcc (e.g. "MJPG") are requested from the device;
+    settings holds what it actually accepted and fps the measured rate.
+    """
+
+    def __init__(self, source=0, size=None, fps=None, fourcc=None, on_drop=None):
+        self.cap = cv2.VideoCapture(source)
+        if self.cap.isOpened():
+            if fourcc:
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if size:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+            if fps:
+                self.cap.set(cv2.CAP_PROP_FPS, fps)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.settings = self._read_settings()
+        self.on_drop = on_drop
+
+        self.frames = 0
+        self.dropped = 0
+        self.timestamp = None  # capture time (time.monotonic()) of the frame last returned by read()
+        self._interval = None
+        self._buffers = [None, None, None]
+        self._back = 0
+        self._ready = None
+        self._front = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._finished = False
+        self._timestamps = [0.0, 0.0, 0.0]
+        self._thread = threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    @property
+    def fps(self):
+        """Measured capture rate (exponential average of the frame intervals)."""
+        return 1.0 / self._interval if self._interval else 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def read(self, timeout=None):
+        """Returns the newest frame not yet read, waiting for one if needed; None at the end."""
+        with self._cond:
+            while self._ready is None:
+                if self._finished or self._stop.is_set():
+                    return None
+                if not self._cond.wait(timeout):
+                    return None
+            self._front, self._ready = self._ready, None
+            self.timestamp = self._timestamps[self._front]
+            return self._buffers[self._front]
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(2.0)
+        self.cap.release()
+
+    def _read_settings(self):
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)) if code > 0 else ""
+        return {
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": fourcc,
+        }
+
+    def _capture_loop(self):
+        last = None
+        try:
+            while not self._stop.is_set():
+                buffer = self._buffers[self._back]
+                ret, frame = self.cap.read(image=buffer) if buffer is not None else self.cap.read()
+                if not ret:
+                    break
+                now = time.monotonic()
+                if last is not None:
+                    dt = now - last
+                    self._interval = dt if self._interval is None else 0.9 * self._interval + 0.1 * dt
+                last = now
+
+                with self._cond:
+                    # The backend allocates only when the buffer is missing or the format changed
+                    self._buffers[self._back] = frame
+                    self._timestamps[self._back] = now
+                    self.frames += 1
+                    previous, self._ready = self._ready, self._back
+                    if previous is not None:
+                        self.dropped += 1
+                        self._back = previous
+                    else:
+                        self._back = ({0, 1, 2} - {self._ready, self._front}).pop()
+                    self._cond.notify()
+                if previous is not None and self.on_drop is not None:
+                    self.on_drop()
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
@@ -0,0 +1,282 @@
+"""Exercise registry and the shared rep-counting state machine, free of any Qt dependency."""
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from angles import AngleEngine
+from filters import make_filter
+from landmarks import INDEX, NUM_LANDMARKS, fill_array
+from tempo import TempoTracker
+
+SIDES = ("right", "left")
+
+# The counter switches sides only when the other side's mean landmark
+# visibility is higher by this much, so it does not flip mid-rep
+SIDE_MARGIN = 0.1
+
+
+class Constraint(NamedTuple):
+    """A form check: a joint angle that should stay within [min_angle, max_angle]."""
+    name: str
+    triplet: tuple
+    min_angle: float = 0.0
+    max_angle: float = 180.0
+
+
+class Exercise(NamedTuple):
+    """One exercise: the joint triplet to measure and its hysteresis thresholds.
+
+    A rep is counted when the angle crosses count_at; the counter re-arms once
+    it crosses back past reset_at. Whether the angle must rise or fall to
+    count follows from the order of the two thresholds. A crossing only takes
+    effect after it holds for `hold` consecutive frames and once the current
+    phase has lasted at least min_phase seconds, which absorbs jitter around
+    a threshold.
+
+    min_rep_seconds is the fastest plausible rep, from which offline
+    ingestion (video.py) derives how many frames it can skip. concentric
+    is the phase (index into phases) in which the working muscle shortens,
+    for tempo.TempoTracker: 0 when that is the movement towards count_at.
+
+    Triplets name the right side. A bilateral exercise is also measured on
+    the mirrored left chain, and each frame counts with the more visible
+    side; constraints are checked on that same side.
+    """
+    name: str
+    triplet: tuple
+    reset_at: float
+    count_at: float
+    phases: tuple = ("lowering", "raising")  # (armed, counted)
+    hold: int = 2
+    min_phase: float = 0.15
+    constraints: tuple = ()
+    bilateral: bool = True
+    min_rep_seconds: float = 1.0
+    concentric: int = 0
+
+
+EXERCISES = {}
+
+
+def register(exercise):
+    EXERCISES[exercise.name] = exercise
+    return exercise
+
+
+register(Exercise("jumping_jack", ("RIGHT_HIP", "RIGHT_SHOULDER", "RIGHT_WRIST"), reset_at=40, count_at=140,
+                  min_rep_seconds=0.6))
+register(Exercise("squat", ("RIGHT_HIP", "RIGHT_KNEE", "RIGHT_ANKLE"), reset_at=170, count_at=90,
+                  constraints=(Constraint("back", ("RIGHT_SHOULDER", "RIGHT_HIP", "RIGHT_KNEE"), min_angle=45),),
+                  concentric=1))
+register(Exercise("abdominal", ("RIGHT_SHOULDER", "RIGHT_HIP", "RIGHT_KNEE"), reset_at=150, count_at=90,
+                  phases=("down", "raising")))
+register(Exercise("bicep_curl", ("RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST"), reset_at=160, count_at=40,
+                  constraints=(Constraint("elbow_in", ("RIGHT_HIP", "RIGHT_SHOULDER", "RIGHT_ELBOW"), max_angle=35),),
+                  min_rep_seconds=0.8))
+
+
+def mirror(triplet):
+    """The same joint chain on the other side of the body."""
+    swap = {"RIGHT_": "LEFT_", "LEFT_": "RIGHT_"}
+    return tuple(next((swap[p] + name[len(p):] for p in swap if name.startswith(p)), name) for name in triplet)
+
+
+def exercise_joints(exercise):
+    """Every angle the counter measures, one block per side: the triplet, then each constraint."""
+    joints = {}
+    for side in SIDES[:1 + exercise.bilateral]:
+        chains = [(side, exercise.triplet)]
+        chains += [(f"{side}:{c.name}", c.triplet) for c in exercise.constraints]
+        for name, triplet in chains:
+            joints[name] = mirror(triplet) if side == "left" else triplet
+    return joints
+
+
+def side_landmarks(exercise):
+    """(sides, n) landmark indices whose visibility decides which side to count with."""
+    names = sorted({name for t in (exercise.triplet,) + tuple(c.triplet for c in exercise.constraints)
+                    for name in t})
+    rows = [names] + ([list(mirror(names))] if exercise.bilateral else [])
+    return np.array([[INDEX[name] for name in row] for row in rows], dtype=np.intp)
+
+
+def calculate_angle(a, b, c):
+    """Scalar reference for one angle; the counters use angles.AngleEngine."""
+    a = np.array(a)
+    b = np.array(b)
+    c = np.array(c)
+
+    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
+    angle = np.abs(radians * 180.0 / np.pi)
+
+    if angle > 180.0:
+        angle = 360 - angle
+
+    return angle
+
+
+class RepCounter:
+    """Hysteresis state machine for one exercise; indices are resolved once here.
+
+    landmark_filter smooths the landmark buffer before the angle is taken
+    and angle_filter smooths the angle; each is a filters.FILTERS name or a
+    filter instance. Timestamps are in seconds and default to the clock at
+    the call; offline callers should pass the frame's own time.
+
+    Both sides and every constraint come out of one AngleEngine pass over
+    the same buffer. side is the side currently counted; violations names
+    the constraints broken in the last frame, and faults counts the cycles
+    (armed, counted and back) in which any constraint broke.
+
+    tempo (tempo.TempoTracker) keeps running statistics of rep and phase
+    times and range of motion.
+
+    listener(event_type, **fields), e.g. events.EventBus.emit, is called on
+    every phase change ("phase"), counted rep ("rep") and rep timed by
+    tempo ("tempo", once the angle is back at the reset end, or at finish()).
+    """
+
+    def __init__(self, exercise, landmark_filter=None, angle_filter=None, listener=None):
+        if isinstance(exercise, str):
+            exercise = EXERCISES[exercise]
+        self.exercise = exercise
+        self.listener = listener
+        self.joints = exercise_joints(exercise)
+        self.sides = SIDES[:1 + exercise.bilateral]
+        self.engine = AngleEngine(self.joints)
+        self.points = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.landmark_filter = make_filter(landmark_filter, self.engine.points.shape, "landmarks")
+        self.angle_filter = make_filter(angle_filter, (1,), "degrees")
+        self._angle = np.zeros(1, dtype=np.float32)
+        # Side score = mean visibility of the side's landmarks, as one dot product
+        self._side_weights = np.zeros((len(self.sides), NUM_LANDMARKS), dtype=np.float32)
+        for weights, indices in zip(self._side_weights, side_landmarks(exercise)):
+            weights[indices] = 1.0 / len(indices)
+        self._scores = np.empty(len(self.sides), dtype=np.float32)
+
+        # Flip signs for falling exercises so one comparison pair serves all
+        self._sign = 1.0 if exercise.count_at > exercise.reset_at else -1.0
+        self._reset_at = self._sign * exercise.reset_at
+        self._count_at = self._sign * exercise.count_at
+        self.tempo = TempoTracker(exercise)
+        self.reset()
+
+    def reset(self):
+        self.reps = 0
+        self.counted = False
+        self.angle = None
+        self._held = 0
+        self._phase_start = None
+        self._side = None
+        self.violations = ()
+        self.faults = 0
+        self._fault = False
+        self.tempo.reset()
+        for f in (self.landmark_filter, self.angle_filter):
+            if f is not None:
+                f.reset()
+
+    @property
+    def state(self):
+        return self.exercise.phases[self.counted]
+
+    @property
+    def side(self):
+        return None if self._side is None else self.sides[self._side]
+
+    def update(self, landmarks, timestamp=None):
+        """Feeds one frame of MediaPipe landmarks; returns True when a rep completes."""
+        points = fill_array(landmarks, self.points)
+        self.engine.points[:] = points[:, :3]
+        if self.landmark_filter is not None:
+            self.landmark_filter(self.engine.points, timestamp)
+        angles = self.engine.compute()
+        return self.evaluate(angles, self.side_scores(points), timestamp)
+
+    def side_scores(self, points):
+        """Mean landmark visibility of each side for a (33, 4) array; reuses one buffer."""
+        return np.dot(self._side_weights, points[:, 3], out=self._scores)
+
+    def evaluate(self, angles, scores, timestamp=None):
+        """Counts from one frame's angles (in self.joints order) and side_scores()."""
+        scores = scores.tolist()
+        best = scores.index(max(scores))
+        if self._side is None or scores[best] > scores[self._side] + SIDE_MARGIN:
+            self._side = best
+        row = angles.reshape(len(self.sides), -1)[self._side].tolist()
+
+        if self.exercise.constraints:
+            self.violations = tuple(c.name for c, angle in zip(self.exercise.constraints, row[1:])
+                                    if not c.min_angle <= angle <= c.max_angle)
+            if self.violations and not self._fault:
+                self._fault = True
+                self.faults += 1
+
+        was_counted = self.counted
+        counted = self.update_angle(row[0], timestamp)
+        if was_counted and not self.counted:
+            self._fault = False  # re-armed: the next cycle starts clean
+        return counted
+
+    def update_angle(self, angle, timestamp=None):
+        if self.angle_filter is not None:
+            self._angle[0] = angle
+            angle = float(self.angle_filter(self._angle, timestamp)[0])
+        self.angle = angle
+        t = time.monotonic() if timestamp is None else timestamp
+        changed = self._step(angle, t)
+        rep = self.tempo.update(angle, t, self.counted)
+        if changed and self.listener is not None:
+            self._notify(angle, t)
+        if rep is not None and self.listener is not None:
+            self._notify_tempo(rep)
+        return changed and self.counted
+
+    def finish(self, timestamp=None):
+        """Call when the session stops: times the last rep if it came back to the reset end (see TempoTracker)."""
+        rep = self.tempo.finish(time.monotonic() if timestamp is None else timestamp)
+        if rep is not None and self.listener is not None:
+            self._notify_tempo(rep)
+        return rep
+
+    def _notify_tempo(self, rep):
+        self.listener("tempo", exercise=self.exercise.name, rep=rep.rep, timestamp=rep.timestamp,
+                      seconds=round(rep.seconds, 3), concentric=round(rep.concentric, 3),
+                      eccentric=round(rep.eccentric, 3), rom=round(rep.rom, 1), side=self.side)
+
+    def _step(self, angle, t):
+        # The hysteresis; True when the phase changes on this frame
+        signed = self._sign * angle
+        if self.counted:
+            crossed = signed < self._reset_at
+        else:
+            crossed = signed > self._count_at
+        if not crossed:
+            self._held = 0
+            return False
+
+        self._held += 1
+        if self._held < self.exercise.hold:
+            return False
+        if self.exercise.min_phase > 0.0:
+            if self._phase_start is not None and t - self._phase_start < self.exercise.min_phase:
+                return False
+            self._phase_start = t
+
+        self._held = 0
+        self.counted = not self.counted
+        if self.counted:
+            self.reps += 1
+        return True
+
+    def _notify(self, angle, timestamp):
+        fields = {
+            "exercise": self.exercise.name,
+            "timestamp": timestamp,
+            "angle": round(angle, 1),
+            "side": self.side,
+        }
+        self.listener("phase", phase=self.state, **fields)
+        if self.counted:
+            self.listener("rep", reps=self.reps, faults=self.faults, **fields)
@@ -0,0 +1,106 @@
+"""Frame overlays drawn with a handful of OpenCV calls per frame."""
+import cv2
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, POSE_CONNECTIONS, fill_array
+
+WHITE = (255, 255, 255)
+
+
+class SkeletonRenderer:
+    """Draws a pose like mp_drawing.draw_landmarks in four cv2.polylines calls.
+
+    Connection indices are resolved once; each frame the landmarks are
+    converted to pixels in one array, every visible connection goes into a
+    single polylines call, and the dots are zero-length segments whose round
+    caps give filled disks (white border, then color). As in MediaPipe,
+    landmarks below min_visibility or outside the image are skipped along
+    with their connections.
+    """
+
+    def __init__(self, landmark_color=(255, 0, 0), connection_color=(224, 224, 224),
+                 thickness=2, circle_radius=2, min_visibility=0.5, connections=POSE_CONNECTIONS):
+        self.landmark_color = landmark_color
+        self.connection_color = connection_color
+        self.thickness = thickness
+        self.min_visibility = min_visibility
+        self._dot = 2 * circle_radius + thickness
+        self._border = 2 * max(circle_radius + 1, int(circle_radius * 1.2)) + thickness
+
+        pairs = np.array(connections, dtype=np.intp)
+        self._start = pairs[:, 0].copy()
+        self._end = pairs[:, 1].copy()
+        self._points = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._scaled = np.empty((NUM_LANDMARKS, 2), dtype=np.float32)
+        self._pixels = np.empty((NUM_LANDMARKS, 2), dtype=np.int32)
+        self._visible = np.empty(NUM_LANDMARKS, dtype=bool)
+        self._segments = np.empty((len(pairs), 2, 2), dtype=np.int32)
+        self._dots = np.empty((NUM_LANDMARKS, 2, 2), dtype=np.int32)
+
+    def draw(self, image, landmarks):
+        """Draws a MediaPipe landmark list (e.g. result.pose_landmarks.landmark) on image."""
+        fill_array(landmarks, self._points)
+        self.draw_points(image, self._points)
+
+    def draw_points(self, image, points):
+        """Draws normalized (33, 4) x, y, z, visibility points on image."""
+        h, w = image.shape[:2]
+        xy = points[:, :2]
+        visible = self._visible
+        np.greater_equal(points[:, 3], self.min_visibility, out=visible)
+        visible &= (xy >= 0.0).all(axis=1)
+        visible &= (xy <= 1.0).all(axis=1)
+
+        np.multiply(xy, (w, h), out=self._scaled)
+        np.floor(self._scaled, out=self._scaled)
+        np.minimum(self._scaled, (w - 1, h - 1), out=self._scaled)
+        pixels = self._pixels
+        pixels[:] = self._scaled
+
+        linked = visible[self._start] & visible[self._end]
+        if linked.any():
+            np.take(pixels, self._start, axis=0, out=self._segments[:, 0])
+            np.take(pixels, self._end, axis=0, out=self._segments[:, 1])
+            cv2.polylines(image, self._segments[linked], False, self.connection_color, self.thickness)
+
+        if visible.any():
+            self._dots[:, 0] = pixels
+            self._dots[:, 1] = pixels
+            dots = self._dots[visible]
+            cv2.polylines(image, dots, False, WHITE, self._border)
+            cv2.polylines(image, dots, False, self.landmark_color, self._dot)
+
+
+class StatusBox:
+    """Text panel whose background and fixed labels are rendered once.
+
+    labels are (text, (x, y), scale, thickness) drawn into the cached
+    background; fields are ((x, y), scale, thickness) slots for the values
+    passed to draw(). The panel is redrawn only when the values change, so
+    a typical frame costs one copy into the image.
+    """
+
+    def __init__(self, size, labels, fields, background=(20, 20, 20), color=WHITE):
+        width, height = size
+        self.fields = fields
+        self.color = color
+        self._base = np.empty((height, width, 3), dtype=np.uint8)
+        self._base[:] = background
+        for text, position, scale, thickness in labels:
+            cv2.putText(self._base, text, position, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness, cv2.LINE_AA)
+        self._panel = self._base.copy()
+        self._values = None
+
+    def draw(self, image, *values, origin=(0, 0)):
+        if values != self._values:
+            self._panel[:] = self._base
+            for text, (position, scale, thickness) in zip(values, self.fields):
+                cv2.putText(self._panel, text, position, cv2.FONT_HERSHEY_SIMPLEX, scale, self.color,
+                            thickness, cv2.LINE_AA)
+            self._values = values
+
+        x, y = origin
+        h, w = self._panel.shape[:2]
+        h = min(h, image.shape[0] - y)
+        w = min(w, image.shape[1] - x)
+        image[y:y + h, x:x + w] = self._panel[:h, :w]
@@ -0,0 +1,372 @@
+"""Structured session events (rep, phase, tempo, session start/stop) delivered to pluggable sinks.
+
+EventBus.emit() only appends to an in-memory queue, so it is safe to call
+from the frame loop; a writer thread hands the events to every sink in
+batches. Sinks are chosen with specs (see make_sink):
+
+    sessions/events.jsonl       JSON Lines file, appended to
+    tcp://127.0.0.1:9200        newline-delimited JSON over TCP
+    unix:///tmp/landmarks.sock  the same over a Unix socket
+    ws://127.0.0.1:9200/events  one WebSocket text message (a JSON array) per batch
+
+A local stand-in backend prints whatever it receives on TCP or WebSocket:
+    python events.py --port 9200
+"""
+import argparse
+import base64
+import collections
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+
+
+class EventBus:
+    """Non-blocking event queue drained by one writer thread.
+
+    Every event is a dict with "type", "time" (Unix time when emitted), the
+    bus context (e.g. the app name) and the emitted fields. At most maxsize
+    events wait in memory; beyond that the oldest are dropped and counted
+    in dropped. A sink error is passed to on_error (or printed) and only
+    loses that batch for that sink.
+    """
+
+    def __init__(self, sinks, context=None, batch_size=256, flush_interval=0.25, maxsize=10000, on_error=None):
+        self.sinks = list(sinks)
+        self.context = dict(context or {})
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.emitted = 0
+        self.dropped = 0
+        self._queue = collections.deque(maxlen=maxsize)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._writer_loop, name="event-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def emit(self, event_type, **fields):
+        event = {"type": event_type, "time": time.time()}
+        event.update(self.context)
+        event.update(fields)
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        self.emitted += 1
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def close(self):
+        """Delivers what is queued, then closes the sinks."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(5.0)
+        else:
+            self._drain()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                self._error(e)
+
+    def _writer_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            for sink in self.sinks:
+                try:
+                    sink.write(batch)
+                except Exception as e:
+                    self._error(e)
+
+    def _error(self, exc):
+        if self.on_error is not None:
+            self.on_error(exc)
+        else:
+            print(f"event sink error: {type(exc).__name__}: {exc}", file=sys.stderr)
+
+
+class MemorySink:
+    """Keeps every event in a list; a stand-in backend for tests and tools."""
+
+    def __init__(self):
+        self.events = []
+        self.batches = 0
+
+    def write(self, events):
+        self.events.extend(events)
+        self.batches += 1
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """Appends one JSON object per line to a file, flushed after each batch."""
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, events):
+        self._file.write("".join(json.dumps(event) + "\n" for event in events))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class SocketSink:
+    """Newline-delimited JSON over TCP ((host, port)) or a Unix socket (a path).
+
+    The connection is opened lazily and re-opened after a failure, at most
+    once every retry seconds; batches written while the backend is down
+    are lost (and reported as errors) rather than buffered without bound.
+    """
+
+    def __init__(self, address, timeout=2.0, retry=5.0):
+        self.address = address
+        self.timeout = timeout
+        self.retry = retry
+        self._sock = None
+        self._next_attempt = 0.0
+
+    def write(self, events):
+        self._send(("".join(json.dumps(event) + "\n" for event in events)).encode("utf-8"))
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _send(self, data):
+        if self._sock is None:
+            if time.monotonic() < self._next_attempt:
+                raise ConnectionError(f"{self.address} unavailable, retrying in at most {self.retry:.0f} s")
+            self._next_attempt = time.monotonic() + self.retry
+            self._sock = self._connect()
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class WebSocketSink(SocketSink):
+    """Sends each batch as one WebSocket text message holding a JSON array.
+
+    A minimal RFC 6455 client on the standard library (ws:// only); the
+    server's messages are never read.
+    """
+
+    def __init__(self, url, timeout=2.0, retry=5.0):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != "ws":
+            raise ValueError(f"unsupported WebSocket URL {url!r}; only ws:// is supported")
+        super().__init__((parts.hostname, parts.port or 80), timeout, retry)
+        self.host = parts.netloc
+        self.resource = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    def write(self, events):
+        self._send(ws_frame(json.dumps(events).encode("utf-8"), mask=True))
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.sendall(ws_frame(b"", opcode=0x8, mask=True))
+            except OSError:
+                pass
+        super().close()
+
+    def _connect(self):
+        sock = super()._connect()
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (f"GET {self.resource} HTTP/1.1\r\nHost: {self.host}\r\nUpgrade: websocket\r\n"
+                   f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        try:
+            sock.sendall(request.encode("ascii"))
+            response = b""
+            while b"\r\n\r\n" not in response:
+                chunk = sock.recv(1024)
+                if not chunk:
+                    raise ConnectionError("connection closed during the WebSocket handshake")
+                response += chunk
+            status = response.split(b"\r\n", 1)[0]
+            if status.split()[1:2] != [b"101"]:
+                raise ConnectionError(f"WebSocket handshake refused: {status.decode('latin-1')}")
+            if ws_accept(key).encode("ascii") not in response:
+                raise ConnectionError("WebSocket handshake returned the wrong accept key")
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def ws_accept(key):
+    """Sec-WebSocket-Accept value for a handshake's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def ws_mask(payload, key):
+    """Masks or unmasks a payload: XOR with the repeated 4-byte key, as one big-integer operation."""
+    n = len(payload)
+    if not n:
+        return b""
+    repeated = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(n, "big")
+
+
+def ws_frame(payload, opcode=0x1, mask=False):
+    """One final WebSocket frame; clients must mask what they send."""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    return bytes(header) + key + ws_mask(payload, key)
+
+
+def make_sink(spec):
+    """Builds a sink from a spec: a file path, tcp://host:port, unix:///path, ws://... or memory."""
+    if spec == "memory":
+        return MemorySink()
+    parts = urllib.parse.urlsplit(spec)
+    if parts.scheme == "tcp":
+        return SocketSink((parts.hostname, parts.port))
+    if parts.scheme == "unix":
+        return SocketSink(parts.path)
+    if parts.scheme == "ws":
+        return WebSocketSink(spec)
+    if parts.scheme:
+        raise ValueError(f"unknown event sink {spec!r}")
+    return JsonlSink(spec)
+
+
+def make_bus(specs, context=None, on_error=None):
+    """An EventBus over comma-separated sink specs, already started; None when specs is empty."""
+    specs = [spec.strip() for spec in (specs or "").split(",") if spec.strip()]
+    if not specs:
+        return None
+    return EventBus([make_sink(spec) for spec in specs], context, on_error=on_error).start()
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    # Newline-delimited JSON, or a WebSocket upgrade followed by client frames
+
+    def handle(self):
+        first = self.rfile.readline()
+        if first.startswith(b"GET "):
+            self._websocket()
+            return
+        line = first
+        while line:
+            self.server.received(line)
+            line = self.rfile.readline()
+
+    def _websocket(self):
+        key = None
+        for line in iter(self.rfile.readline, b"\r\n"):
+            if not line:
+                return
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        self.wfile.write((f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n").encode("ascii"))
+        while True:
+            head = self.rfile.read(2)
+            if len(head) < 2 or head[0] & 0x0F == 0x8:
+                return
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.rfile.read(8))[0]
+            key = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+            payload = ws_mask(self.rfile.read(length), key)
+            for event in json.loads(payload):
+                self.server.received(json.dumps(event).encode("utf-8"))
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """Local stand-in backend accepting the socket and WebSocket sinks; prints each event."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, out=sys.stdout):
+        super().__init__(address, _StandInHandler)
+        self.out = out
+        self._lock = threading.Lock()
+
+    def received(self, line):
+        with self._lock:
+            self.out.write(line.decode("utf-8").rstrip("\n") + "\n")
+            self.out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in backend: print events sent by tcp:// or ws:// sinks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args(argv)
+
+    server = StandInServer((args.host, args.port))
+    print(f"listening on {args.host}:{args.port} (tcp:// and ws://)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Incremental temporal filters for landmark and angle arrays.
+
+Each filter keeps its state in preallocated arrays of a fixed shape and
+smooths an array of that shape in place, one frame at a time.
+"""
+import math
+import time
+
+import numpy as np
+
+
+class OneEuroFilter:
+    """One Euro filter (Casiez et al., 2012), elementwise over an array.
+
+    The cutoff frequency rises with the estimated speed, so slow jitter is
+    smoothed heavily while fast movements pass with little lag. min_cutoff
+    (Hz) sets the smoothing at rest, beta how quickly it relaxes with speed.
+    """
+
+    def __init__(self, shape, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.shape = shape
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x = np.zeros(shape, dtype=np.float32)
+        self._dx = np.zeros(shape, dtype=np.float32)
+        self._alpha = np.empty(shape, dtype=np.float32)
+        self._t = None
+
+    def reset(self):
+        self._t = None
+
+    def __call__(self, x, timestamp=None):
+        """Smooths x in place and returns it; timestamp is in seconds."""
+        t = time.monotonic() if timestamp is None else timestamp
+        if self._t is None:
+            self._x[...] = x
+            self._dx.fill(0.0)
+            self._t = t
+            return x
+
+        dt = t - self._t
+        if dt <= 0.0:
+            dt = 1.0 / 30.0
+        self._t = t
+
+        # Speed, itself low-passed at d_cutoff
+        a_d = _alpha(dt, self.d_cutoff)
+        alpha = self._alpha
+        np.subtract(x, self._x, out=alpha)
+        alpha *= a_d / dt
+        self._dx *= 1.0 - a_d
+        self._dx += alpha
+
+        # alpha = 1 / (1 + tau / dt) = 1 - 1 / (1 + dt / tau), tau = 1 / (2 pi cutoff)
+        np.abs(self._dx, out=alpha)
+        alpha *= self.beta
+        alpha += self.min_cutoff
+        alpha *= 2.0 * math.pi * dt
+        alpha += 1.0
+        np.reciprocal(alpha, out=alpha)
+        np.subtract(1.0, alpha, out=alpha)
+
+        # x_hat = x_prev + alpha * (x - x_prev)
+        x -= self._x
+        x *= alpha
+        x += self._x
+        self._x[...] = x
+        return x
+
+
+class KalmanFilter:
+    """Constant-velocity Kalman filter, one independent 2-state model per element.
+
+    process_noise is the white-acceleration spectral density and
+    measurement_noise the variance of a raw sample, in the input's units.
+    """
+
+    def __init__(self, shape, process_noise=1.0, measurement_noise=1e-4):
+        self.shape = shape
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self._p = np.zeros(shape, dtype=np.float32)    # position
+        self._v = np.zeros(shape, dtype=np.float32)    # velocity
+        self._p00 = np.zeros(shape, dtype=np.float32)  # covariance terms
+        self._p01 = np.zeros(shape, dtype=np.float32)
+        self._p11 = np.zeros(shape, dtype=np.float32)
+        self._k0 = np.empty(shape, dtype=np.float32)
+        self._k1 = np.empty(shape, dtype=np.float32)
+        self._y = np.empty(shape, dtype=np.float32)
+        self._t = None
+
+    def reset(self):
+        self._t = None
+
+    def __call__(self, x, timestamp=None):
+        """Smooths x in place and returns it; timestamp is in seconds."""
+        t = time.monotonic() if timestamp is None else timestamp
+        if self._t is None:
+            self._p[...] = x
+            self._v.fill(0.0)
+            self._p00.fill(self.measurement_noise)
+            self._p01.fill(0.0)
+            self._p11.fill(self.process_noise)
+            self._t = t
+            return x
+
+        dt = t - self._t
+        if dt <= 0.0:
+            dt = 1.0 / 30.0
+        self._t = t
+        q = self.process_noise
+        p00, p01, p11, k0, k1, y = self._p00, self._p01, self._p11, self._k0, self._k1, self._y
+
+        # Predict: F = [[1, dt], [0, 1]], Q for white acceleration
+        np.multiply(self._v, dt, out=k0)
+        self._p += k0
+        np.multiply(p11, dt * dt, out=k0)
+        k0 += p00
+        np.multiply(p01, 2.0 * dt, out=p00)
+        p00 += k0
+        p00 += q * dt ** 3 / 3.0
+        np.multiply(p11, dt, out=k1)
+        p01 += k1
+        p01 += q * dt * dt / 2.0
+        p11 += q * dt
+
+        # Update with the measurement
+        np.subtract(x, self._p, out=y)
+        np.add(p00, self.measurement_noise, out=k1)
+        np.divide(p01, k1, out=k1)                   # k1 = p01 / S
+        np.add(p00, self.measurement_noise, out=k0)
+        np.divide(p00, k0, out=k0)                   # k0 = p00 / S
+        np.multiply(k1, p01, out=x)
+        p11 -= x
+        np.multiply(k0, y, out=x)
+        self._p += x
+        np.multiply(k1, y, out=x)
+        self._v += x
+        np.subtract(1.0, k0, out=k0)
+        p00 *= k0
+        p01 *= k0
+
+        x[...] = self._p
+        return x
+
+
+def _alpha(dt, cutoff):
+    return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+
+FILTERS = {
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+# Settings per filter for normalized landmark coordinates and for angles in
+# degrees, tuned on a 0.5 Hz rep with typical MediaPipe jitter at 30 FPS
+PRESETS = {
+    ("one_euro", "landmarks"): dict(min_cutoff=1.0, beta=20.0),
+    ("one_euro", "degrees"): dict(min_cutoff=1.0, beta=0.02),
+    ("kalman", "landmarks"): dict(process_noise=0.5, measurement_noise=1.6e-5),
+    ("kalman", "degrees"): dict(process_noise=3e3, measurement_noise=9.0),
+}
+
+
+def make_filter(spec, shape, units="landmarks"):
+    """Returns a filter from a FILTERS name with its preset for units, passes an instance through, or None."""
+    if spec is None or spec == "none":
+        return None
+    if isinstance(spec, str):
+        return FILTERS[spec](shape, **PRESETS.get((spec, units), {}))
+    return spec
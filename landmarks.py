@@ -0,0 +1,77 @@
+"""MediaPipe Pose landmark layout, conversion to NumPy buffers and MediaPipe-shaped results."""
+from typing import NamedTuple
+
+import numpy as np
+
+LANDMARK_NAMES = (
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER", "LEFT_EAR", "RIGHT_EAR",
+    "MOUTH_LEFT", "MOUTH_RIGHT", "LEFT_SHOULDER", "RIGHT_SHOULDER",
+    "LEFT_ELBOW", "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST",
+    "LEFT_PINKY", "RIGHT_PINKY", "LEFT_INDEX", "RIGHT_INDEX",
+    "LEFT_THUMB", "RIGHT_THUMB", "LEFT_HIP", "RIGHT_HIP",
+    "LEFT_KNEE", "RIGHT_KNEE", "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL", "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+)
+
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+
+# Same values as mp_pose.PoseLandmark, without importing mediapipe
+INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+FIELDS = ("x", "y", "z", "visibility")
+
+# Same pairs as mp_pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = (
+    (0, 1), (0, 4), (1, 2), (2, 3), (3, 7), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (11, 23), (12, 14), (12, 24), (13, 15), (14, 16),
+    (15, 17), (15, 19), (15, 21), (16, 18), (16, 20), (16, 22), (17, 19), (18, 20),
+    (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29), (27, 31),
+    (28, 30), (28, 32), (29, 31), (30, 32),
+)
+
+
+def fill_array(landmarks, out):
+    """Copies a landmark list into out, shape (33, k), taking the first k of x, y, z, visibility."""
+    k = out.shape[-1]
+    if k == 3:
+        out[:] = [(lm.x, lm.y, lm.z) for lm in landmarks]
+    elif k == 4:
+        out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+    else:
+        out[:] = [(lm.x, lm.y) for lm in landmarks]
+    return out
+
+
+def to_array(landmarks, fields=4):
+    """Returns a new (33, fields) float32 array for a landmark list."""
+    return fill_array(landmarks, np.empty((NUM_LANDMARKS, fields), dtype=np.float32))
+
+
+class Landmark:
+    """Mutable stand-in for a MediaPipe NormalizedLandmark, for results built outside MediaPipe."""
+    __slots__ = FIELDS
+
+    def __init__(self, x, y, z, visibility):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+    def __repr__(self):
+        return f"Landmark(x={self.x}, y={self.y}, z={self.z}, visibility={self.visibility})"
+
+
+class LandmarkList(NamedTuple):
+    """Same shape as a MediaPipe NormalizedLandmarkList: landmarks are in .landmark."""
+    landmark: list
+
+
+class PoseResult(NamedTuple):
+    """Same shape as a MediaPipe Pose result; pose_landmarks is None without a detection."""
+    pose_landmarks: LandmarkList
+
+
+def to_landmarks(points):
+    """LandmarkList from a (33, 4) array of x, y, z, visibility."""
+    return LandmarkList([Landmark(*values) for values in points.tolist()])
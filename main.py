@@ -1,36 +1,133 @@
+import functools
+import os
 import sys
+import threading
+import time
+
+from startup import BackgroundLoader, StartupClock
+
+startup = StartupClock()
+
 import cv2
-import mediapipe as mp
 import numpy as np
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
+from backends import backend_factory
+from capture import CameraCapture
+from counting import RepCounter
+from drawing import SkeletonRenderer
+from events import make_bus
+from metrics import Metrics, MetricsOverlay, MetricsServer
+from multiperson import MultiPersonCounter, draw_tracks
+from pipeline import BufferRing, FramePipeline, LatestFrame
+from pose_process import PoseProcess, build_scheduler
+from recording import LandmarkRecorder
+from timing import StageTimer
+from ui import load_ui
+
+# Landmark recordings (see recording.py) are written here when REC is checked
+SESSIONS_DIR = "sessions"
+
+# Session events (see events.py) go to these comma-separated sinks; point
+# LANDMARKS_EVENTS at e.g. tcp://host:port or ws://host:port/path to push them to a backend
+EVENT_SINKS = os.environ.get("LANDMARKS_EVENTS", os.path.join(SESSIONS_DIR, "events.jsonl"))
+
+# Frames are resized to this (width, height) for inference, independent of the window size
+INFERENCE_SIZE = (640, 480)
+
+# Requested from the camera, which may pick its nearest mode; MJPG allows 30 FPS over USB 2
+CAMERA_SIZE = (640, 480)
+CAMERA_FPS = 30
+CAMERA_FOURCC = "MJPG"
+
+# MediaPipe's default colors, swapped to RGB because we draw on the RGB frame
+SKELETON = SkeletonRenderer(landmark_color=(255, 0, 0), connection_color=(224, 224, 224))
+
+TARGET_FPS = 30
+
+# Most people counted at once when GROUP is checked
+GROUP_MAX_PEOPLE = 6
+
+# Runs pose inference in its own process (LANDMARKS_POSE_PROCESS=1), keeping the GUI process free
+POSE_PROCESS = os.environ.get("LANDMARKS_POSE_PROCESS", "") == "1"
+
+# Pose model behind pose.process (see backends.py): mediapipe, or onnx:path/to/model.onnx for ONNX Runtime
+POSE_BACKEND = os.environ.get("LANDMARKS_POSE_BACKEND", "mediapipe")
+
+# With LANDMARKS_PROFILE=1 the startup milestones are printed as they are reached,
+# and the per-stage timing report on exit
+PROFILE = os.environ.get("LANDMARKS_PROFILE", "") == "1"
+if PROFILE:
+    startup.log = print
+
+# Prometheus-style metrics are served at http://127.0.0.1:METRICS_PORT/metrics while the app runs
+METRICS_PORT = 9108
+
+# Built by build_pose() on a background thread once the window is up
+pose = None
+
+metrics = Metrics()
+metrics.gauge("inference_fps", lambda: pose.fps if pose else 0.0)
+metrics.gauge("model_complexity", lambda: pose.complexity if pose else -1)
+metrics.counter("pose_cache_hits", lambda: pose.cache_hits if pose else 0)
+metrics.counter("pose_cache_misses", lambda: pose.cache_misses if pose else 0)
+timer = StageTimer(listener=metrics.observe)
+
+
+def build_pose():
+    if POSE_PROCESS:
+        # Frames and landmarks cross through shared memory; mediapipe is only imported by the child
+        return PoseProcess(INFERENCE_SIZE, dict(target_fps=TARGET_FPS, mode=1, backend=POSE_BACKEND))
+    # mediapipe takes about a second to import, so build_scheduler imports it here rather than at startup
+    scheduler = build_scheduler(target_fps=TARGET_FPS, mode=1, backend=POSE_BACKEND)
+    width, height = INFERENCE_SIZE
+    scheduler.warm_up(np.zeros((height, width, 3), dtype=np.uint8))
+    return scheduler
+
+
+def build_group(exercise, listener=None):
+    # Group mode: one pose backend and RepCounter per person found by multiperson's detector
+    make_pose = backend_factory(POSE_BACKEND, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    return MultiPersonCounter(
+        lambda: make_pose(0),
+        exercise, max_people=GROUP_MAX_PEOPLE, landmark_filter="one_euro", listener=listener
+    )
+
+
+def count_dropped_frame():
+    # A camera frame replaced by a newer one before inference took it
+    metrics.incr("frames_captured")
+    metrics.incr("frames_dropped")
 
-pose = mp_pose.Pose(
-    min_detection_confidence=0.7,   
-    min_tracking_confidence=0.7,  
-    model_complexity=2,            
-    smooth_landmarks=True          
-)
 
 class AppMP(QtWidgets.QMainWindow):
+    frame_ready = pyqtSignal()
+    model_ready = pyqtSignal(object)
+    model_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
-        uic.loadUi("interface.ui", self)
+        load_ui("interface.ui", self)
         
         self.cap = None
-        self.timer = None
+        self.pipeline = None
+        width, height = INFERENCE_SIZE
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.frame_buffers = BufferRing((height, width, 3))
         self.camera_on = False
         self.exercise_started = False
         
-        self.selected_exercise = 0 
+        self.selected_exercise = None
         self.target_reps = 0
-        self.rep_counter = 0
-        self.exercise_state = None
+        self.counter = None
+        self.counter_lock = threading.Lock()  # the render thread's update() vs finish() on STOP
+        self.group = None
+        self.recorder = None
+        self.session = None
+        self.tempo_reps = 0  # timed reps shown in label_tempo
 
         self.lcdNumber_2.display(self.target_reps)
 
@@ -41,16 +138,93 @@ class AppMP(QtWidgets.QMainWindow):
         self.btn_start_exercise.clicked.connect(self.toggle_exercise)
         self.btn_start_exercise.setEnabled(False)
 
+        self.spin_target_fps = QtWidgets.QSpinBox()
+        self.spin_target_fps.setRange(5, 60)
+        self.spin_target_fps.setSuffix(" FPS target")
+        self.spin_target_fps.setValue(TARGET_FPS)
+        self.spin_target_fps.valueChanged.connect(self.set_target_fps)
+        self.label_tempo = QtWidgets.QLabel()
+        self.statusbar.addPermanentWidget(self.label_tempo)
+        self.label_inference = QtWidgets.QLabel()
+        self.statusbar.addPermanentWidget(self.label_inference)
+        self.statusbar.addPermanentWidget(self.spin_target_fps)
+        self.check_record = QtWidgets.QCheckBox("REC")
+        self.check_record.setToolTip(f"Record landmarks to {SESSIONS_DIR}/ while exercising")
+        self.statusbar.addPermanentWidget(self.check_record)
+        self.check_group = QtWidgets.QCheckBox("GROUP")
+        self.check_group.setToolTip(f"Count reps for up to {GROUP_MAX_PEOPLE} people at once")
+        self.statusbar.addPermanentWidget(self.check_group)
+        self.show_stats = False
+        self.overlay = MetricsOverlay(metrics, timer, origin=(10, 25))
+        self.check_stats = QtWidgets.QCheckBox("STATS")
+        self.check_stats.setToolTip("Show pipeline metrics on the video")
+        self.check_stats.toggled.connect(self.set_show_stats)
+        self.statusbar.addPermanentWidget(self.check_stats)
+        metrics.gauge("camera_fps", lambda: self.cap.fps if self.cap else 0.0)
+
+        # Shown in a warning once the window is up; the app runs without these
+        disabled = []
+        try:
+            self.metrics_server = MetricsServer(metrics, METRICS_PORT).start()
+        except OSError as e:
+            self.metrics_server = None
+            disabled.append(f"Metrics endpoint disabled: {e}")
+
+        try:
+            self.events = make_bus(EVENT_SINKS, {"app": "AppMP"}, on_error=metrics.record_exception)
+        except (OSError, ValueError) as e:
+            self.events = None
+            disabled.append(f"Session events disabled: {e}")
+        if disabled:
+            QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Warning", "\n".join(disabled)))
+
+        # One rendered frame in flight to the GUI; its ring buffer is not reused while it waits
+        self.latest_frame = LatestFrame(self.frame_ready.emit, on_drop=lambda: metrics.incr("frames_dropped"))
+        self.frame_ready.connect(self.on_frame_ready)
+
+        # The camera button waits for the pose model, which loads in the background
+        self.btn_start_camera.setEnabled(False)
+        self.statusbar.showMessage("Loading pose model...")
+        self.model_ready.connect(self.on_model_ready)
+        self.model_failed.connect(self.on_model_failed)
+        BackgroundLoader(build_pose, self.model_ready.emit, lambda e: self.model_failed.emit(str(e))).start()
+
+    def on_model_ready(self, scheduler):
+        global pose
+        pose = scheduler
+        pose.target_fps = self.spin_target_fps.value()
+        if isinstance(pose, PoseProcess):
+            # The RGB frames are written straight into the inference process's shared slots
+            self.frame_buffers = pose.buffers
+        startup.mark("model ready")
+        self.statusbar.showMessage("Pose model ready", 3000)
+        self.btn_start_camera.setEnabled(True)
+
+    def on_model_failed(self, message):
+        self.statusbar.clearMessage()
+        QMessageBox.critical(self, "Model Error", f"Unable to load the pose model: {message}")
+
     def toggle_camera(self):
         if not self.camera_on:
-            self.cap = cv2.VideoCapture(0)
+            self.cap = CameraCapture(0, CAMERA_SIZE, CAMERA_FPS, CAMERA_FOURCC, on_drop=count_dropped_frame)
             if not self.cap.isOpened():
+                self.cap.release()
+                self.cap = None
                 QMessageBox.critical(self, "Camera Error", "Unable to open the camera.")
                 return
-            
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.update_frame)
-            self.timer.start(30)
+            self.cap.start()
+            settings = self.cap.settings
+            self.statusbar.showMessage(
+                f"Camera {settings['width']}x{settings['height']} {settings['fps']:.0f} FPS {settings['fourcc']}")
+
+            self.pipeline = FramePipeline(
+                self.read_frame, self.infer_frame, self.render_frame,
+                self.latest_frame.put,
+                on_drop=lambda: metrics.incr("frames_dropped"),
+                on_error=metrics.record_exception,
+                threaded_capture=False
+            )
+            self.pipeline.start()
 
             self.btn_start_camera.setText("OFF")
             self.btn_start_camera.setStyleSheet("background-color: rgb(200, 50, 50); color: white;")
@@ -58,10 +232,12 @@ class AppMP(QtWidgets.QMainWindow):
             
             self.btn_start_exercise.setEnabled(True)
         else:
-            if self.timer:
-                self.timer.stop()
+            if self.pipeline:
+                self.pipeline.stop()
+                self.pipeline = None
             if self.cap:
                 self.cap.release()
+                self.cap = None
             
             self.camera_feed.clear()
             self.camera_feed.setText("OFF")
@@ -82,20 +258,31 @@ class AppMP(QtWidgets.QMainWindow):
         if not self.exercise_started:
 
             if self.radio_ex1.isChecked():
-                self.selected_exercise = 1  
+                self.selected_exercise = "jumping_jack"
             elif self.radio_ex2.isChecked():
-                self.selected_exercise = 2  
+                self.selected_exercise = "squat"
             elif self.radio_ex3.isChecked():
-                self.selected_exercise = 3  
+                self.selected_exercise = "abdominal"
             elif self.radio_ex4.isChecked():
-                self.selected_exercise = 4  
-
-            self.rep_counter = 0
-           
-            if self.selected_exercise == 3:
-                self.exercise_state = "down"
-            else:
-                self.exercise_state = "lowering"
+                self.selected_exercise = "bicep_curl"
+
+            if self.selected_exercise is not None:
+                self.session = f"{self.selected_exercise}-{time.strftime('%Y%m%d-%H%M%S')}"
+                listener = functools.partial(self.events.emit, session=self.session) if self.events else None
+                if self.check_group.isChecked():
+                    # Recordings hold one person's landmarks, so REC is ignored here
+                    self.counter = None
+                    self.group = build_group(self.selected_exercise, listener)
+                else:
+                    self.counter = RepCounter(self.selected_exercise, landmark_filter="one_euro", listener=listener)
+                    if self.check_record.isChecked():
+                        self.start_recording()
+                if listener:
+                    listener("session_start", exercise=self.selected_exercise, target=self.target_reps,
+                             group=self.group is not None)
+            self.label_tempo.clear()
+            self.tempo_reps = 0
+            self.check_group.setEnabled(False)
             
             self.exercise_started = True
             self.btn_start_exercise.setText("STOP")
@@ -108,129 +295,175 @@ class AppMP(QtWidgets.QMainWindow):
             self.btn_start_exercise.setStyleSheet("background-color: #0077AA; color: #fefefe;")
             self.group_exercicios.setEnabled(True)
             self.verticalLayout_2.setEnabled(True)
-
-            QMessageBox.information(self, "Status", "Exercise completed")
-
-    def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            return
-            
-        frame = cv2.resize(frame, (self.camera_feed.width(), self.camera_feed.height()))
-        frame = cv2.flip(frame, 1)
-        
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        image_rgb.flags.writeable = False
-        result = pose.process(image_rgb)
-        image_rgb.flags.writeable = True
-        processed_frame = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
-
-        try:
-            if self.exercise_started and result.pose_landmarks:
-                landmarks = result.pose_landmarks.landmark
-                
-                # JUMPING JACK
-                if self.selected_exercise == 1:
-                    hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                           landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                    
-                    angle = self.calculate_angle(hip, shoulder, wrist)
-
-                    if angle < 40 and self.exercise_state == "raising":
-                        self.exercise_state = "lowering"
-                    if angle > 140 and self.exercise_state == "lowering":
-                        self.exercise_state = "raising"
-                        self.rep_counter += 1
-
-                # SQUAT
-                elif self.selected_exercise == 2:
-                    hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                           landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-                    ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-                    angle = self.calculate_angle(hip, knee, ankle)
-
-                    if angle > 170 and self.exercise_state == "raising":
-                        self.exercise_state = "lowering"
-                    if angle < 90 and self.exercise_state == "lowering":
-                        self.exercise_state = "raising"
-                        self.rep_counter += 1
-
-                # ABDOMINAL
-                elif self.selected_exercise == 3:
-                    shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                           landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                    knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-
-                    angle = self.calculate_angle(shoulder, hip, knee)
-
-                    if angle > 150 and self.exercise_state == "raising":
-                        self.exercise_state = "down"
-                    if angle < 90 and self.exercise_state == "down":
-                        self.exercise_state = "raising"
-                        self.rep_counter += 1
-
-                # BICEP CURL
-                elif self.selected_exercise == 4:
-                    shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                    elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-                    wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                             landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                    
-                    angle = self.calculate_angle(shoulder, elbow, wrist)
-                    
-                    if angle > 160 and self.exercise_state == "raising":
-                        self.exercise_state = "lowering"
-                    if angle < 40 and self.exercise_state == "lowering":
-                        self.exercise_state = "raising"
-                        self.rep_counter += 1
-
-        except:
-            pass
-
+            self.check_group.setEnabled(True)
+            self.stop_recording()
+            people = self.stop_group()
+            # exercise_started is already False, so no update follows the last one under the lock
+            with self.counter_lock:
+                if self.counter:
+                    self.counter.finish()
+            if self.events and self.session:
+                reps = self.counter.reps if self.counter else max((p["reps"] for p in people), default=0)
+                self.events.emit("session_stop", session=self.session, exercise=self.selected_exercise,
+                                 reps=reps, faults=self.counter.faults if self.counter else None, people=people,
+                                 tempo=self.counter.tempo.summary() if self.counter else None)
+            self.session = None
+
+            message = "Exercise completed"
+            if self.counter and self.counter.faults:
+                message += f" ({self.counter.faults} reps with form faults)"
+            if self.counter and self.counter.tempo.rep_seconds.count:
+                message += f"\n{self.counter.tempo.describe()}"
+            QMessageBox.information(self, "Status", message)
+
+    def start_recording(self):
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        name = f"{self.session}.lmk"
+        self.recorder = LandmarkRecorder(os.path.join(SESSIONS_DIR, name))
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
+            self.statusbar.showMessage(f"Recorded {recorder.frames} frames to {recorder.path}")
+
+    def stop_group(self):
+        group, self.group = self.group, None
+        if not group:
+            return []
+        group.finish()
+        people = group.summary()
+        group.close()
+        return people
+
+    def read_frame(self):
+        # Waits only when the newest camera frame was already processed
+        with timer.measure("capture"):
+            frame = self.cap.read()
+        if frame is not None:
+            metrics.incr("frames_captured")
+        return frame
+
+    def infer_frame(self, frame):
+        timestamp = self.cap.timestamp
+        with timer.measure("resize"):
+            frame = cv2.resize(frame, INFERENCE_SIZE, dst=self.resized)
+
+        # The only color conversion: this RGB buffer is also drawn on and displayed
+        with timer.measure("color"):
+            image_rgb = self.frame_buffers.next()
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=image_rgb)
+            cv2.flip(image_rgb, 1, dst=image_rgb)
+
+        group = self.group
+        with timer.measure("inference"):
+            image_rgb.flags.writeable = False
+            if self.exercise_started and group:
+                result = group.process(image_rgb, timestamp)
+            else:
+                result = pose.process(image_rgb)
+            image_rgb.flags.writeable = True
+        startup.mark("first inference")
+        return image_rgb, result, timestamp
+
+    def render_frame(self, item):
+        image_rgb, result, timestamp = item
+        if isinstance(result, list):
+            return self.render_group(image_rgb, result)
+
+        counter = self.counter
+        recorder = self.recorder
+        metrics.incr("frames_processed")
         if result.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                processed_frame, 
-                result.pose_landmarks, 
-                mp_pose.POSE_CONNECTIONS
-            )
+            metrics.incr("detections")
+        with timer.measure("count"):
+            try:
+                with self.counter_lock:
+                    if self.exercise_started and counter and result.pose_landmarks:
+                        counter.update(result.pose_landmarks.landmark, timestamp)
+                if self.exercise_started and recorder:
+                    recorder.write(result.pose_landmarks.landmark if result.pose_landmarks else None, timestamp)
+            except Exception as e:
+                metrics.record_exception(e)
+
+        with timer.measure("draw"):
+            if result.pose_landmarks:
+                SKELETON.draw(image_rgb, result.pose_landmarks.landmark)
+
+        if self.show_stats:
+            self.overlay.draw(image_rgb)
+
+        reps = counter.reps if counter else 0
+        return image_rgb, reps
+
+    def render_group(self, image_rgb, tracks):
+        # Each track was already counted by MultiPersonCounter during inference
+        metrics.incr("frames_processed")
+        if any(track.landmarks is not None for track in tracks):
+            metrics.incr("detections")
+        with timer.measure("draw"):
+            draw_tracks(image_rgb, tracks, SKELETON)
+
+        if self.show_stats:
+            self.overlay.draw(image_rgb)
+
+        # The target is reached when the fastest person gets there
+        reps = max((track.counter.reps for track in tracks), default=0)
+        return image_rgb, reps
+
+    def on_frame_ready(self):
+        item = self.latest_frame.take()
+        if item is None or not self.camera_on:
+            return
+        rgb, rep_counter = item
 
         if self.exercise_started:
-            self.lcdNumber.display(self.rep_counter)
-
-            if self.rep_counter >= self.target_reps:
+            self.lcdNumber.display(rep_counter)
+            # Tempo changes once per rep, when the counter re-arms
+            counter = self.counter
+            if counter and counter.tempo.rep_seconds.count != self.tempo_reps:
+                self.tempo_reps = counter.tempo.rep_seconds.count
+                self.label_tempo.setText(counter.tempo.describe())
+
+            if rep_counter >= self.target_reps:
                 self.toggle_exercise()
 
-        self.display_frame_on_screen(processed_frame)
+        self.label_inference.setText(f"{pose.describe()} | {pose.fps:.0f} FPS | camera {self.cap.fps:.0f} FPS")
+        with timer.measure("display"):
+            self.display_frame_on_screen(rgb)
 
-    def display_frame_on_screen(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def display_frame_on_screen(self, rgb):
+        # QImage wraps the buffer without copying; the label scales it when painting
         h, w, ch = rgb.shape
         bytes_per_line = ch * w
         img = QImage(rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
         self.camera_feed.setPixmap(QPixmap.fromImage(img))
 
     def closeEvent(self, event):
-        if self.timer:
-            self.timer.stop()
+        if self.pipeline:
+            self.pipeline.stop()
         if self.cap:
             self.cap.release()
+        self.stop_recording()
+        self.stop_group()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.events:
+            self.events.close()
         
-        pose.close() 
+        if pose:
+            pose.close()
+        if PROFILE:
+            print(timer.report())
         event.accept()
     
+    def set_target_fps(self, value):
+        if pose:
+            pose.target_fps = value
+
+    def set_show_stats(self, checked):
+        self.show_stats = checked
+
     def increment_lcd2(self):
         self.target_reps += 1
         self.lcdNumber_2.display(self.target_reps)
@@ -240,22 +473,11 @@ class AppMP(QtWidgets.QMainWindow):
             self.target_reps -= 1
         self.lcdNumber_2.display(self.target_reps)
 
-    def calculate_angle(self, a, b, c):
-        a = np.array(a)
-        b = np.array(b)
-        c = np.array(c)
-        
-        radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-        angle = np.abs(radians * 180.0 / np.pi)
-        
-        if angle > 180.0:
-            angle = 360 - angle
-
-        return angle
-    
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     window = AppMP()
     window.show()
+    # Runs on the first event loop pass, once the window has been shown
+    QTimer.singleShot(0, lambda: startup.mark("window shown"))
     sys.exit(app.exec_())
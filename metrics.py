@@ -0,0 +1,192 @@
+"""Pipeline instrumentation: counters, stage latency histograms, exceptions by
+type, an on-frame overlay and a Prometheus text endpoint."""
+import bisect
+import collections
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+# Upper bounds in seconds of the stage latency histogram buckets (+Inf is implicit)
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2, 0.5)
+
+PREFIX = "landmarks_"
+
+# Counters exported from the start, even before their first increment
+COUNTERS = ("frames_captured", "frames_dropped", "frames_processed", "detections")
+
+
+class Histogram:
+    """Cumulative-on-export latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Metrics:
+    """Counters, per-stage histograms, exception counts, and callback counters and gauges.
+
+    Updates are a lock and an integer add, cheap enough for every frame.
+    Pass observe as the StageTimer listener to feed the stage histograms.
+    """
+
+    def __init__(self, buckets=BUCKETS, counters=COUNTERS):
+        self.buckets = buckets
+        self.counters = collections.Counter(dict.fromkeys(counters, 0))
+        self.exceptions = collections.Counter()
+        self.stages = {}
+        self._gauges = {}
+        self._counter_funcs = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def record_exception(self, exc):
+        with self._lock:
+            self.exceptions[type(exc).__name__] += 1
+
+    def gauge(self, name, func):
+        """Registers func() as the current value of gauge name."""
+        self._gauges[name] = func
+
+    def counter(self, name, func):
+        """Registers func() as the running total of counter name, kept by its owner (exported as name_total)."""
+        self._counter_funcs[name] = func
+
+    @property
+    def detection_rate(self):
+        processed = self.counters["frames_processed"]
+        return self.counters["detections"] / processed if processed else 0.0
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = dict(self.counters)
+            exceptions = dict(self.exceptions)
+            stages = {stage: (list(h.counts), h.sum, h.count) for stage, h in self.stages.items()}
+
+        lines = []
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {value}")
+        for name, func in self._counter_funcs.items():
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {int(func())}")
+
+        lines.append(f"# TYPE {PREFIX}exceptions_total counter")
+        for name, value in sorted(exceptions.items()):
+            lines.append(f'{PREFIX}exceptions_total{{type="{name}"}} {value}')
+
+        lines.append(f"# TYPE {PREFIX}detection_ratio gauge")
+        lines.append(f"{PREFIX}detection_ratio {self.detection_rate:.4f}")
+        for name, func in self._gauges.items():
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {float(func()):.6g}")
+
+        lines.append(f"# TYPE {PREFIX}stage_seconds histogram")
+        for stage, (counts, total, count) in stages.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def overlay_lines(self, timer=None):
+        """Short text lines for the on-frame overlay; timer adds per-stage p95."""
+        with self._lock:
+            counters = dict(self.counters)
+            exceptions = sum(self.exceptions.values())
+        lines = [
+            f"captured {counters.get('frames_captured', 0)}  dropped {counters.get('frames_dropped', 0)}",
+            f"detected {self.detection_rate:.0%}  errors {exceptions}",
+        ]
+        if timer is not None:
+            for stage, stats in timer.summary().items():
+                lines.append(f"{stage:<10} p95 {stats['p95_ms']:6.1f} ms")
+        return lines
+
+
+class MetricsOverlay:
+    """Draws the metrics as text on frames, refreshing the text at most every interval seconds.
+
+    Building the lines takes percentiles over the timer window, so it is
+    done a few times per second rather than on every frame.
+    """
+
+    def __init__(self, metrics, timer=None, origin=(10, 95), interval=0.5, color=(255, 255, 255)):
+        self.metrics = metrics
+        self.timer = timer
+        self.origin = origin
+        self.interval = interval
+        self.color = color
+        self._lines = []
+        self._refreshed = 0.0
+
+    def draw(self, image):
+        now = time.monotonic()
+        if now - self._refreshed >= self.interval:
+            self._lines = self.metrics.overlay_lines(self.timer)
+            self._refreshed = now
+
+        x, y = self.origin
+        height = 18 * len(self._lines) + 8
+        cv2.rectangle(image, (x - 5, y - 18), (x + 260, y - 18 + height), (20, 20, 20), -1)
+        for i, line in enumerate(self._lines):
+            cv2.putText(image, line, (x, y + 18 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.45,
+                        self.color, 1, cv2.LINE_AA)
+
+
+class MetricsServer:
+    """Serves Metrics.render() at http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = metrics.render().encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
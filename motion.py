@@ -0,0 +1,106 @@
+"""Static frame detection: reuse the last pose result while the scene does not change.
+
+Between sets and before START the camera sees nearly the same frame over
+and over; running pose inference on each of them only burns CPU. Frames
+are compared as small grayscale thumbnails, which costs a fraction of a
+millisecond, and inference is skipped while the difference stays below a
+threshold.
+"""
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides whether a frame differs enough from the last inferred one to need inference.
+
+    Frames are shrunk to size (w, h) thumbnails in grayscale and compared
+    with the thumbnail of the last frame that ran inference. Each thumbnail
+    pixel averages a block of the frame, which evens out sensor noise; the
+    frame is static while fewer than min_changed pixels differ by more than
+    threshold levels (0-255), so a moving forearm counts even when it is a
+    small part of the picture. Comparing with that reference rather than the
+    previous frame means slow motion still adds up, and at most max_age
+    frames in a row are treated as static. hits counts static frames and
+    misses the others.
+    """
+
+    def __init__(self, threshold=10, min_changed=3, max_age=15, size=(64, 48)):
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.max_age = max_age
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        w, h = size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._grays = [np.empty((h, w), dtype=np.uint8) for _ in range(2)]
+        self._reference = None
+        self._age = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def static(self, image_rgb):
+        """True if image_rgb can reuse the last result; otherwise it becomes the new reference."""
+        small = cv2.resize(image_rgb, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY, dst=self._grays[0])
+        if self._reference is not None and self._age < self.max_age and self._changed(gray) < self.min_changed:
+            self._age += 1
+            self.hits += 1
+            return True
+        # This thumbnail becomes the reference; the other buffer takes the next frame
+        self._grays.reverse()
+        self._reference = gray
+        self._age = 0
+        self.misses += 1
+        return False
+
+    def _changed(self, gray):
+        cv2.absdiff(gray, self._reference, dst=self._diff)
+        cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        return cv2.countNonZero(self._diff)
+
+    def reset(self):
+        self._reference = None
+        self._age = 0
+
+
+class CachedPose:
+    """Wraps a Pose so static frames (see MotionGate) return the previous result.
+
+    process() does both steps; a caller batching several streams' frames
+    through one backend asks cached() first and store()s what it infers.
+    """
+
+    def __init__(self, pose, gate=None):
+        self.pose = pose
+        self.gate = gate if gate is not None else MotionGate()
+        self._last = None
+
+    def process(self, image_rgb):
+        result = self.cached(image_rgb)
+        if result is None:
+            result = self.store(self.pose.process(image_rgb))
+        return result
+
+    def cached(self, image_rgb):
+        """The previous result if image_rgb is static, else None."""
+        # Without a result to reuse the frame is inferred anyway, so it must not count as a static hit
+        if self._last is not None and self.gate.static(image_rgb):
+            return self._last
+        return None
+
+    def store(self, result):
+        self._last = result
+        return result
+
+    def reset(self):
+        self.gate.reset()
+        self._last = None
+        self.pose.reset()
+
+    def close(self):
+        self.pose.close()
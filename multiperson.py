@@ -0,0 +1,365 @@
+"""Rep counting for several people in one camera view.
+
+A person detector finds people every few frames on a background worker;
+an IoU tracker keeps a stable ID per person; each tracked person gets a
+Pose instance (its own tracking state) run on a crop around them, and its
+own RepCounter. The crops are processed in parallel by a thread pool.
+
+Usage:
+    python multiperson.py --source 0 --exercise squat --show
+"""
+import argparse
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from backends import backend_factory, parse_backend
+from counting import EXERCISES, RepCounter
+from landmarks import NUM_LANDMARKS, fill_array
+from roi import square_box, to_frame
+
+
+def _intersection(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    return max(0.0, x1 - x0) * max(0.0, y1 - y0)
+
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    inter = _intersection(a, b)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def coverage(a, b):
+    """Intersection over the smaller box's area: 1.0 when one box lies inside the other."""
+    smaller = min(a[2] * a[3], b[2] * b[3])
+    return _intersection(a, b) / smaller if smaller > 0 else 0.0
+
+
+class PersonDetector:
+    """OpenCV's HOG people detector; needs no model download.
+
+    Frames are downscaled by `scale` first; the default HOG window is 64x128,
+    so the smallest person found is 128 / scale pixels tall.
+    """
+
+    def __init__(self, scale=0.75, min_score=0.3, nms_threshold=0.4, win_stride=(8, 8)):
+        self.scale = scale
+        self.min_score = min_score
+        self.nms_threshold = nms_threshold
+        self.win_stride = win_stride
+        self._hog = cv2.HOGDescriptor()
+        self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, image):
+        """Returns (x, y, w, h) boxes in image pixels."""
+        small = image
+        if self.scale != 1.0:
+            small = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        rects, weights = self._hog.detectMultiScale(small, winStride=self.win_stride, padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+        scores = np.asarray(weights, dtype=np.float32).reshape(-1)
+        keep = cv2.dnn.NMSBoxes([list(map(int, r)) for r in rects], scores.tolist(),
+                                self.min_score, self.nms_threshold)
+        return [tuple(float(v) / self.scale for v in rects[i]) for i in np.asarray(keep).reshape(-1)]
+
+
+class PersonTrack:
+    """One tracked person: box, pose model, rep counter and latest landmarks."""
+
+    def __init__(self, track_id, box, pose, counter, crop_size):
+        self.id = track_id
+        self.box = box  # (x, y, w, h) in frame pixels
+        self.pose = pose
+        self.counter = counter
+        self.landmarks = None  # full-frame NormalizedLandmarkList from the last frame, or None
+        self.misses = 0
+        self.lost_at = None  # frame the track was retired on
+        self.crop = np.empty((crop_size, crop_size, 3), dtype=np.uint8)
+        self._points = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+
+
+class MultiPersonCounter:
+    """Counts reps for every person in view, with one state machine per track ID.
+
+    make_pose() builds a Pose instance; at most max_people exist and they
+    are reused when a track ends. Detection runs every detect_every frames
+    on the worker pool without holding up the frame; between detections
+    each box follows its person's landmarks. A track missing for
+    max_misses frames is retired: a detection that nobody else claims and
+    that lands on its last box within revive_within frames brings it back
+    with its ID and count, so a brief occlusion does not restart a person at
+    0 reps. Retired tracks stay in summary(). A track that ends up on the
+    same person as an older one is merged into it; both counted the same
+    person, so only the older count is kept. listener receives every
+    counter's events with a "person" field holding the track ID.
+    """
+
+    def __init__(self, make_pose, exercise, detector=None, max_people=6, workers=None, detect_every=15,
+                 crop_size=256, padding=0.15, match_threshold=0.5, max_misses=15, min_visibility=0.5,
+                 landmark_filter=None, listener=None, revive_within=90):
+        self.make_pose = make_pose
+        self.exercise = exercise
+        self.detector = detector or PersonDetector()
+        self.max_people = max_people
+        self.detect_every = detect_every
+        self.crop_size = crop_size
+        self.padding = padding
+        self.match_threshold = match_threshold
+        self.max_misses = max_misses
+        self.min_visibility = min_visibility
+        self.landmark_filter = landmark_filter
+        self.listener = listener
+        self.revive_within = revive_within
+        self.tracks = []
+        self.retired = []  # lost tracks, without their pose, most recent last
+        self._ids = itertools.count(1)
+        self._idle_poses = []
+        self._frame = 0
+        self._last_detection = None
+        self._detection = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            workers or min(max_people + 1, os.cpu_count() or 1), thread_name_prefix="person")
+
+    def process(self, image_rgb, timestamp=None):
+        """Runs one frame; returns the current tracks (landmarks is None for a person missed this frame)."""
+        with self._lock:
+            if self._closed:
+                return []
+            self._frame += 1
+            self._collect_detection()
+            if self._detection is None and (not self.tracks or self._frame - self._last_detection >= self.detect_every):
+                self._detection = self._pool.submit(self.detector.detect, image_rgb.copy())
+                self._last_detection = self._frame
+
+            steps = [self._pool.submit(self._step, track, image_rgb, timestamp) for track in self.tracks]
+            for step in steps:
+                step.result()
+            self._prune()
+            return list(self.tracks)
+
+    def close(self):
+        """Waits for the current frame, then releases every pose model."""
+        with self._lock:
+            self._closed = True
+            self._pool.shutdown(wait=True)
+            for track in self.tracks:
+                self._idle_poses.append(track.pose)
+            self.tracks = []
+            for pose in self._idle_poses:
+                pose.close()
+            self._idle_poses = []
+
+    def finish(self, timestamp=None):
+        """Times every person's last rep (RepCounter.finish); call when the session stops."""
+        with self._lock:
+            for track in self.tracks + self.retired:
+                track.counter.finish(timestamp)
+
+    def summary(self):
+        """Every person counted so far, by ID; active is False for people no longer tracked."""
+        tracks = sorted([(t, True) for t in self.tracks] + [(t, False) for t in self.retired],
+                        key=lambda item: item[0].id)
+        return [{"id": t.id, "reps": t.counter.reps, "faults": t.counter.faults, "state": t.counter.state,
+                 "tempo": t.counter.tempo.summary(), "active": active} for t, active in tracks]
+
+    def _collect_detection(self):
+        if self._detection is None or not self._detection.done():
+            return
+        detection, self._detection = self._detection, None
+        boxes = detection.result()
+
+        # Greedy matching; the landmark box of a track sits inside the looser
+        # detector box, so overlap is measured against the smaller of the two
+        candidates = sorted(((coverage(track.box, box), i, j) for i, track in enumerate(self.tracks)
+                             for j, box in enumerate(boxes)), reverse=True)
+        matched_tracks, matched_boxes = set(), set()
+        for overlap, i, j in candidates:
+            if overlap < self.match_threshold:
+                break
+            if i in matched_tracks or j in matched_boxes:
+                continue
+            matched_tracks.add(i)
+            matched_boxes.add(j)
+            if self.tracks[i].misses:
+                self.tracks[i].box = boxes[j]  # lost: re-anchor on the detection
+
+        for j, box in enumerate(boxes):
+            if j not in matched_boxes and len(self.tracks) < self.max_people:
+                self.tracks.append(self._revive(box) or self._new_track(box))
+
+    def _revive(self, box):
+        # The most recently lost track whose last box the detection overlaps, if lost recently enough
+        for track in reversed(self.retired):
+            if self._frame - track.lost_at > self.revive_within:
+                break
+            if coverage(track.box, box) >= self.match_threshold:
+                self.retired.remove(track)
+                track.pose = self._idle_poses.pop() if self._idle_poses else self.make_pose()
+                track.box = box
+                track.misses = 0
+                track.lost_at = None
+                if track.counter.landmark_filter is not None:
+                    track.counter.landmark_filter.reset()  # don't smooth across the gap
+                return track
+        return None
+
+    def _new_track(self, box):
+        pose = self._idle_poses.pop() if self._idle_poses else self.make_pose()
+        track_id = next(self._ids)
+        listener = None if self.listener is None else functools.partial(self.listener, person=track_id)
+        counter = RepCounter(self.exercise, landmark_filter=self.landmark_filter, listener=listener)
+        return PersonTrack(track_id, box, pose, counter, self.crop_size)
+
+    def _step(self, track, image_rgb, timestamp):
+        h, w = image_rgb.shape[:2]
+        x, y, bw, bh = track.box
+        x0, y0, side = square_box(x, y, x + bw, y + bh, w, h, self.padding)
+        if side < 2:
+            track.landmarks = None
+            track.misses += 1
+            return
+        cv2.resize(image_rgb[y0:y0 + side, x0:x0 + side], (self.crop_size, self.crop_size),
+                   dst=track.crop, interpolation=cv2.INTER_AREA)
+        result = track.pose.process(track.crop)
+        if not result.pose_landmarks:
+            track.landmarks = None
+            track.misses += 1
+            return
+
+        to_frame(result.pose_landmarks, x0, y0, side, w, h)
+        track.landmarks = result.pose_landmarks
+        track.misses = 0
+        track.counter.update(result.pose_landmarks.landmark, timestamp)
+
+        # The box follows the visible landmarks until the next detection
+        points = fill_array(result.pose_landmarks.landmark, track._points)
+        visible = points[:, 3] >= self.min_visibility
+        if np.count_nonzero(visible) >= 6:
+            xs = points[visible, 0] * w
+            ys = points[visible, 1] * h
+            track.box = (float(xs.min()), float(ys.min()), float(xs.max() - xs.min()), float(ys.max() - ys.min()))
+
+    def _prune(self):
+        kept = []
+        for track in self.tracks:  # oldest first
+            lost = track.misses > self.max_misses
+            duplicate = track.landmarks is not None and any(
+                other.landmarks is not None and iou(track.box, other.box) > 0.6 for other in kept)
+            if lost or duplicate:
+                track.pose.reset()
+                self._idle_poses.append(track.pose)
+                track.pose = None
+                if lost:
+                    track.lost_at = self._frame
+                    self.retired.append(track)
+            else:
+                kept.append(track)
+        self.tracks = kept
+
+
+def draw_tracks(image, tracks, skeleton, color=(255, 255, 255)):
+    """Draws each visible person's skeleton and an "#id reps" tag above them."""
+    for track in tracks:
+        if track.landmarks is None:
+            continue
+        skeleton.draw(image, track.landmarks.landmark)
+        x, y = int(track.box[0]), max(20, int(track.box[1]) - 10)
+        text = f"#{track.id} {track.counter.reps}"
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        cv2.rectangle(image, (x, y - th - 6), (x + tw + 8, y + 4), (20, 20, 20), -1)
+        cv2.putText(image, text, (x + 4, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count reps for every person in one camera or video.")
+    parser.add_argument("--source", default="0", help="camera index, file or URL")
+    parser.add_argument("--exercise", required=True, choices=sorted(EXERCISES))
+    parser.add_argument("--max-people", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--detect-every", type=int, default=15, help="frames between person detections")
+    parser.add_argument("--backend", default="mediapipe",
+                        help="pose backend: mediapipe (default) or onnx:MODEL.onnx (see backends.py)")
+    parser.add_argument("--model-complexity", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--size", default="960x540", help="processing size WxH")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--show", action="store_true", help="preview window with skeletons and counts")
+    parser.add_argument("--output", default=None, help="write the final per-person counts as JSON")
+    args = parser.parse_args(argv)
+    try:
+        parse_backend(args.backend)
+    except ValueError as e:
+        parser.error(f"invalid --backend: {e}")
+
+    from drawing import SkeletonRenderer
+
+    make_pose = backend_factory(args.backend, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    counter = MultiPersonCounter(
+        lambda: make_pose(args.model_complexity),
+        args.exercise, max_people=args.max_people, workers=args.workers, detect_every=args.detect_every,
+        landmark_filter="one_euro",
+    )
+    skeleton = SkeletonRenderer(landmark_color=(0, 0, 255))
+    source = int(args.source) if args.source.isdigit() else args.source
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        parser.error(f"unable to open {args.source}")
+
+    resized = np.empty((height, width, 3), dtype=np.uint8)
+    image_rgb = np.empty_like(resized)
+    reps = {}
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while args.duration is None or time.perf_counter() - start < args.duration:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames += 1
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if isinstance(source, str) else time.monotonic()
+            cv2.resize(frame, (width, height), dst=resized)
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=image_rgb)
+            for track in counter.process(image_rgb, timestamp):
+                if reps.get(track.id, 0) != track.counter.reps:
+                    reps[track.id] = track.counter.reps
+                    print(f"person {track.id}: {args.exercise} rep {track.counter.reps}", flush=True)
+            if args.show:
+                draw_tracks(resized, counter.tracks, skeleton)
+                cv2.imshow("multiperson", resized)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        counter.close()
+        if args.show:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start
+    summary = {"frames": frames, "fps": round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+               "people": [{"id": i, "reps": n} for i, n in sorted(reps.items())]}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
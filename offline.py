@@ -0,0 +1,288 @@
+"""Vectorized rep counting over whole landmark time series, for archived sessions.
+
+RepCounter walks one frame at a time; here a (frames, 33, 4) array is
+counted for every exercise at once. The angles of all exercises come out
+of one pass over cache-sized blocks of frames, transposed to one row per
+landmark coordinate and computed with the same float32 arithmetic as
+angles.AngleEngine. The counted side is a forward fill of the
+frames where one side wins by SIDE_MARGIN, and the hysteresis becomes a
+search over runs of threshold crossings: a phase change is the first
+frame after the previous one whose crossing has held for `hold` frames and
+that is min_phase seconds later, so the Python loop runs once per phase
+change rather than once per frame. Results match RepCounter exactly, down to the
+float64 comparisons it makes.
+
+Usage:
+    python offline.py sessions/*.lmk --verify
+"""
+import argparse
+import bisect
+import sys
+import time
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from counting import EXERCISES, SIDE_MARGIN, exercise_joints, side_landmarks
+from filters import FILTERS, make_filter
+from landmarks import INDEX, NUM_LANDMARKS
+
+# Frames per block when building angles and side scores; small enough that
+# the transposed landmark planes and the temporaries stay in cache
+CHUNK = 16384
+
+
+class SeriesCount(NamedTuple):
+    """Offline result for one exercise.
+
+    toggles holds the frame indices of every phase change: even positions
+    count a rep, odd positions re-arm. sides is the side counted on each
+    frame, as an index into counting.SIDES.
+    """
+    exercise: str
+    reps: int
+    faults: int
+    toggles: np.ndarray
+    sides: np.ndarray
+
+    @property
+    def counted(self):
+        """Per-frame phase: True from a counting frame until the frame that re-arms."""
+        marks = np.zeros(len(self.sides), dtype=np.int8)
+        marks[self.toggles] = 1
+        return (np.cumsum(marks) & 1).astype(bool)
+
+
+def side_weights(exercise):
+    """(33, sides) weights whose dot product with visibilities is RepCounter.side_scores."""
+    rows = side_landmarks(exercise)
+    weights = np.zeros((NUM_LANDMARKS, len(rows)), dtype=np.float32)
+    for column, indices in enumerate(rows):
+        weights[indices, column] = 1.0 / len(indices)
+    return weights
+
+
+def planar_angles(x, y, a, b, c):
+    """2D angles in degrees from (landmarks, frames) x and y planes; returns (len(b), frames).
+
+    a, b and c index the rows of each joint's first point, vertex and last
+    point. The same operations as angles.AngleEngine and batch_angles, on
+    rows gathered from the planes instead of landmarks gathered per frame.
+    """
+    ux, uy = x[a] - x[b], y[a] - y[b]
+    vx, vy = x[c] - x[b], y[c] - y[b]
+    cross = np.abs(ux * vy - uy * vx)
+    dot = ux * vx + uy * vy
+    return np.degrees(np.arctan2(cross, dot))
+
+
+def side_series(scores, margin=SIDE_MARGIN):
+    """Counted side per frame: the best side on the first frame, then whichever side last won by margin."""
+    n, sides = scores.shape
+    if sides == 1 or n == 0:
+        return np.zeros(n, dtype=np.intp)
+    scores = scores.astype(np.float64)  # RepCounter compares Python floats
+    right, left = scores[:, 0], scores[:, 1]
+    winner = np.full(n, -1, dtype=np.intp)
+    winner[right > left + margin] = 0
+    winner[left > right + margin] = 1
+    winner[0] = 0 if right[0] >= left[0] else 1
+    last = np.maximum.accumulate(np.where(winner >= 0, np.arange(n), 0))
+    return winner[last]
+
+
+def _runs(crossed, hold):
+    # (first frame where the crossing has held for hold frames, last frame) of each run long enough
+    edges = np.flatnonzero(np.diff(crossed.view(np.int8), prepend=0, append=0))
+    first = edges[0::2] + max(hold, 1) - 1
+    last = edges[1::2] - 1
+    keep = first <= last
+    return first[keep].tolist(), last[keep].tolist()
+
+
+def phase_changes(signed, timestamps, reset_at, count_at, hold, min_phase):
+    """Frame indices where the hysteresis changes phase, starting armed.
+
+    signed is the angle series multiplied by the exercise sign and
+    reset_at < count_at are the signed thresholds, as in RepCounter.
+    Armed frames count when above count_at, counted frames re-arm below
+    reset_at. The two conditions never hold on the same frame, so every
+    run of crossings after a phase change starts after it, and the next
+    change is in the first run that holds long enough (and, with
+    min_phase, the first of its frames late enough).
+    """
+    runs = (_runs(signed > count_at, hold), _runs(signed < reset_at, hold))
+    if min_phase > 0.0:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        monotonic = bool(np.all(np.diff(timestamps) >= 0))
+    toggles = []
+    start = 0
+    last_time = None
+    counted = 0
+    while True:
+        firsts, lasts = runs[counted]
+        r = bisect.bisect_left(lasts, start)
+        while r < len(firsts):
+            frame = firsts[r]
+            if last_time is not None and timestamps[frame] - last_time < min_phase:
+                frame = _first_after(timestamps, frame, lasts[r], last_time, min_phase, monotonic)
+            if frame <= lasts[r]:
+                break
+            r += 1
+        else:
+            break
+        toggles.append(frame)
+        if min_phase > 0.0:
+            last_time = float(timestamps[frame])
+        start = frame + 1
+        counted ^= 1
+    return np.array(toggles, dtype=np.intp)
+
+
+def _first_after(times, frame, last, last_time, min_phase, monotonic):
+    # First frame in (frame, last] where RepCounter would not find t - last_time < min_phase; last + 1 if none
+    if not monotonic:
+        return next((f for f in range(frame + 1, last + 1) if not times[f] - last_time < min_phase), last + 1)
+    f = frame + 1 + int(times[frame + 1:last + 1].searchsorted(last_time + min_phase))
+    # The search rounds last_time + min_phase once; settle the edge with RepCounter's own expression
+    while f > frame + 1 and not times[f - 1] - last_time < min_phase:
+        f -= 1
+    while f <= last and times[f] - last_time < min_phase:
+        f += 1
+    return f
+
+
+def count_series(exercise, angles, scores, timestamps, angle_filter=None):
+    """Counts one exercise from angles in exercise_joints() order and (frames, sides) scores.
+
+    These are the per-frame inputs of RepCounter.evaluate, stacked. An
+    angle filter is inherently sequential and runs frame by frame over the
+    counted angle series.
+    """
+    if isinstance(exercise, str):
+        exercise = EXERCISES[exercise]
+    angles = np.asarray(angles)
+    n = len(angles)
+    sides = side_series(scores)
+    k = angles.shape[1] // scores.shape[1]
+    picks = (np.arange(n), sides * k)
+    # RepCounter compares Python floats, so the thresholds are applied in float64
+    rows = [angles[picks[0], picks[1] + j].astype(np.float64) for j in range(k)]
+
+    angle = rows[0]
+    angle_filter = make_filter(angle_filter, (1,), "degrees")
+    if angle_filter is not None:
+        value = np.zeros(1, dtype=np.float32)
+        filtered = np.empty(n)
+        for i, (a, t) in enumerate(zip(angle.tolist(), timestamps)):
+            value[0] = a
+            filtered[i] = float(angle_filter(value, t)[0])
+        angle = filtered
+
+    sign = 1.0 if exercise.count_at > exercise.reset_at else -1.0
+    toggles = phase_changes(sign * angle, timestamps, sign * exercise.reset_at, sign * exercise.count_at,
+                            exercise.hold, exercise.min_phase)
+
+    faults = 0
+    if exercise.constraints:
+        broken = np.zeros(n, dtype=bool)
+        for column, c in enumerate(exercise.constraints, 1):
+            broken |= ~((rows[column] >= c.min_angle) & (rows[column] <= c.max_angle))
+        # A cycle runs up to and including the frame that re-arms; count the cycles with a broken frame
+        cycles = np.searchsorted(toggles[1::2], np.flatnonzero(broken))
+        faults = int(np.count_nonzero(np.diff(cycles))) + 1 if len(cycles) else 0
+
+    return SeriesCount(exercise.name, (len(toggles) + 1) // 2, faults, toggles, sides)
+
+
+def count_points(points, timestamps, exercises=None, landmark_filter=None, angle_filter=None):
+    """Counts every exercise over a (frames, 33, 4) landmark array; returns {name: SeriesCount}.
+
+    Frames without a detection (NaN, as stored in recordings) are skipped,
+    as the apps only count frames with landmarks; toggles and sides index
+    the remaining frames. Filters are sequential and make the call much
+    slower; each exercise gets the same smoothed landmarks.
+    """
+    if exercises is None:
+        exercises = EXERCISES.values()
+    exercises = [EXERCISES[e] if isinstance(e, str) else e for e in exercises]
+    points = np.asarray(points, dtype=np.float32)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    detected = ~np.isnan(points[:, 0, 0])
+    if not detected.all():
+        points, timestamps = points[detected], timestamps[detected]
+
+    landmark_filter = make_filter(landmark_filter, (NUM_LANDMARKS, 3), "landmarks")
+    if landmark_filter is not None:
+        points = points.copy()
+        for frame, t in zip(points, timestamps.tolist()):
+            landmark_filter(frame[:, :3], t)
+
+    # Every joint of every exercise once, over only the landmarks they use
+    joints = {}
+    for exercise in exercises:
+        for triplet in exercise_joints(exercise).values():
+            joints.setdefault(triplet, len(joints))
+    used = sorted({INDEX[name] for triplet in joints for name in triplet}
+                  | {int(i) for exercise in exercises for i in side_landmarks(exercise).ravel()})
+    row = {landmark: i for i, landmark in enumerate(used)}
+    a, b, c = (np.array([row[INDEX[triplet[k]]] for triplet in joints], dtype=np.intp) for k in range(3))
+    weights = np.concatenate([side_weights(exercise)[used] for exercise in exercises], axis=1).T
+
+    n = len(points)
+    angles = np.empty((len(joints), n), dtype=np.float32)
+    scores = np.empty((len(weights), n), dtype=np.float32)
+    for start in range(0, n, CHUNK):
+        stop = min(start + CHUNK, n)
+        block = np.take(points[start:stop], used, axis=1)
+        planes = cv2.transpose(block.reshape(stop - start, -1))  # rows: x, y, z, visibility of each landmark
+        angles[:, start:stop] = planar_angles(planes[0::4], planes[1::4], a, b, c)
+        scores[:, start:stop] = weights @ planes[3::4]
+
+    results = {}
+    side = 0
+    for exercise in exercises:
+        index = [joints[triplet] for triplet in exercise_joints(exercise).values()]
+        sides = len(side_landmarks(exercise))
+        results[exercise.name] = count_series(exercise, angles[index].T, scores[side:side + sides].T,
+                                              timestamps, angle_filter)
+        side += sides
+    return results
+
+
+def main(argv=None):
+    from recording import LandmarkRecording, replay_count
+
+    parser = argparse.ArgumentParser(description="Count reps for every exercise over landmark recordings.")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--exercise", action="append", choices=sorted(EXERCISES),
+                        help="count only this exercise (repeatable); default all")
+    parser.add_argument("--smoothing", default="none", choices=["none"] + sorted(FILTERS),
+                        help="landmark filter; sequential, so much slower than none")
+    parser.add_argument("--verify", action="store_true",
+                        help="also replay each recording through RepCounter and exit 1 on any difference")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    for path in args.recordings:
+        recording = LandmarkRecording(path)
+        points = recording.points()
+        start = time.perf_counter()
+        results = count_points(points, recording.timestamps, args.exercise, landmark_filter=args.smoothing)
+        elapsed = time.perf_counter() - start
+        fps = len(recording) / elapsed if elapsed > 0 else float("inf")
+        print(f"{path}: {len(recording)} frames in {elapsed * 1000:.1f} ms, {fps:,.0f} frames/s")
+        for name, result in results.items():
+            line = f"  {name:<14} {result.reps:4d} reps  {result.faults:4d} with form faults"
+            if args.verify:
+                counter = replay_count(recording, name, landmark_filter=args.smoothing)
+                match = (counter.reps, counter.faults) == (result.reps, result.faults)
+                mismatches += not match
+                line += "  ok" if match else f"  MISMATCH: RepCounter {counter.reps} reps, {counter.faults} faults"
+            print(line)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
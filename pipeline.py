@@ -0,0 +1,210 @@
+"""Threaded capture -> inference -> render pipeline joined by drop-oldest queues."""
+import collections
+import threading
+
+import numpy as np
+
+
+class QueueClosed(Exception):
+    """Raised by FrameQueue.get once the queue is closed and empty."""
+
+
+class FrameQueue:
+    """Bounded queue that discards the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._items = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                if self._on_drop is not None:
+                    self._on_drop()
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self):
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    raise QueueClosed
+                self._cond.wait()
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class BufferRing:
+    """Preallocated frames handed out in rotation, so the hot path never allocates.
+
+    A buffer is reused after `count` more frames, which must exceed the
+    number of frames that can be in flight between the stages and the GUI.
+    buffers hands out existing arrays (e.g. shared memory slots) instead.
+    """
+
+    def __init__(self, shape, count=8, dtype=np.uint8, buffers=None):
+        if buffers is not None:
+            self._buffers = list(buffers)
+        else:
+            self._buffers = [np.empty(shape, dtype=dtype) for _ in range(count)]
+        self._next = 0
+
+    def next(self):
+        buffer = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+        return buffer
+
+
+class LatestFrame:
+    """One-item hand-off to the GUI: at most one rendered frame in flight.
+
+    put() (render thread) overwrites the slot and calls notify() only when
+    the GUI has taken the previous item, so no more than one notification
+    ever waits in the GUI's event queue; take() (GUI thread) returns the
+    newest item, or None, and acknowledges it. A frame rendered while the
+    GUI is busy replaces the one waiting instead of queueing behind it.
+    """
+
+    def __init__(self, notify, on_drop=None):
+        self._notify = notify
+        self._on_drop = on_drop
+        self._item = None
+        self._pending = False
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._lock:
+            if self._item is not None:
+                self.dropped += 1
+                if self._on_drop is not None:
+                    self._on_drop()
+            self._item = item
+            notify = not self._pending
+            self._pending = True
+        if notify:
+            self._notify()
+
+    def take(self):
+        with self._lock:
+            item, self._item = self._item, None
+            self._pending = False
+        return item
+
+
+class FramePipeline:
+    """Runs read, infer and render on their own threads and hands results to sink.
+
+    read() returns a frame or None at end of stream, infer(frame) and
+    render(item) return the item for the next stage (None drops it) and
+    sink(item) receives every rendered result, typically LatestFrame.put.
+    on_drop() is called for each frame discarded between stages. With
+    on_error(exc), an exception in infer or render drops that frame instead
+    of ending the pipeline.
+
+    With threaded_capture=False there is no capture thread: the inference
+    thread calls read() itself, for sources such as capture.CameraCapture
+    that already keep the newest frame on their own thread and whose frame
+    stays valid only until the next read().
+    """
+
+    def __init__(self, read, infer, render, sink, depth=1, on_finished=None, on_drop=None, on_error=None,
+                 threaded_capture=True):
+        self._read = read
+        self._infer = infer
+        self._render = render
+        self._sink = sink
+        self._on_finished = on_finished
+        self._on_error = on_error
+        self._frames = FrameQueue(depth, on_drop)
+        self._results = FrameQueue(depth, on_drop)
+        self._stop = threading.Event()
+        if threaded_capture:
+            self._threads = [
+                threading.Thread(target=self._capture_loop, name="pipeline-capture", daemon=True),
+                threading.Thread(target=self._stage_loop, args=(self._frames, self._infer, self._results),
+                                 name="pipeline-inference", daemon=True),
+            ]
+        else:
+            self._threads = [threading.Thread(target=self._inline_loop, name="pipeline-inference", daemon=True)]
+        self._threads.append(threading.Thread(target=self._stage_loop, args=(self._results, self._render, None),
+                                              name="pipeline-render", daemon=True))
+
+    @property
+    def dropped(self):
+        return self._frames.dropped + self._results.dropped
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._frames.close()
+        self._results.close()
+        for thread in self._threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self._read()
+                if frame is None:
+                    break
+                self._frames.put(frame)
+        finally:
+            self._frames.close()
+
+    def _inline_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self._read()
+                if frame is None or self._stop.is_set():
+                    break
+                try:
+                    item = self._infer(frame)
+                except Exception as e:
+                    if self._on_error is None:
+                        raise
+                    self._on_error(e)
+                    continue
+                if item is not None:
+                    self._results.put(item)
+        finally:
+            self._results.close()
+
+    def _stage_loop(self, inbox, func, outbox):
+        emit = outbox.put if outbox is not None else self._sink
+        try:
+            while True:
+                try:
+                    item = inbox.get()
+                except QueueClosed:
+                    break
+                if self._stop.is_set():
+                    break
+                try:
+                    item = func(item)
+                except Exception as e:
+                    if self._on_error is None:
+                        raise
+                    self._on_error(e)
+                    continue
+                if item is not None:
+                    emit(item)
+        finally:
+            if outbox is not None:
+                outbox.close()
+            elif self._on_finished is not None and not self._stop.is_set():
+                self._on_finished()
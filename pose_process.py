@@ -0,0 +1,248 @@
+"""Pose inference in a separate process, fed through shared memory.
+
+Frames are written straight into a multiprocessing.shared_memory ring of
+fixed-size slots and landmarks come back through a small shared array;
+the pipe between the processes only carries slot numbers, so frames are
+never pickled. The GUI process keeps its interpreter (and GIL) to itself
+while inference gets a core of its own, and it never imports mediapipe.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, PoseResult, fill_array, to_landmarks
+from pipeline import BufferRing
+
+# Shared status values written by the inference process after each frame
+_TARGET_FPS, _FPS, _COMPLEXITY, _STRIDE, _INFERENCE_MS, _CACHE_HITS, _CACHE_MISSES = range(7)
+_STATUS_SIZE = 8
+
+
+def _views(frames_shm, results_shm, slots, shape):
+    frames = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=frames_shm.buf)
+    landmarks = np.ndarray((slots, NUM_LANDMARKS, 4), dtype=np.float32, buffer=results_shm.buf)
+    offset = landmarks.nbytes
+    detected = np.ndarray((slots,), dtype=np.uint8, buffer=results_shm.buf, offset=offset)
+    offset += -(-slots // 8) * 8  # keep the status values 8-byte aligned
+    status = np.ndarray((_STATUS_SIZE,), dtype=np.float64, buffer=results_shm.buf, offset=offset)
+    return frames, landmarks, detected, status
+
+
+def build_scheduler(target_fps=30.0, mode=1, min_detection_confidence=0.7, min_tracking_confidence=0.7,
+                    smooth_landmarks=True, reuse_static=True, backend="mediapipe", intra_op_threads=0,
+                    inter_op_threads=0):
+    """The apps' AdaptiveScheduler over pose backends (see backends.py), cropped by RoiTracker if stateless.
+
+    With reuse_static, frames that barely changed reuse the last result (motion.MotionGate).
+    """
+    from backends import backend_factory
+    from motion import MotionGate
+    from roi import RoiTracker
+    from scheduler import AdaptiveScheduler
+
+    make_backend = backend_factory(
+        backend,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+        smooth_landmarks=smooth_landmarks,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads
+    )
+
+    def make_pose(complexity):
+        pose = make_backend(complexity)
+        # MediaPipe finds, tracks and crops to the person itself, and a crop in front of it measured
+        # slower (benchmarks/bench_roi.py); a backend without a detector gets the crop
+        return RoiTracker(pose) if pose.stateless else pose
+
+    return AdaptiveScheduler(make_pose, target_fps=target_fps, mode=mode,
+                             gate=MotionGate() if reuse_static else None)
+
+
+def _serve(conn, frames_name, results_name, slots, shape, options):
+    # Runs in the inference process: one slot number in, the same number back when its landmarks are ready
+    frames_shm = shared_memory.SharedMemory(frames_name)
+    results_shm = shared_memory.SharedMemory(results_name)
+    frames, landmarks, detected, status = _views(frames_shm, results_shm, slots, shape)
+    pose = None
+    try:
+        try:
+            pose = build_scheduler(**options)
+            pose.warm_up(np.zeros(shape, dtype=np.uint8))
+        except Exception as e:
+            conn.send(f"{type(e).__name__}: {e}")
+            return
+        conn.send("ready")
+
+        while True:
+            try:
+                slot = conn.recv()
+            except EOFError:
+                break
+            if slot is None:
+                break
+            if status[_TARGET_FPS] > 0 and status[_TARGET_FPS] != pose.target_fps:
+                pose.target_fps = float(status[_TARGET_FPS])
+            try:
+                result = pose.process(frames[slot])
+            except Exception as e:
+                conn.send(f"{type(e).__name__}: {e}")
+                continue
+            if result.pose_landmarks:
+                fill_array(result.pose_landmarks.landmark, landmarks[slot])
+                detected[slot] = 1
+            else:
+                detected[slot] = 0
+            status[_FPS] = pose.fps
+            status[_COMPLEXITY] = pose.complexity
+            status[_STRIDE] = pose.stride
+            status[_INFERENCE_MS] = pose.inference_ms
+            status[_CACHE_HITS] = pose.cache_hits
+            status[_CACHE_MISSES] = pose.cache_misses
+            conn.send(slot)
+    finally:
+        if pose is not None:
+            pose.close()
+        del frames, landmarks, detected, status
+        frames_shm.close()
+        results_shm.close()
+
+
+class PoseProcess:
+    """Drop-in for the apps' AdaptiveScheduler that runs it in another process.
+
+    size is the (width, height) of every frame; options are passed to
+    build_scheduler() in the child. Construction blocks until the model is
+    loaded and warmed up (raising RuntimeError if that fails), so build it
+    on a background thread. Write frames into buffers.next() to skip the
+    copy into shared memory; process() accepts any other frame of that size
+    too. Landmarks come back as landmarks.Landmark objects in the MediaPipe layout.
+    """
+
+    def __init__(self, size, options=None, slots=8):
+        width, height = size
+        self.shape = (height, width, 3)
+        self.slots = slots
+        self._target_fps = (options or {}).get("target_fps", 30.0)
+        self._frames_shm = self._results_shm = self._process = self._conn = None
+        try:
+            self._frames_shm = shared_memory.SharedMemory(create=True, size=slots * height * width * 3)
+            self._results_shm = shared_memory.SharedMemory(
+                create=True, size=slots * NUM_LANDMARKS * 4 * 4 + -(-slots // 8) * 8 + _STATUS_SIZE * 8)
+            self._frames, self._landmarks, self._detected, self._status = _views(
+                self._frames_shm, self._results_shm, slots, self.shape)
+            self._status[:] = 0
+            self._status[_TARGET_FPS] = self._target_fps
+            self._slot_views = [self._frames[i] for i in range(slots)]
+            self.buffers = BufferRing(self.shape, buffers=self._slot_views)
+            self._next_copy = 0
+
+            # spawn: a forked child would inherit the GUI's threads and Qt state
+            context = multiprocessing.get_context("spawn")
+            self._conn, child_conn = context.Pipe()
+            self._process = context.Process(
+                target=_serve, name="pose-inference", daemon=True,
+                args=(child_conn, self._frames_shm.name, self._results_shm.name, slots, self.shape,
+                      dict(options or {})))
+            self._process.start()
+            child_conn.close()
+            reply = self._receive()
+        except BaseException:
+            # Whatever got created so far, the shared memory above all, must not outlive a failed start
+            self.close()
+            raise
+        if reply != "ready":
+            self.close()
+            raise RuntimeError(f"pose process failed to start: {reply}")
+
+    @property
+    def target_fps(self):
+        return self._target_fps
+
+    @target_fps.setter
+    def target_fps(self, value):
+        # Read by the child before its next frame; no message needed
+        self._target_fps = value
+        self._status[_TARGET_FPS] = value
+
+    @property
+    def fps(self):
+        return float(self._status[_FPS])
+
+    @property
+    def complexity(self):
+        return int(self._status[_COMPLEXITY])
+
+    @property
+    def stride(self):
+        return int(self._status[_STRIDE]) or 1
+
+    @property
+    def inference_ms(self):
+        return float(self._status[_INFERENCE_MS])
+
+    @property
+    def cache_hits(self):
+        return int(self._status[_CACHE_HITS])
+
+    @property
+    def cache_misses(self):
+        return int(self._status[_CACHE_MISSES])
+
+    def describe(self):
+        text = f"complexity {self.complexity}"
+        if self.stride > 1:
+            text += f", 1/{self.stride} frames"
+        return text + ", separate process"
+
+    def process(self, image_rgb):
+        slot = self._slot(image_rgb)
+        try:
+            self._conn.send(slot)
+        except OSError:
+            raise RuntimeError(f"pose process exited (code {self._process.exitcode})") from None
+        reply = self._receive()
+        if reply != slot:
+            raise RuntimeError(f"pose process error: {reply}")
+        if not self._detected[slot]:
+            return PoseResult(None)
+        return PoseResult(to_landmarks(self._landmarks[slot]))
+
+    def close(self):
+        # Also called by a failed __init__, so any of these may not exist yet
+        process = getattr(self, "_process", None)
+        if process is not None and process.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            process.join(5.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        if getattr(self, "_conn", None) is not None:
+            self._conn.close()
+        # The numpy views must go before the shared memory can be closed
+        self._frames = self._landmarks = self._detected = self._status = None
+        self._slot_views = self.buffers = None
+        for shm in (getattr(self, "_frames_shm", None), getattr(self, "_results_shm", None)):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._frames_shm = self._results_shm = None
+
+    def _slot(self, image_rgb):
+        for slot, view in enumerate(self._slot_views):
+            if image_rgb is view:
+                return slot
+        slot = self._next_copy
+        self._next_copy = (slot + 1) % self.slots
+        np.copyto(self._slot_views[slot], image_rgb)
+        return slot
+
+    def _receive(self):
+        try:
+            return self._conn.recv()
+        except EOFError:
+            raise RuntimeError(f"pose process exited (code {self._process.exitcode})") from None
@@ -0,0 +1,179 @@
+"""Compact columnar landmark recordings and memory-mapped replay.
+
+File layout (little-endian):
+    64-byte header: magic (8 bytes), version (uint32), landmark count (uint32),
+                    frame count (uint64), zero-padded
+    timestamps  float64[frames]
+    x, y, z, visibility  float32[frames, 33] each, one contiguous column per field
+
+Frames without a detection are stored as NaN so the timeline is kept.
+
+Usage:
+    python recording.py sessions/squat-20250101-120000.lmk --exercise squat
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from angles import batch_angles
+from counting import EXERCISES, RepCounter
+from filters import FILTERS
+from landmarks import FIELDS, NUM_LANDMARKS, fill_array
+
+MAGIC = b"LMKREC\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+
+_ROW = np.dtype([("t", "<f8"), ("points", "<f4", (NUM_LANDMARKS, len(FIELDS)))])
+
+
+class LandmarkRecorder:
+    """Appends one row per frame to a spool file and writes the columnar file on close.
+
+    write() may be called from the render thread while close() is called
+    from the GUI thread; writes after close are ignored.
+    """
+
+    def __init__(self, path, chunk=256):
+        self.path = path
+        self.frames = 0
+        self._spool_path = path + ".spool"
+        self._spool = open(self._spool_path, "wb")
+        self._rows = np.empty(chunk, dtype=_ROW)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def write(self, landmarks, timestamp=None):
+        """Records one frame; landmarks is a MediaPipe landmark list or None."""
+        with self._lock:
+            if self._spool is None:
+                return
+            row = self._rows[self._pending]
+            row["t"] = time.time() if timestamp is None else timestamp
+            if landmarks is None:
+                row["points"] = np.nan
+            else:
+                fill_array(landmarks, row["points"])
+            self._pending += 1
+            self.frames += 1
+            if self._pending == len(self._rows):
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._spool is None:
+                return
+            self._flush()
+            self._spool.close()
+            self._spool = None
+
+        rows = np.fromfile(self._spool_path, dtype=_ROW)
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, NUM_LANDMARKS, len(rows)).ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(rows["t"]).tobytes())
+            for i in range(len(FIELDS)):
+                f.write(np.ascontiguousarray(rows["points"][:, :, i]).tobytes())
+        os.remove(self._spool_path)
+
+    def _flush(self):
+        self._spool.write(self._rows[:self._pending].tobytes())
+        self._pending = 0
+
+
+class LandmarkRecording:
+    """Read-only, memory-mapped view of a recording.
+
+    timestamps is (frames,); x, y, z and visibility are (frames, 33) columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_landmarks, frames = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        if version != VERSION or n_landmarks != NUM_LANDMARKS:
+            raise ValueError(f"{path}: unsupported recording version {version} ({n_landmarks} landmarks)")
+
+        self.frames = frames
+        offset = HEADER_SIZE
+        self.timestamps = self._map(offset, "<f8", (frames,))
+        offset += 8 * frames
+        for name in FIELDS:
+            setattr(self, name, self._map(offset, "<f4", (frames, NUM_LANDMARKS)))
+            offset += 4 * frames * NUM_LANDMARKS
+
+    def __len__(self):
+        return self.frames
+
+    @property
+    def detected(self):
+        """Boolean mask of frames that have landmarks."""
+        return ~np.isnan(self.x[:, 0])
+
+    def points(self, fields=FIELDS):
+        """Stacks the requested columns into a (frames, 33, len(fields)) array."""
+        return np.stack([getattr(self, name) for name in fields], axis=-1)
+
+    def _map(self, offset, dtype, shape):
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+def replay_count(recording, exercise, landmark_filter=None, angle_filter=None):
+    """Re-runs the online RepCounter over a recording without MediaPipe.
+
+    exercise may be a registry name or an Exercise, e.g. a tuned copy made
+    with EXERCISES["squat"]._replace(count_at=95). The filters are applied
+    frame by frame as RepCounter does online, on the recorded timestamps.
+    """
+    if isinstance(exercise, str):
+        exercise = EXERCISES[exercise]
+    counter = RepCounter(exercise, landmark_filter, angle_filter)
+    detected = recording.detected
+    timestamps = recording.timestamps[detected].tolist()
+    points = recording.points(FIELDS)[detected]
+    if counter.landmark_filter is not None:
+        for frame, t in zip(points, timestamps):
+            counter.landmark_filter(frame[:, :3], t)
+    angles = batch_angles(points[..., :3], counter.joints)
+    for frame, frame_angles, t in zip(points, angles, timestamps):
+        counter.evaluate(frame_angles, counter.side_scores(frame), t)
+    return counter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a landmark recording through the rep counter.")
+    parser.add_argument("recording")
+    parser.add_argument("--exercise", required=True, choices=sorted(EXERCISES))
+    parser.add_argument("--reset-at", type=float, default=None, help="override the exercise threshold")
+    parser.add_argument("--count-at", type=float, default=None, help="override the exercise threshold")
+    parser.add_argument("--smoothing", default="one_euro", choices=["none"] + sorted(FILTERS),
+                        help="landmark filter; the apps count with one_euro")
+    args = parser.parse_args(argv)
+
+    exercise = EXERCISES[args.exercise]
+    if args.reset_at is not None:
+        exercise = exercise._replace(reset_at=args.reset_at)
+    if args.count_at is not None:
+        exercise = exercise._replace(count_at=args.count_at)
+
+    recording = LandmarkRecording(args.recording)
+    start = time.perf_counter()
+    counter = replay_count(recording, exercise, landmark_filter=args.smoothing)
+    elapsed = time.perf_counter() - start
+    fps = len(recording) / elapsed if elapsed > 0 else float("inf")
+    print(f"{counter.reps} reps ({counter.faults} with form faults) over {len(recording)} frames "
+          f"({int(recording.detected.sum())} detected) in {elapsed * 1000:.1f} ms, {fps:,.0f} frames/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
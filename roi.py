@@ -0,0 +1,126 @@
+"""Region-of-interest tracking: run pose inference on a crop around the person."""
+import cv2
+import numpy as np
+
+from landmarks import fill_array, NUM_LANDMARKS
+
+
+def to_frame(landmarks, x0, y0, side, w, h):
+    """Maps landmarks found in the square crop (x0, y0, side) back to a w x h frame, in place."""
+    for lm in landmarks.landmark:
+        lm.x = (x0 + lm.x * side) / w
+        lm.y = (y0 + lm.y * side) / h
+        lm.z = lm.z * side / w
+
+
+def square_box(x_min, y_min, x_max, y_max, w, h, padding, min_side=0):
+    """Padded square (x0, y0, side) around a pixel box, shifted and clipped to stay inside the frame."""
+    side = max(x_max - x_min, y_max - y_min) * (1 + 2 * padding)
+    side = int(min(max(side, min_side), w, h))
+    x0 = int(np.clip((x_min + x_max - side) / 2, 0, w - side))
+    y0 = int(np.clip((y_min + y_max - side) / 2, 0, h - side))
+    return x0, y0, side
+
+
+class RoiTracker:
+    """Wraps a Pose so each frame is cropped to a box around the person.
+
+    The box around the visible landmarks is padded, made square and cropped
+    into a fixed size x size buffer; landmarks are mapped back to full-frame
+    coordinates in place. With no previous pose, too few visible landmarks or
+    a box that would cover most of the frame, the full frame is used instead,
+    and a crop that loses the person is retried on the full frame.
+
+    A tracking Pose (MediaPipe) carries its region of interest and landmark
+    smoothing from frame to frame in its own input coordinates, so crops and
+    full frames go to separate instances, pose and crop_pose, and the box
+    only moves when the person gets near its edge or much smaller than it
+    (keep_ratio); crop_pose is reset whenever it moves. A stateless backend
+    can serve both. MediaPipe already crops to the person it tracks, and
+    benchmarks/bench_roi.py measured it slower behind this crop, so the apps
+    only use RoiTracker for backends without a detector (ONNX).
+    """
+
+    def __init__(self, pose, crop_pose=None, size=256, padding=0.25, min_visibility=0.5, min_points=6,
+                 max_fraction=0.9, keep_ratio=0.6):
+        if crop_pose is None:
+            if not getattr(pose, "stateless", False):
+                raise ValueError("a tracking pose needs a second instance for the crops (crop_pose)")
+            crop_pose = pose
+        self.pose = pose
+        self.crop_pose = crop_pose
+        self.size = size
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.min_points = min_points
+        self.max_fraction = max_fraction
+        self.keep_ratio = keep_ratio
+        self.crops = 0
+        self.full_frames = 0
+        self.box_moves = 0
+        self._box = None  # (x0, y0, side) in pixels
+        self._buffer = np.empty((size, size, 3), dtype=np.uint8)
+        self._points = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+
+    def process(self, image_rgb):
+        h, w = image_rgb.shape[:2]
+        result = None
+        if self._box is not None:
+            x0, y0, side = self._box
+            cv2.resize(image_rgb[y0:y0 + side, x0:x0 + side], (self.size, self.size),
+                       dst=self._buffer, interpolation=cv2.INTER_AREA)
+            result = self.crop_pose.process(self._buffer)
+            if result.pose_landmarks:
+                self.crops += 1
+                to_frame(result.pose_landmarks, x0, y0, side, w, h)
+            else:
+                result = None
+
+        if result is None:
+            self.full_frames += 1
+            result = self.pose.process(image_rgb)
+
+        box = self._next_box(result.pose_landmarks, w, h) if result.pose_landmarks else None
+        if box != self._box:
+            if box is not None:
+                self.box_moves += 1
+            if self.crop_pose is not self.pose:
+                self.crop_pose.reset()
+            self._box = box
+        return result
+
+    def reset(self):
+        self._box = None
+        self.pose.reset()
+        if self.crop_pose is not self.pose:
+            self.crop_pose.reset()
+
+    def close(self):
+        self.pose.close()
+        if self.crop_pose is not self.pose:
+            self.crop_pose.close()
+
+    def _next_box(self, landmarks, w, h):
+        # The current box while the person stays well inside it, else a new one (None: use the full frame)
+        points = fill_array(landmarks.landmark, self._points)
+        visible = points[:, 3] >= self.min_visibility
+        if np.count_nonzero(visible) < self.min_points:
+            return None
+
+        xs = points[visible, 0] * w
+        ys = points[visible, 1] * h
+        x_min, x_max = xs.min(), xs.max()
+        y_min, y_max = ys.min(), ys.max()
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.padding)
+        side = int(max(side, self.size // 2))
+        if side >= self.max_fraction * min(w, h):
+            return None
+        if self._box is not None:
+            x0, y0, current = self._box
+            # Half the padding as margin: the person may move that far before the box follows
+            margin = (max(x_max - x_min, y_max - y_min) * self.padding) / 2
+            inside = (x_min - margin >= x0 and y_min - margin >= y0
+                      and x_max + margin <= x0 + current and y_max + margin <= y0 + current)
+            if inside and side >= self.keep_ratio * current:
+                return self._box
+        return square_box(x_min, y_min, x_max, y_max, w, h, self.padding, self.size // 2)
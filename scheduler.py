@@ -0,0 +1,170 @@
+"""Adaptive pose inference: trades model complexity and frame stride for frame rate."""
+import collections
+import time
+
+from landmarks import PoseResult, to_array, to_landmarks
+
+# (model_complexity, inference stride), from most to least expensive
+MODES = (
+    (2, 1),
+    (1, 1),
+    (0, 1),
+    (0, 2),
+)
+
+
+class AdaptiveScheduler:
+    """Drop-in for pose.process that steps through MODES to hold target_fps.
+
+    make_pose(complexity) builds a Pose instance; one is kept per complexity.
+    The mean process() latency over a sliding window is compared with the
+    frame budget: above it the scheduler degrades one mode, well below it
+    (upgrade_ratio of the budget) it upgrades one mode, unless that mode was
+    measured over budget within the last `memory` seconds. With a stride above
+    one, skipped frames get landmarks extrapolated linearly from the last two
+    inferences, since true interpolation would hold a frame back. With a
+    gate (motion.MotionGate), frames it finds static reuse the last result
+    instead of running inference; they are not counted in the latency.
+    A complexity whose model fails to build (e.g. it cannot be downloaded)
+    is recorded in unavailable and skipped from then on; the scheduler
+    stays on the mode it was in.
+    """
+
+    def __init__(self, make_pose, target_fps=30.0, mode=0, modes=MODES, window=30, upgrade_ratio=0.4,
+                 memory=30.0, gate=None):
+        self._make_pose = make_pose
+        self._poses = {}
+        self.modes = modes
+        self.mode = mode
+        self.target_fps = target_fps
+        self.upgrade_ratio = upgrade_ratio
+        self.memory = memory
+        self.gate = gate
+        self._last = None
+        self._too_slow = {}  # mode -> time it was last measured over budget
+        self.unavailable = {}  # complexity -> error raised while building its model
+        self._latency = collections.deque(maxlen=window)
+        self._ticks = collections.deque(maxlen=window)
+        self._history = collections.deque(maxlen=2)
+        self._frame = 0
+        self._pose(self.complexity)
+
+    @property
+    def complexity(self):
+        return self.modes[self.mode][0]
+
+    @property
+    def stride(self):
+        return self.modes[self.mode][1]
+
+    @property
+    def fps(self):
+        """Frames handled per second over the sliding window."""
+        if len(self._ticks) < 2:
+            return 0.0
+        span = self._ticks[-1] - self._ticks[0]
+        return (len(self._ticks) - 1) / span if span > 0 else 0.0
+
+    @property
+    def inference_ms(self):
+        if not self._latency:
+            return 0.0
+        return 1000.0 * sum(self._latency) / len(self._latency)
+
+    @property
+    def cache_hits(self):
+        return self.gate.hits if self.gate is not None else 0
+
+    @property
+    def cache_misses(self):
+        return self.gate.misses if self.gate is not None else 0
+
+    def describe(self):
+        text = f"complexity {self.complexity}"
+        if self.stride > 1:
+            text += f", 1/{self.stride} frames"
+        return text
+
+    def process(self, image_rgb):
+        self._frame += 1
+        self._ticks.append(time.perf_counter())
+
+        if self.stride > 1 and self._frame % self.stride and len(self._history) == 2:
+            return self._predict()
+        # Only ask the gate when there is a result to reuse, so its hits and age count reused frames only
+        if self.gate is not None and self._last is not None and self.gate.static(image_rgb):
+            return self._last
+
+        start = time.perf_counter()
+        result = self._last = self._pose(self.complexity).process(image_rgb)
+        self._latency.append(time.perf_counter() - start)
+
+        if result.pose_landmarks:
+            self._history.append((self._frame, to_array(result.pose_landmarks.landmark)))
+        else:
+            self._history.clear()
+        self._adapt()
+        return result
+
+    def warm_up(self, image_rgb):
+        """Runs the current model once on image_rgb so the first real frame does not pay for its setup."""
+        pose = self._pose(self.complexity)
+        pose.process(image_rgb)
+        pose.reset()
+
+    def close(self):
+        for pose in self._poses.values():
+            pose.close()
+        self._poses.clear()
+        self._last = None
+
+    def _pose(self, complexity):
+        pose = self._poses.get(complexity)
+        if pose is None:
+            pose = self._poses[complexity] = self._make_pose(complexity)
+        return pose
+
+    def _predict(self):
+        (f0, p0), (f1, p1) = self._history
+        step = (self._frame - f1) / (f1 - f0)
+        predicted = p1.copy()
+        predicted[:, :3] += (p1[:, :3] - p0[:, :3]) * step
+        return PoseResult(to_landmarks(predicted))
+
+    def _adapt(self):
+        if len(self._latency) < self._latency.maxlen:
+            return
+
+        now = time.perf_counter()
+        budget = 1.0 / self.target_fps
+        cost = sum(self._latency) / len(self._latency) / self.stride
+        if cost > budget:
+            self._too_slow[self.mode] = now
+            mode = self._usable(self.mode, 1)
+            if mode is not None:
+                self._switch(mode)
+        elif cost < budget * self.upgrade_ratio:
+            mode = self._usable(self.mode, -1)
+            if mode is not None and now - self._too_slow.get(mode, float("-inf")) >= self.memory:
+                self._switch(mode)
+
+    def _usable(self, mode, step):
+        # The next mode from mode in direction step whose complexity has not failed to build, or None
+        mode += step
+        while 0 <= mode < len(self.modes):
+            if self.modes[mode][0] not in self.unavailable:
+                return mode
+            mode += step
+        return None
+
+    def _switch(self, mode):
+        complexity = self.modes[mode][0]
+        try:
+            self._pose(complexity)
+        except Exception as e:
+            # Stay on the current mode, whose model works, and never try this complexity again
+            self.unavailable[complexity] = e
+            return
+        self.mode = mode
+        self._latency.clear()
+        self._history.clear()
@@ -0,0 +1,361 @@
+"""Headless multi-station server: N capture sources sharing a pool of pose workers.
+
+Usage:
+    python server.py --station 0:squat --station videos/a.mp4:bicep_curl --workers 4
+
+With --web-port the stations are also served to browsers (see web.py).
+"""
+import argparse
+import collections
+import functools
+import json
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, make_backend, parse_backend
+from counting import EXERCISES, RepCounter
+from events import make_bus
+from filters import FILTERS
+from motion import CachedPose
+
+
+def parse_source(value):
+    return int(value) if value.isdigit() else value
+
+
+class Station:
+    """One capture source with its own latest-frame slot, tracker and rep session."""
+
+    def __init__(self, station_id, source, exercise, pose, smoothing=None, listener=None):
+        self.id = station_id
+        self.source = source
+        self.counter = RepCounter(exercise, landmark_filter=smoothing, listener=listener)
+        self.pose = pose
+        self.frame = None
+        self.timestamp = None
+        self.queued = False
+        self.finished = False
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.errors = 0
+        self.inference_seconds = 0.0
+
+    def summary(self):
+        return {
+            "station": self.id,
+            "source": self.source,
+            "exercise": self.counter.exercise.name,
+            "reps": self.counter.reps,
+            "faults": self.counter.faults,
+            "side": self.counter.side,
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "errors": self.errors,
+            "mean_inference_ms": round(1000 * self.inference_seconds / max(1, self.frames_processed), 2),
+            "static_frames": self.pose.gate.hits if isinstance(self.pose, CachedPose) else 0,
+            "tempo": self.counter.tempo.summary(),
+        }
+
+
+class StationServer:
+    """Fairly schedules the newest frame of every station across worker threads.
+
+    Each station keeps only its latest frame and sits at most once in a FIFO
+    ready queue, so a busy station cannot starve the others and none of them
+    waits on another's camera. A station has at most one frame in flight,
+    which keeps its Pose tracker and rep counter strictly in frame order
+    while the workers are shared; MediaPipe releases the GIL while the graph
+    runs, so the workers use separate cores.
+
+    With a stateless backend shared by every station (backends.py) and a
+    batch_size above one, a worker takes up to that many ready stations at
+    once and runs their frames through the backend in one call.
+
+    on_rep(station) runs on a worker after each rep, and on_frame(station,
+    image_rgb, result) after every processed frame, with the mirrored RGB
+    frame the pose ran on; that buffer is reused for the next frame.
+    """
+
+    def __init__(self, stations, workers=4, size=(640, 480), pace=True, on_rep=None, backend=None, batch_size=1,
+                 on_frame=None):
+        self.stations = stations
+        self.size = size
+        self.pace = pace
+        self.on_rep = on_rep
+        self.on_frame = on_frame
+        self.backend = backend
+        self.batch_size = batch_size if backend is not None else 1
+        self._ready = collections.deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._captures = [threading.Thread(target=self._capture_loop, args=(station,),
+                                           name=f"capture-{station.id}", daemon=True)
+                          for station in stations]
+        self._workers = [threading.Thread(target=self._worker_loop, name=f"pose-worker-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        for thread in self._captures + self._workers:
+            thread.start()
+
+    def wait(self, timeout=None):
+        """Blocks until every station's source is exhausted or the timeout expires."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._all_done():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        # A worker returns once its current batch is done, so it is joined without a timeout: closing a
+        # pose or finishing a counter under a worker still using it would race. A capture thread touches
+        # neither and may be stuck in a camera read, so it only gets a bounded wait
+        for thread in self._workers:
+            thread.join()
+        for thread in self._captures:
+            thread.join(2.0)
+        for station in self.stations:
+            station.pose.close()
+            if station.timestamp is not None:
+                station.counter.finish(station.timestamp)  # times each station's last rep
+
+    def summary(self):
+        return [station.summary() for station in self.stations]
+
+    def _all_done(self):
+        return all(s.finished and s.frame is None and not s.queued for s in self.stations)
+
+    def _capture_loop(self, station):
+        cap = cv2.VideoCapture(station.source)
+        interval = 0.0
+        if self.pace and isinstance(station.source, str):
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            interval = 1.0 / fps if fps > 0 else 0.0
+        next_frame = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                # Files are timed by their own clock so unpaced runs count like paced ones
+                if isinstance(station.source, str):
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                else:
+                    timestamp = time.monotonic()
+                with self._cond:
+                    station.frames_captured += 1
+                    if station.frame is not None:
+                        station.frames_dropped += 1
+                    station.frame = frame
+                    station.timestamp = timestamp
+                    if not station.queued:
+                        station.queued = True
+                        self._ready.append(station)
+                        self._cond.notify()
+                if interval:
+                    next_frame += interval
+                    time.sleep(max(0.0, next_frame - time.perf_counter()))
+        finally:
+            cap.release()
+            with self._cond:
+                station.finished = True
+                self._cond.notify_all()
+
+    def _worker_loop(self):
+        buffers = [(np.empty((self.size[1], self.size[0], 3), dtype=np.uint8),
+                    np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)) for _ in range(self.batch_size)]
+        while True:
+            with self._cond:
+                while not self._ready and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                batch = []
+                while self._ready and len(batch) < self.batch_size:
+                    station = self._ready.popleft()
+                    frame, station.frame = station.frame, None
+                    batch.append((station, frame, station.timestamp))
+
+            try:
+                self._process(batch, buffers)
+            except Exception as e:
+                # A failed frame is dropped; the worker and its stations carry on with the next one
+                self._failed([station for station, _, _ in batch], e)
+            finally:
+                with self._cond:
+                    for station, _, _ in batch:
+                        # Back of the queue if a newer frame arrived meanwhile
+                        if station.frame is not None:
+                            self._ready.append(station)
+                            self._cond.notify()
+                        else:
+                            station.queued = False
+                    self._cond.notify_all()
+
+    def _process(self, batch, buffers):
+        images = []
+        for (_, frame, _), (resized, image_rgb) in zip(batch, buffers):
+            cv2.resize(frame, self.size, dst=resized)
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=image_rgb)
+            cv2.flip(image_rgb, 1, dst=image_rgb)
+            images.append(image_rgb)
+        start = time.perf_counter()
+        results = self._infer([station for station, _, _ in batch], images)
+        elapsed = (time.perf_counter() - start) / len(batch)
+        for (station, _, timestamp), result, image_rgb in zip(batch, results, images):
+            station.inference_seconds += elapsed
+            station.frames_processed += 1
+            try:
+                if result.pose_landmarks and station.counter.update(result.pose_landmarks.landmark, timestamp):
+                    if self.on_rep is not None:
+                        self.on_rep(station)
+                if self.on_frame is not None:
+                    self.on_frame(station, image_rgb, result)
+            except Exception as e:
+                self._failed([station], e)
+
+    def _failed(self, stations, exc):
+        for station in stations:
+            station.errors += 1
+        ids = ", ".join(str(station.id) for station in stations)
+        print(f"station {ids}: frame dropped, {type(exc).__name__}: {exc}", file=sys.stderr, flush=True)
+
+    def _infer(self, stations, images):
+        if len(stations) == 1:
+            return [stations[0].pose.process(images[0])]
+        # Static frames reuse their station's last result; the rest share one call to the backend
+        results = [station.pose.cached(image) if isinstance(station.pose, CachedPose) else None
+                   for station, image in zip(stations, images)]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            for i, result in zip(pending, self.backend.process_batch([images[i] for i in pending])):
+                pose = stations[i].pose
+                results[i] = pose.store(result) if isinstance(pose, CachedPose) else result
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count reps for several stations on one machine.")
+    parser.add_argument("--station", action="append", required=True, metavar="SOURCE:EXERCISE",
+                        help="camera index, file or URL and the exercise, e.g. 0:squat (repeatable)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backend", default="mediapipe",
+                        help="pose backend: mediapipe (default) or onnx:MODEL.onnx (see backends.py)")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--min-confidence", type=float, default=0.7)
+    parser.add_argument("--smoothing", default="one_euro", choices=["none"] + sorted(FILTERS),
+                        help="temporal filter applied to the landmarks before counting")
+    parser.add_argument("--batch-size", type=int, default=4,
+                        help="stations per inference call for backends that batch (onnx)")
+    parser.add_argument("--intra-op-threads", type=int, default=0,
+                        help="ONNX Runtime threads per operator (default: its own, one per core)")
+    parser.add_argument("--inter-op-threads", type=int, default=0,
+                        help="ONNX Runtime threads across independent operators (default: its own)")
+    parser.add_argument("--no-reuse-static", dest="reuse_static", action="store_false",
+                        help="run inference on every frame, even when the scene has not changed")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--no-pace", dest="pace", action="store_false",
+                        help="read files as fast as possible instead of at their frame rate")
+    parser.add_argument("--output", default=None, help="write the final per-station summary as JSON")
+    parser.add_argument("--events", default=None, metavar="SINKS",
+                        help="comma-separated event sinks (see events.py), e.g. events.jsonl,tcp://127.0.0.1:9200")
+    parser.add_argument("--web-port", type=int, default=None,
+                        help="serve annotated MJPEG streams and live counts to browsers on this port (see web.py)")
+    parser.add_argument("--web-host", default="127.0.0.1", help="address to serve on; 0.0.0.0 for other devices")
+    parser.add_argument("--web-fps", type=float, default=15.0, help="most frames per second sent to each viewer")
+    args = parser.parse_args(argv)
+
+    try:
+        bus = make_bus(args.events, {"app": "server"})
+    except (OSError, ValueError) as e:
+        parser.error(f"invalid --events: {e}")
+    try:
+        backend_name, _ = parse_backend(args.backend)
+    except ValueError as e:
+        parser.error(f"invalid --backend: {e}")
+
+    def build_backend():
+        return make_backend(
+            args.backend,
+            model_complexity=args.model_complexity,
+            min_detection_confidence=args.min_confidence,
+            min_tracking_confidence=args.min_confidence,
+            smooth_landmarks=True,
+            intra_op_threads=args.intra_op_threads,
+            inter_op_threads=args.inter_op_threads,
+            batch_size=args.batch_size,
+        )
+
+    # A stateless backend serves every station (and batches across them); MediaPipe tracks, so one per station
+    shared = build_backend() if BACKENDS[backend_name].stateless else None
+
+    stations = []
+    for i, spec in enumerate(args.station):
+        source, _, exercise = spec.rpartition(":")
+        if not source or exercise not in EXERCISES:
+            parser.error(f"invalid --station {spec!r}; expected SOURCE:EXERCISE with one of {sorted(EXERCISES)}")
+        pose = shared or build_backend()
+        if args.reuse_static:
+            pose = CachedPose(pose)
+        listener = functools.partial(bus.emit, station=i) if bus else None
+        stations.append(Station(i, parse_source(source), exercise, pose, smoothing=args.smoothing, listener=listener))
+
+    web = None
+    if args.web_port is not None:
+        from web import WebServer
+
+        try:
+            web = WebServer(stations, port=args.web_port, host=args.web_host, max_fps=args.web_fps)
+        except OSError as e:
+            parser.error(f"unable to serve on {args.web_host}:{args.web_port}: {e}")
+
+    def on_rep(station):
+        print(f"station {station.id}: {station.counter.exercise.name} rep {station.counter.reps}", flush=True)
+        if web is not None:
+            web.on_rep(station)
+
+    server = StationServer(stations, workers=args.workers, pace=args.pace, on_rep=on_rep,
+                           backend=shared, batch_size=args.batch_size, on_frame=web.on_frame if web else None)
+    if bus:
+        for station in stations:
+            bus.emit("session_start", station=station.id, source=str(station.source),
+                     exercise=station.counter.exercise.name)
+    if web is not None:
+        web.start()
+        print(f"serving stations on http://{web.address[0]}:{web.address[1]}/", file=sys.stderr, flush=True)
+    server.start()
+    try:
+        server.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if web is not None:
+            web.stop()
+
+    summary = server.summary()
+    if bus:
+        for row in summary:
+            bus.emit("session_stop", **row)
+        bus.close()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
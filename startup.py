@@ -0,0 +1,53 @@
+"""Startup helpers: build slow objects off the GUI thread and time the milestones."""
+import threading
+import time
+
+
+class StartupClock:
+    """Seconds from construction to named milestones, each recorded once.
+
+    Create it before the heavy imports so the times include them. Silent
+    unless log (e.g. print) is given; the times are always kept in marks.
+    """
+
+    def __init__(self, log=None):
+        self.start = time.perf_counter()
+        self.log = log
+        self.marks = {}
+
+    def mark(self, event):
+        """Records event the first time it is reached; returns whether it was new."""
+        if event in self.marks:
+            return False
+        elapsed = self.marks[event] = time.perf_counter() - self.start
+        if self.log is not None:
+            self.log(f"{event}: {elapsed:.2f} s")
+        return True
+
+
+class BackgroundLoader:
+    """Calls build() on a daemon thread, then on_ready(result) or on_error(exc) from that thread.
+
+    With Qt, pass a signal's emit as the callbacks to get the result back on
+    the GUI thread.
+    """
+
+    def __init__(self, build, on_ready, on_error=None):
+        self._build = build
+        self._on_ready = on_ready
+        self._on_error = on_error
+        self._thread = threading.Thread(target=self._run, name="background-loader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            result = self._build()
+        except Exception as e:
+            if self._on_error is None:
+                raise
+            self._on_error(e)
+            return
+        self._on_ready(result)
@@ -0,0 +1,208 @@
+"""Rep tempo: rep and phase durations and range of motion, as running statistics.
+
+Times come from the timestamps the counter is fed (capture time in the
+apps, stream time offline), never from the frame count, so dropped frames
+do not stretch or shrink a rep. Every frame costs a few comparisons; the
+statistics are running accumulators updated once per phase, so nothing
+grows with the length of the session.
+"""
+import math
+from typing import NamedTuple
+
+
+class RunningStat:
+    """Count, mean, standard deviation (Welford), min, max and last value of a stream, in O(1) per value."""
+
+    __slots__ = ("count", "mean", "min", "max", "last", "_m2")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+        self._m2 = 0.0
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def summary(self, digits=2):
+        """Rounded mean, std, min, max and last; None before the first value."""
+        if not self.count:
+            return None
+        return {"mean": round(self.mean, digits), "std": round(self.std, digits), "min": round(self.min, digits),
+                "max": round(self.max, digits), "last": round(self.last, digits)}
+
+
+class RepTempo(NamedTuple):
+    """One timed rep: when it counted, its duration, the duration of each phase and its range of motion."""
+    rep: int
+    timestamp: float
+    seconds: float
+    concentric: float
+    eccentric: float
+    rom: float
+
+
+class _End:
+    # One end of the movement: its extreme and the first and last times the angle was within tolerance of it
+    __slots__ = ("extreme", "arrive", "depart", "_arrive_value")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.extreme = None
+        self.arrive = self.depart = None
+        self._arrive_value = None
+
+    def update(self, value, timestamp, tolerance):
+        # value grows towards this end; a new extreme moves the arrival once the old one is out of tolerance
+        if self.extreme is None or value > self.extreme:
+            self.extreme = value
+            if self._arrive_value is None or self._arrive_value < value - tolerance:
+                self.arrive = timestamp
+                self._arrive_value = value
+        if value >= self.extreme - tolerance:
+            self.depart = timestamp
+
+
+class TempoTracker:
+    """Times the phases of a RepCounter from the angle and phase it reaches on each frame.
+
+    The two ends of the movement are where the angle goes past reset_at and
+    past count_at. At each end the tracker keeps the extreme angle and the
+    first and last frames within tolerance (degrees; by default 5% of the
+    span between the thresholds) of it, which is where the movement arrives
+    and leaves. A phase runs from leaving one end to arriving at the other,
+    so pauses at the top and bottom are left out of it; a rep runs from
+    leaving the reset end to arriving back at it, with the pause at the
+    count end, and its range of motion is the spread between the two
+    extremes. Which phase is concentric is Exercise.concentric.
+
+    The phase towards count_at is timed when the counter re-arms. The
+    return phase, which completes the rep, is timed once the arrival back
+    past reset_at is settled: when the angle leaves the reset end again,
+    when the next rep counts, or at finish() for the last rep of a session.
+    """
+
+    def __init__(self, exercise, tolerance=None):
+        self.exercise = exercise
+        sign = 1.0 if exercise.count_at > exercise.reset_at else -1.0
+        self._sign = sign
+        self._reset_at = sign * exercise.reset_at
+        self._count_at = sign * exercise.count_at
+        self.tolerance = 0.05 * abs(exercise.count_at - exercise.reset_at) if tolerance is None else tolerance
+        self.rep_seconds = RunningStat()
+        self.concentric = RunningStat()
+        self.eccentric = RunningStat()
+        self.rom = RunningStat()
+        self._rest = _End()  # past reset_at, in -signed angle
+        self._peak = _End()  # past count_at, in signed angle
+        self.reset()
+
+    def reset(self):
+        for stat in (self.rep_seconds, self.concentric, self.eccentric, self.rom):
+            stat.reset()
+        self._rest.clear()
+        self._peak.clear()
+        self.last = None
+        self._counted = False
+        self._reps = 0
+        self._count_time = None
+        self._left_rest = None  # (time, extreme) of the reset end the current rep started from
+        self._towards = None  # (seconds, peak departure time, peak extreme) of the current rep
+
+    def update(self, angle, timestamp, counted):
+        """Feeds one frame's angle and the counter's phase after it; returns a RepTempo when a rep completes."""
+        signed = self._sign * angle
+        if signed > self._count_at:
+            self._peak.update(signed, timestamp, self.tolerance)
+        elif signed < self._reset_at:
+            self._rest.update(-signed, timestamp, self.tolerance)
+        if counted == self._counted:
+            # Leaving the reset end after coming back to it: the arrival there is final
+            rest = self._rest
+            if not counted and self._towards is not None and rest.extreme is not None:
+                if -signed < rest.extreme - self.tolerance:
+                    return self._complete()
+            return None
+        self._counted = counted
+        if not counted:
+            self._rearmed()
+            return None
+        return self._counted_rep(timestamp)
+
+    def finish(self, timestamp):
+        """Times the rep still open when the session stops at timestamp; returns its RepTempo, or None
+        when the angle had not come back past reset_at by then."""
+        if self._counted or self._rest.arrive is None or self._rest.arrive > timestamp:
+            return None
+        return self._complete()
+
+    def _rearmed(self):
+        # The count end is behind: time the phase that led to it
+        peak, started = self._peak, self._left_rest
+        if started is not None and peak.arrive is not None:
+            seconds = peak.arrive - started[0]
+            self._phase(0).push(seconds)
+            self._towards = (seconds, peak.depart, peak.extreme)
+        else:
+            self._towards = None
+        peak.clear()
+
+    def _complete(self):
+        # Back at the reset end: time the return phase and, with it, the rep; once per rep
+        rest, towards, started = self._rest, self._towards, self._left_rest
+        self._towards = None
+        if towards is None or rest.arrive is None:
+            return None
+        seconds, peak_departure, peak = towards
+        back = rest.arrive - peak_departure
+        self._phase(1).push(back)
+        phases = (seconds, back)
+        rep = self.last = RepTempo(self._reps, self._count_time, rest.arrive - started[0],
+                                   phases[self.exercise.concentric], phases[1 - self.exercise.concentric],
+                                   peak + started[1])
+        self.rep_seconds.push(rep.seconds)
+        self.rom.push(rep.rom)
+        return rep
+
+    def _counted_rep(self, timestamp):
+        # The reset end is behind: the previous rep is complete if it was not already, and the next one starts
+        rep = self._complete()
+        rest = self._rest
+        self._left_rest = None if rest.depart is None else (rest.depart, rest.extreme)
+        rest.clear()
+        self._reps += 1
+        self._count_time = timestamp
+        return rep
+
+    def _phase(self, phase):
+        return self.concentric if phase == self.exercise.concentric else self.eccentric
+
+    def describe(self):
+        """Mean rep and phase times and range of motion, for a status line; empty before the first timed rep."""
+        if not self.rep_seconds.count:
+            return ""
+        return (f"rep {self.rep_seconds.mean:.1f} s (concentric {self.concentric.mean:.1f} s, "
+                f"eccentric {self.eccentric.mean:.1f} s) | ROM {self.rom.mean:.0f}°")
+
+    def summary(self):
+        """Statistics of the timed reps and phases, for session output."""
+        return {"reps_timed": self.rep_seconds.count, "rep_seconds": self.rep_seconds.summary(),
+                "concentric_seconds": self.concentric.summary(), "eccentric_seconds": self.eccentric.summary(),
+                "rom_degrees": self.rom.summary(1)}
@@ -0,0 +1,48 @@
+"""Synthetic landmark sessions and a frame-by-frame reference count, shared by the tests and benchmarks."""
+import numpy as np
+
+from counting import SIDES, RepCounter
+from landmarks import NUM_LANDMARKS, Landmark
+
+
+def synthetic_session(rng, frames, fps=30.0, drop_rate=0.02, clock="monotonic"):
+    """(frames, 33, 4) landmarks and timestamps; undetected frames are NaN.
+
+    clock is "monotonic" (jittered, some repeated stamps), "backwards" (a
+    few stamps step back) or "shuffled".
+    """
+    t = np.arange(frames) / fps + rng.normal(0, 0.002, frames)
+    repeated = np.flatnonzero(rng.random(frames - 1) < 0.01) + 1
+    t[repeated] = t[repeated - 1]
+    if clock == "backwards":
+        t[rng.random(frames) < 0.01] -= 2.0 / fps
+    elif clock == "shuffled":
+        t = rng.permutation(t)
+    base = rng.random((NUM_LANDMARKS, 2)) * 0.6 + 0.2
+    amplitude = rng.uniform(0.05, 0.25, (NUM_LANDMARKS, 2))
+    frequency = rng.uniform(0.2, 1.5, (NUM_LANDMARKS, 2))
+    phase = rng.uniform(0, 2 * np.pi, (NUM_LANDMARKS, 2))
+    points = np.empty((frames, NUM_LANDMARKS, 4), dtype=np.float32)
+    points[..., :2] = base + amplitude * np.sin(2 * np.pi * frequency * t[:, None, None] + phase)
+    points[..., :2] += rng.normal(0, 0.004, (frames, NUM_LANDMARKS, 2))
+    points[..., 2] = rng.normal(0, 0.1, (frames, NUM_LANDMARKS))
+    # Visibility drifts per side, so the counted side changes now and then
+    drift = 0.65 + 0.3 * np.sin(2 * np.pi * rng.uniform(0.02, 0.1, 2) * t[:, None] + rng.uniform(0, 6, 2))
+    points[..., 3] = np.clip(drift[:, :1] + rng.normal(0, 0.05, (frames, NUM_LANDMARKS)), 0, 1)
+    points[:, 1::2, 3] = np.clip(drift[:, 1:] + rng.normal(0, 0.05, (frames, NUM_LANDMARKS // 2)), 0, 1)
+    points[rng.random(frames) < drop_rate] = np.nan
+    return points, t
+
+
+def online(points, timestamps, exercise, landmark_filter, angle_filter):
+    """RepCounter.update over the detected frames; returns the counter, phase-change frames and sides."""
+    counter = RepCounter(exercise, landmark_filter=landmark_filter, angle_filter=angle_filter)
+    toggles, sides = [], []
+    detected = ~np.isnan(points[:, 0, 0])
+    for i, (frame, t) in enumerate(zip(points[detected].tolist(), timestamps[detected].tolist())):
+        counted = counter.counted
+        counter.update([Landmark(*values) for values in frame], t)
+        if counter.counted != counted:
+            toggles.append(i)
+        sides.append(SIDES.index(counter.side))
+    return counter, toggles, sides
@@ -0,0 +1,181 @@
+"""Backend specs and OnnxBackend on a tiny hand-built landmark model."""
+import numpy as np
+import pytest
+
+from backends import OnnxBackend, backend_factory, make_backend, parse_backend
+from landmarks import NUM_LANDMARKS
+
+SIZE = 256  # model input, square
+
+# Landmark 0 reads the mean red and green of the input, so channel order shows in its x and y;
+# landmarks 1-3 are constants in input pixels; the presence score is the mean of the whole input
+CORNER, CENTER, FAR_CORNER = (0.0, 64.0, 12.8, 0.0), (128.0, 128.0, 25.6, 4.0), (256.0, 192.0, 0.0, -4.0)
+
+
+# ONNX is protobuf; the few messages a model needs are encoded here so the onnx package is not required
+
+def _varint(value):
+    out = bytearray()
+    value &= (1 << 64) - 1
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def _field(number, value):
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def _message(*fields):
+    return b"".join(_field(number, value) for number, value in fields)
+
+
+def _tensor(name, array):
+    dtype = {np.dtype(np.float32): 1, np.dtype(np.int64): 7}[array.dtype]
+    return _message(*[(1, d) for d in array.shape], (2, dtype), (8, name), (9, array.tobytes()))
+
+
+def _value_info(name, shape):
+    dims = [_message((2, d) if isinstance(d, str) else (1, d)) for d in shape]
+    tensor_type = _message((1, 1), (2, _message(*[(1, d) for d in dims])))
+    return _message((1, name), (2, _message((1, tensor_type))))
+
+
+def _node(op_type, inputs, outputs, ints=None, **attributes):
+    fields = [(1, name) for name in inputs] + [(2, name) for name in outputs] + [(4, op_type)]
+    for name, value in (ints or {}).items():
+        fields.append((5, _message((1, name), *[(8, v) for v in value], (20, 7))))
+    for name, value in attributes.items():
+        fields.append((5, _message((1, name), (3, value), (20, 2))))
+    return _message(*fields)
+
+
+def build_model(path, batch="N", channels_first=False, spatial=(SIZE, SIZE)):
+    """Writes the test model; batch is a fixed size or a dimension name."""
+    height, width = spatial
+    shape = [batch, 3, height, width] if channels_first else [batch, height, width, 3]
+    axes = [2, 3] if channels_first else [1, 2]
+    weights = np.zeros((3, NUM_LANDMARKS * 5), dtype=np.float32)
+    weights[0, 0] = weights[1, 1] = SIZE  # landmark 0: x from red, y from green
+    bias = np.zeros((NUM_LANDMARKS, 5), dtype=np.float32)
+    bias[:, 3] = 10.0  # visible
+    bias[1, :4], bias[2, :4], bias[3, :4] = CORNER, CENTER, FAR_CORNER
+    graph = _message(
+        (1, _node("ReduceMean", ["input"], ["mean"], ints={"axes": axes}, keepdims=0)),
+        (1, _node("MatMul", ["mean", "weights"], ["product"])),
+        (1, _node("Add", ["product", "bias"], ["landmarks"])),
+        (1, _node("ReduceMean", ["mean"], ["presence"], ints={"axes": [1]}, keepdims=1)),
+        (2, "test_pose"),
+        (5, _tensor("weights", weights)),
+        (5, _tensor("bias", bias.reshape(1, -1))),
+        (11, _value_info("input", shape)),
+        (12, _value_info("landmarks", [batch, NUM_LANDMARKS * 5])),
+        (12, _value_info("presence", [batch, 1])),
+    )
+    path.write_bytes(_message((1, 7), (7, graph), (8, _message((1, ""), (2, 13)))))
+    return str(path)
+
+
+@pytest.fixture
+def ort():
+    return pytest.importorskip("onnxruntime")
+
+
+def frame(width, height, color=(255, 255, 255)):
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = color
+    return image
+
+
+def points(result):
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in result.pose_landmarks.landmark])
+
+
+def test_parse_backend(tmp_path):
+    assert parse_backend("mediapipe") == ("mediapipe", None)
+    model = tmp_path / "pose.onnx"
+    model.write_bytes(b"")
+    assert parse_backend(f"onnx:{model}") == ("onnx", str(model))
+    with pytest.raises(ValueError, match="not found"):
+        parse_backend(f"onnx:{tmp_path / 'missing.onnx'}")
+    for spec in ("onnx", "onnx:", "mediapipe:full", "tflite:pose.tflite", ""):
+        with pytest.raises(ValueError, match="unknown pose backend"):
+            parse_backend(spec)
+    with pytest.raises(ValueError):
+        make_backend(f"onnx:{tmp_path / 'missing.onnx'}")
+
+
+def test_rejects_a_dynamic_frame_size(ort, tmp_path):
+    model = build_model(tmp_path / "pose.onnx", spatial=("H", "W"))
+    with pytest.raises(ValueError, match="fixed frame size"):
+        OnnxBackend(model)
+
+
+@pytest.mark.parametrize("channels_first", [False, True], ids=["nhwc", "nchw"])
+def test_letterbox_maps_back_to_the_frame(ort, tmp_path, channels_first):
+    backend = make_backend(f"onnx:{build_model(tmp_path / 'pose.onnx', channels_first=channels_first)}",
+                           min_detection_confidence=0.0)
+    assert backend.stateless and backend.input_size == (SIZE, SIZE) and backend.channels_first == channels_first
+    # A 2:1 frame fills the middle half of the input: scale 0.5, 64 rows of border above and below
+    result = backend.process(frame(2 * SIZE, SIZE))
+    assert len(result.pose_landmarks.landmark) == NUM_LANDMARKS
+    p = points(result)
+    np.testing.assert_allclose(p[1], (0.0, 0.0, 0.05, 0.5), atol=1e-5)  # z / frame width in input pixels
+    np.testing.assert_allclose(p[2], (0.5, 0.5, 0.1, 1 / (1 + np.exp(-4.0))), atol=1e-5)
+    np.testing.assert_allclose(p[3], (1.0, 1.0, 0.0, 1 / (1 + np.exp(4.0))), atol=1e-5)
+    # And a 1:2 frame its middle columns
+    p = points(backend.process(frame(SIZE // 2, SIZE)))
+    np.testing.assert_allclose(p[2, :2], ((128 - 64) / SIZE * 2, 0.5), atol=1e-5)
+
+
+@pytest.mark.parametrize("channels_first", [False, True], ids=["nhwc", "nchw"])
+def test_channel_order(ort, tmp_path, channels_first):
+    backend = OnnxBackend(build_model(tmp_path / "pose.onnx", channels_first=channels_first),
+                          min_detection_confidence=0.0)
+    p = points(backend.process(frame(SIZE, SIZE, (255, 0, 0))))
+    np.testing.assert_allclose(p[0, :2], (1.0, 0.0), atol=1e-5)
+    p = points(backend.process(frame(SIZE, SIZE, (0, 255, 0))))
+    np.testing.assert_allclose(p[0, :2], (0.0, 1.0), atol=1e-5)
+
+
+def test_value_range(ort, tmp_path):
+    model = build_model(tmp_path / "pose.onnx")
+    backend = OnnxBackend(model, value_range=(-1.0, 1.0), min_detection_confidence=0.0)
+    p = points(backend.process(frame(SIZE, SIZE, (255, 0, 128))))
+    np.testing.assert_allclose(p[0, :2], (1.0, -1.0), atol=1e-5)
+    assert backend.process(frame(SIZE, SIZE, (0, 0, 0))).pose_landmarks is None  # presence -1
+    assert OnnxBackend(model, min_detection_confidence=0.0).process(frame(SIZE, SIZE, (0, 0, 0))).pose_landmarks
+
+
+@pytest.mark.parametrize("batch, batch_size", [("N", 2), ("N", 8), (4, 8), (1, 8)])
+def test_process_batch(ort, tmp_path, batch, batch_size):
+    backend = OnnxBackend(build_model(tmp_path / "pose.onnx", batch=batch), batch_size=batch_size)
+    assert backend.batch_size == (batch if isinstance(batch, int) else batch_size)
+    # Alternating white and black frames: only the white ones reach the presence threshold
+    images = [frame(SIZE, SIZE, (255, 255, 255) if i % 2 == 0 else (0, 0, 0)) for i in range(5)]
+    results = backend.process_batch(images)
+    assert [r.pose_landmarks is not None for r in results] == [True, False, True, False, True]
+    one_by_one = [backend.process(image) for image in images[::2]]
+    for batched, single in zip(results[::2], one_by_one):
+        np.testing.assert_allclose(points(batched), points(single), atol=1e-5)
+
+
+def test_letterbox_borders_are_cleared(ort, tmp_path):
+    # A white square fills the whole input; a white 2:1 frame after it must leave black borders behind
+    backend = OnnxBackend(build_model(tmp_path / "pose.onnx"), min_detection_confidence=0.75)
+    assert backend.process(frame(SIZE, SIZE)).pose_landmarks is not None
+    assert backend.process(frame(2 * SIZE, SIZE)).pose_landmarks is None  # presence 0.5
+    results = backend.process_batch([frame(SIZE, SIZE), frame(2 * SIZE, SIZE), frame(SIZE, SIZE)])
+    assert [r.pose_landmarks is not None for r in results] == [True, False, True]
+
+
+def test_backend_factory_shares_a_stateless_backend(ort, tmp_path):
+    make_pose = backend_factory(f"onnx:{build_model(tmp_path / 'pose.onnx')}", batch_size=2)
+    assert make_pose(0) is make_pose(1) is make_pose(2)
+    assert make_pose(0).batch_size == 2
@@ -0,0 +1,155 @@
+"""EventBus delivery and the event sinks, against the local stand-in backend."""
+import io
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from events import (EventBus, JsonlSink, MemorySink, SocketSink, StandInServer, WebSocketSink, make_bus, make_sink,
+                    ws_accept, ws_frame, ws_mask)
+
+
+class FailingSink(MemorySink):
+    def write(self, events):
+        raise ConnectionError("backend down")
+
+
+@pytest.fixture
+def stand_in():
+    """A StandInServer on a free local port; its output is a StringIO."""
+    server = StandInServer(("127.0.0.1", 0), out=io.StringIO())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def received(server, count, timeout=5.0):
+    """The first count events the stand-in printed, waiting for them up to timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        lines = server.out.getvalue().splitlines()
+        if len(lines) >= count or time.monotonic() > deadline:
+            return [json.loads(line) for line in lines]
+        time.sleep(0.01)
+
+
+def test_events_are_delivered_in_order_with_the_context():
+    sink = MemorySink()
+    bus = EventBus([sink], context={"app": "test"}, batch_size=4, flush_interval=0.01).start()
+    for i in range(10):
+        bus.emit("rep", rep=i)
+    bus.close()
+    assert [event["rep"] for event in sink.events] == list(range(10))
+    assert all(event["type"] == "rep" and event["app"] == "test" and "time" in event for event in sink.events)
+    assert sink.batches >= 3  # at most batch_size events per write
+    assert bus.emitted == 10 and bus.dropped == 0
+
+
+def test_close_without_start_delivers_the_queue():
+    sink = MemorySink()
+    bus = EventBus([sink], batch_size=3)
+    for i in range(7):
+        bus.emit("phase", frame=i)
+    bus.close()
+    assert [event["frame"] for event in sink.events] == list(range(7))
+    assert sink.batches == 3
+
+
+def test_a_full_queue_drops_the_oldest():
+    sink = MemorySink()
+    bus = EventBus([sink], maxsize=5)
+    for i in range(8):
+        bus.emit("rep", rep=i)
+    bus.close()
+    assert bus.dropped == 3
+    assert [event["rep"] for event in sink.events] == [3, 4, 5, 6, 7]
+
+
+def test_a_failing_sink_does_not_stop_the_others():
+    errors = []
+    sink = MemorySink()
+    bus = EventBus([FailingSink(), sink], batch_size=2, on_error=errors.append)
+    for i in range(4):
+        bus.emit("rep", rep=i)
+    bus.close()
+    assert len(sink.events) == 4
+    assert len(errors) == 2 and all(isinstance(e, ConnectionError) for e in errors)
+
+
+def test_jsonl_sink_appends(tmp_path):
+    path = tmp_path / "sessions" / "events.jsonl"
+    for session in ("a", "b"):
+        bus = EventBus([JsonlSink(str(path))])
+        bus.emit("session_start", session=session)
+        bus.emit("session_stop", session=session, reps=3)
+        bus.close()
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(event["type"], event["session"]) for event in events] == [
+        ("session_start", "a"), ("session_stop", "a"), ("session_start", "b"), ("session_stop", "b")]
+    assert events[-1]["reps"] == 3
+
+
+def test_tcp_sink(stand_in):
+    port = stand_in.server_address[1]
+    bus = make_bus(f"tcp://127.0.0.1:{port}", context={"app": "test"})
+    for i in range(3):
+        bus.emit("rep", rep=i)
+    bus.close()
+    events = received(stand_in, 3)
+    assert [(event["type"], event["rep"], event["app"]) for event in events] == [("rep", i, "test") for i in range(3)]
+
+
+def test_websocket_sink(stand_in):
+    port = stand_in.server_address[1]
+    sink = WebSocketSink(f"ws://127.0.0.1:{port}/events")
+    bus = EventBus([sink], batch_size=2)
+    for i in range(5):
+        bus.emit("tempo", rep=i, note="x" * 200)  # batches past the 126-byte frame length
+    bus.close()
+    assert [event["rep"] for event in received(stand_in, 5)] == list(range(5))
+
+
+def test_socket_sink_retries_at_most_every_retry_seconds():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]  # nothing listens here once closed
+    sink = SocketSink(("127.0.0.1", port), timeout=0.5, retry=60.0)
+    with pytest.raises(ConnectionRefusedError):
+        sink.write([{"type": "rep"}])
+    with pytest.raises(ConnectionError, match="retrying"):
+        sink.write([{"type": "rep"}])
+    sink.close()
+
+
+def test_make_sink(tmp_path):
+    assert isinstance(make_sink("memory"), MemorySink)
+    assert make_sink("tcp://127.0.0.1:9200").address == ("127.0.0.1", 9200)
+    assert make_sink("unix:///tmp/landmarks.sock").address == "/tmp/landmarks.sock"
+    ws = make_sink("ws://127.0.0.1:9200/events?token=1")
+    assert isinstance(ws, WebSocketSink) and ws.resource == "/events?token=1"
+    jsonl = make_sink(str(tmp_path / "events.jsonl"))
+    assert isinstance(jsonl, JsonlSink)
+    jsonl.close()
+    with pytest.raises(ValueError):
+        make_sink("http://127.0.0.1:9200")
+    with pytest.raises(ValueError):
+        WebSocketSink("wss://127.0.0.1/events")
+    assert make_bus("") is None and make_bus(None) is None
+
+
+def test_websocket_helpers():
+    # The handshake example of RFC 6455, section 1.3
+    assert ws_accept("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+    payload = bytes(range(256)) * 3
+    key = b"\x01\x02\x03\x04"
+    assert ws_mask(ws_mask(payload, key), key) == payload
+    assert ws_mask(b"", key) == b""
+    for length, header in ((125, 2), (126, 4), (1 << 16, 10)):
+        frame = ws_frame(b"a" * length)
+        assert len(frame) == header + length and frame[0] == 0x81
+        masked = ws_frame(b"a" * length, mask=True)
+        assert masked[1] & 0x80 and ws_mask(masked[header + 4:], masked[header:header + 4]) == b"a" * length
@@ -0,0 +1,78 @@
+"""The landmark and angle filters: smoothing, tracking and state handling."""
+import numpy as np
+import pytest
+
+from filters import FILTERS, PRESETS, KalmanFilter, OneEuroFilter, make_filter
+
+FPS = 30.0
+
+
+def run(f, signal, fps=FPS):
+    """Feeds (frames, ...) samples one frame at a time; returns the filtered series."""
+    out = np.empty_like(signal)
+    for i, sample in enumerate(signal):
+        out[i] = f(sample.copy(), i / fps)
+    return out
+
+
+@pytest.fixture(params=sorted(FILTERS))
+def degrees_filter(request):
+    return make_filter(request.param, (3,), "degrees")
+
+
+def test_first_frame_passes_through(degrees_filter):
+    x = np.array([10.0, 20.0, 30.0], dtype=np.float32)
+    assert degrees_filter(x.copy(), 0.0).tolist() == x.tolist()
+
+
+def test_smooths_in_place(degrees_filter):
+    degrees_filter(np.zeros(3, dtype=np.float32), 0.0)
+    x = np.full(3, 10.0, dtype=np.float32)
+    out = degrees_filter(x, 1 / FPS)
+    assert out is x
+    assert np.all((0.0 < x) & (x < 10.0))
+
+
+def test_reduces_jitter_at_rest(degrees_filter):
+    rng = np.random.default_rng(0)
+    noisy = (90.0 + rng.normal(0, 3.0, (300, 3))).astype(np.float32)
+    smoothed = run(degrees_filter, noisy)
+    assert smoothed[30:].std() < 0.75 * noisy[30:].std()
+    assert abs(smoothed[30:].mean() - 90.0) < 1.0
+
+
+def test_follows_a_rep(degrees_filter):
+    # A 0.5 Hz swing between 60 and 170 degrees: the filtered angle still reaches both ends
+    t = np.arange(300) / FPS
+    angle = 115.0 - 55.0 * np.cos(np.pi * t)
+    smoothed = run(degrees_filter, np.repeat(angle[:, None], 3, axis=1).astype(np.float32))
+    assert smoothed[60:].max() > 160.0
+    assert smoothed[60:].min() < 70.0
+
+
+def test_reset_restarts_from_the_next_frame(degrees_filter):
+    run(degrees_filter, np.zeros((10, 3), dtype=np.float32))
+    degrees_filter.reset()
+    x = np.full(3, 50.0, dtype=np.float32)
+    assert degrees_filter(x.copy(), 100.0).tolist() == x.tolist()
+
+
+@pytest.mark.parametrize("step", [0.0, -1.0])
+def test_repeated_or_backwards_timestamps_stay_finite(degrees_filter, step):
+    degrees_filter(np.zeros(3, dtype=np.float32), 1.0)
+    out = degrees_filter(np.full(3, 10.0, dtype=np.float32), 1.0 + step)
+    assert np.all(np.isfinite(out))
+    assert np.all((0.0 <= out) & (out <= 10.0))
+
+
+def test_make_filter():
+    assert make_filter(None, (3,)) is None
+    assert make_filter("none", (3,)) is None
+    f = make_filter("one_euro", (33, 3))
+    assert isinstance(f, OneEuroFilter) and f.shape == (33, 3)
+    assert f.beta == PRESETS[("one_euro", "landmarks")]["beta"]
+    assert make_filter("kalman", (1,), "degrees").process_noise == PRESETS[("kalman", "degrees")]["process_noise"]
+    instance = KalmanFilter((2,))
+    assert make_filter(instance, (2,)) is instance
+    with pytest.raises(KeyError):
+        make_filter("median", (3,))
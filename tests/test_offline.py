@@ -0,0 +1,53 @@
+"""offline.count_points must count exactly like RepCounter fed frame by frame."""
+import numpy as np
+import pytest
+
+from counting import EXERCISES
+from offline import count_points
+from synthetic import online, synthetic_session
+
+FRAMES = 1000
+CLOCKS = ["monotonic", "backwards", "shuffled"]
+FILTERS = [(None, None), ("one_euro", None), (None, "one_euro")]
+
+
+def variants():
+    for exercise in EXERCISES.values():
+        yield exercise
+        yield exercise._replace(hold=1, min_phase=0.0)
+        yield exercise._replace(hold=4, min_phase=0.5)
+        yield exercise._replace(bilateral=False)
+
+
+@pytest.fixture(scope="module", params=CLOCKS)
+def session(request):
+    """Noisy, wandering joints with side swaps, dropped frames and the given timestamp clock."""
+    rng = np.random.default_rng(CLOCKS.index(request.param))
+    return synthetic_session(rng, FRAMES, clock=request.param)
+
+
+@pytest.mark.parametrize("landmark_filter, angle_filter", FILTERS)
+@pytest.mark.parametrize("exercise", list(variants()),
+                         ids=lambda e: f"{e.name}-hold{e.hold}-min{e.min_phase}-{'both' if e.bilateral else 'one'}")
+def test_parity(session, exercise, landmark_filter, angle_filter):
+    points, timestamps = session
+    counter, toggles, sides = online(points, timestamps, exercise, landmark_filter, angle_filter)
+    result = count_points(points, timestamps, [exercise], landmark_filter, angle_filter)[exercise.name]
+    assert result.toggles.tolist() == toggles
+    assert result.sides.tolist() == sides
+    assert (result.reps, result.faults) == (counter.reps, counter.faults)
+
+
+def test_counted_matches_toggles(session):
+    points, timestamps = session
+    for name, result in count_points(points, timestamps).items():
+        counted = result.counted
+        assert len(counted) == len(result.sides)
+        assert result.reps == (len(result.toggles) + 1) // 2, name
+        assert all(counted[i] for i in result.toggles[::2]), name
+        assert not any(counted[i] for i in result.toggles[1::2]), name
+
+
+def test_all_exercises_by_default(session):
+    points, timestamps = session
+    assert set(count_points(points, timestamps)) == set(EXERCISES)
@@ -0,0 +1,91 @@
+"""LandmarkRecorder -> LandmarkRecording round trip and replay."""
+import numpy as np
+import pytest
+
+from counting import EXERCISES
+from landmarks import FIELDS, NUM_LANDMARKS, Landmark
+from recording import HEADER, HEADER_SIZE, MAGIC, VERSION, LandmarkRecorder, LandmarkRecording, replay_count
+from synthetic import online, synthetic_session
+
+
+def record(path, points, timestamps, chunk=7):
+    """Writes a (frames, 33, 4) array, NaN frames as None, through a LandmarkRecorder."""
+    recorder = LandmarkRecorder(str(path), chunk=chunk)
+    for frame, t in zip(points, timestamps):
+        landmarks = None if np.isnan(frame[0, 0]) else [Landmark(*values) for values in frame.tolist()]
+        recorder.write(landmarks, t)
+    recorder.close()
+    return recorder
+
+
+@pytest.fixture
+def session():
+    return synthetic_session(np.random.default_rng(3), 100)
+
+
+def test_round_trip(tmp_path, session):
+    points, timestamps = session
+    path = tmp_path / "session.lmk"
+    recorder = record(path, points, timestamps)
+    assert recorder.frames == len(points)
+    assert not (tmp_path / "session.lmk.spool").exists()
+
+    recording = LandmarkRecording(str(path))
+    assert len(recording) == len(points)
+    np.testing.assert_array_equal(recording.timestamps, timestamps)
+    np.testing.assert_array_equal(recording.points(), points)
+    np.testing.assert_array_equal(recording.detected, ~np.isnan(points[:, 0, 0]))
+    np.testing.assert_array_equal(recording.points(("x", "visibility")), points[..., [0, 3]])
+    for i, name in enumerate(FIELDS):
+        assert getattr(recording, name).shape == (len(points), NUM_LANDMARKS)
+        np.testing.assert_array_equal(getattr(recording, name), points[..., i])
+
+
+def test_header_layout(tmp_path, session):
+    points, timestamps = session
+    path = tmp_path / "session.lmk"
+    record(path, points, timestamps)
+    data = path.read_bytes()
+    assert HEADER.unpack(data[:HEADER.size]) == (MAGIC, VERSION, NUM_LANDMARKS, len(points))
+    assert data[HEADER.size:HEADER_SIZE] == bytes(HEADER_SIZE - HEADER.size)
+    assert len(data) == HEADER_SIZE + 8 * len(points) + 4 * len(FIELDS) * len(points) * NUM_LANDMARKS
+
+
+def test_empty_recording(tmp_path):
+    path = tmp_path / "empty.lmk"
+    LandmarkRecorder(str(path)).close()
+    recording = LandmarkRecording(str(path))
+    assert len(recording) == 0
+    assert recording.points().shape == (0, NUM_LANDMARKS, len(FIELDS))
+
+
+def test_writes_after_close_are_ignored(tmp_path, session):
+    points, timestamps = session
+    path = tmp_path / "session.lmk"
+    recorder = record(path, points, timestamps)
+    recorder.write(None, 0.0)
+    recorder.close()
+    assert recorder.frames == len(points)
+    assert len(LandmarkRecording(str(path))) == len(points)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.lmk"
+    path.write_bytes(b"\0" * HEADER_SIZE)
+    with pytest.raises(ValueError, match="not a landmark recording"):
+        LandmarkRecording(str(path))
+    path.write_bytes(HEADER.pack(MAGIC, VERSION + 1, NUM_LANDMARKS, 0).ljust(HEADER_SIZE, b"\0"))
+    with pytest.raises(ValueError, match="unsupported"):
+        LandmarkRecording(str(path))
+
+
+@pytest.mark.parametrize("landmark_filter", [None, "one_euro"])
+def test_replay_counts_like_the_live_counter(tmp_path, landmark_filter):
+    points, timestamps = synthetic_session(np.random.default_rng(4), 1000)
+    path = tmp_path / "session.lmk"
+    record(path, points, timestamps, chunk=256)
+    recording = LandmarkRecording(str(path))
+    for exercise in EXERCISES.values():
+        live, _, _ = online(points, timestamps, exercise, landmark_filter, None)
+        replayed = replay_count(recording, exercise, landmark_filter=landmark_filter)
+        assert (replayed.reps, replayed.faults, replayed.side) == (live.reps, live.faults, live.side)
@@ -0,0 +1,129 @@
+"""RunningStat and rep tempo: every rep is timed, with its phases and range of motion."""
+import numpy as np
+import pytest
+
+from counting import EXERCISES, RepCounter
+from tempo import RunningStat
+
+FPS = 100.0
+# Seconds of each segment of the synthetic rep: pause at rest, towards count_at, pause there, back
+REST, TOWARDS, PAUSE, BACK = 0.5, 1.0, 0.5, 1.5
+
+
+def travel(exercise):
+    """Degrees from the rest angle to the peak angle, 10 past each threshold."""
+    return abs(exercise.count_at - exercise.reset_at) + 20.0
+
+
+def rep_angles(exercise, reps, end_at_rest=True):
+    """Piecewise linear reps, 10 degrees past each threshold; returns (angles, timestamps)."""
+    sign = 1.0 if exercise.count_at > exercise.reset_at else -1.0
+    rest = exercise.reset_at - sign * 10.0
+    peak = rest + sign * travel(exercise)
+    one = np.concatenate([np.full(int(REST * FPS), rest), np.linspace(rest, peak, int(TOWARDS * FPS)),
+                          np.full(int(PAUSE * FPS), peak), np.linspace(peak, rest, int(BACK * FPS))])
+    angles = np.concatenate([np.tile(one, reps), np.full(int(REST * FPS) if end_at_rest else 0, rest)])
+    return angles, np.arange(len(angles)) / FPS
+
+
+def feed(counter, angles, timestamps):
+    for angle, t in zip(angles.tolist(), timestamps.tolist()):
+        counter.update_angle(angle, t)
+
+
+def test_running_stat_matches_numpy():
+    values = np.random.default_rng(0).normal(3.0, 2.0, 500)
+    stat = RunningStat()
+    for value in values.tolist():
+        stat.push(value)
+    assert stat.count == len(values)
+    assert stat.mean == pytest.approx(values.mean())
+    assert stat.std == pytest.approx(values.std())
+    assert (stat.min, stat.max, stat.last) == (values.min(), values.max(), values[-1])
+    assert stat.summary(1) == {"mean": round(values.mean(), 1), "std": round(values.std(), 1),
+                               "min": round(values.min(), 1), "max": round(values.max(), 1),
+                               "last": round(values[-1], 1)}
+
+
+def test_running_stat_empty_and_reset():
+    stat = RunningStat()
+    assert stat.summary() is None and stat.std == 0.0
+    stat.push(4.0)
+    assert stat.summary() == {"mean": 4.0, "std": 0.0, "min": 4.0, "max": 4.0, "last": 4.0}
+    stat.reset()
+    assert stat.count == 0 and stat.summary() is None
+
+
+@pytest.mark.parametrize("name", ["squat", "jumping_jack"])
+def test_every_rep_is_timed(name):
+    exercise = EXERCISES[name]
+    counter = RepCounter(exercise)
+    feed(counter, *rep_angles(exercise, 5))
+    assert counter.reps == 5
+    tempo = counter.tempo
+    assert tempo.rep_seconds.count == 4  # the last one is still open
+    last = counter.finish(100.0)
+    assert last is not None and last.rep == 5
+    assert tempo.rep_seconds.count == 5
+    assert counter.finish(100.0) is None  # only once
+
+    # Pauses at either end are left out of the phases; the ends are found within tolerance of the extremes
+    slack = tempo.tolerance * BACK / travel(exercise) + 1 / FPS
+    concentric, eccentric = (TOWARDS, BACK) if exercise.concentric == 0 else (BACK, TOWARDS)
+    assert tempo.rep_seconds.mean == pytest.approx(TOWARDS + PAUSE + BACK, abs=2 * slack)
+    assert tempo.concentric.mean == pytest.approx(concentric, abs=2 * slack)
+    assert tempo.eccentric.mean == pytest.approx(eccentric, abs=2 * slack)
+    assert tempo.rom.mean == pytest.approx(travel(exercise), abs=0.5)
+    assert tempo.rep_seconds.std < 0.02
+
+
+def test_rep_is_timed_when_it_leaves_the_reset_end():
+    exercise = EXERCISES["squat"]
+    events = []
+    counter = RepCounter(exercise, listener=lambda kind, **fields: events.append((kind, fields)))
+    angles, timestamps = rep_angles(exercise, 2)
+    timed_at = []
+    for angle, t in zip(angles.tolist(), timestamps.tolist()):
+        counter.update_angle(angle, t)
+        if events and events[-1][0] == "tempo":
+            timed_at.append((counter.reps, t))
+            events.clear()
+    # Rep 1 is timed while rep 2 is on its way down, before it counts
+    assert len(timed_at) == 1
+    reps, t = timed_at[0]
+    cycle = REST + TOWARDS + PAUSE + BACK
+    assert reps == 1 and cycle + REST <= t < cycle + REST + TOWARDS / 2
+
+
+def test_finish_needs_the_angle_back_past_reset_at():
+    exercise = EXERCISES["squat"]
+    counter = RepCounter(exercise)
+    angles, timestamps = rep_angles(exercise, 1, end_at_rest=False)
+    stop = int((REST + TOWARDS + PAUSE + BACK / 2) * FPS)  # halfway back up
+    feed(counter, angles[:stop], timestamps[:stop])
+    assert counter.reps == 1
+    assert counter.finish(timestamps[stop]) is None
+    assert counter.tempo.summary()["reps_timed"] == 0
+
+
+def test_finish_emits_a_tempo_event():
+    exercise = EXERCISES["squat"]
+    events = []
+    counter = RepCounter(exercise, listener=lambda kind, **fields: events.append((kind, fields)))
+    feed(counter, *rep_angles(exercise, 1))
+    assert not [kind for kind, _ in events if kind == "tempo"]
+    rep = counter.finish(10.0)
+    kind, fields = events[-1]
+    assert kind == "tempo" and fields["rep"] == 1 and fields["seconds"] == round(rep.seconds, 3)
+
+
+def test_reset():
+    exercise = EXERCISES["squat"]
+    counter = RepCounter(exercise)
+    tracker = counter.tempo
+    feed(counter, *rep_angles(exercise, 3))
+    assert tracker.rep_seconds.count == 2
+    tracker.reset()
+    assert tracker.summary() == {"reps_timed": 0, "rep_seconds": None, "concentric_seconds": None,
+                                 "eccentric_seconds": None, "rom_degrees": None}
+    assert tracker.last is None and tracker.describe() == ""
@@ -0,0 +1,77 @@
+"""Per-stage wall-clock timing for the frame hot path."""
+import collections
+import contextlib
+import time
+
+import numpy as np
+
+
+class StageTimer:
+    """Keeps the last `window` durations of each named stage.
+
+    Each stage is expected to be written from a single thread, which is how
+    the frame pipeline uses it; reading a summary from another thread is safe.
+    listener(stage, seconds), e.g. Metrics.observe, also receives every sample.
+    """
+
+    def __init__(self, window=300, listener=None):
+        self.window = window
+        self.listener = listener
+        self._samples = {}
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = collections.deque(maxlen=self.window)
+        samples.append(seconds)
+        if self.listener is not None:
+            self.listener(stage, seconds)
+
+    def summary(self):
+        """{stage: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "fps"}} over the current window."""
+        result = {}
+        for stage, samples in list(self._samples.items()):
+            ms = np.array(samples, dtype=np.float64) * 1000.0
+            if ms.size:
+                p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+                mean = float(ms.mean())
+                result[stage] = {
+                    "count": int(ms.size),
+                    "mean_ms": mean,
+                    "p50_ms": float(p50),
+                    "p95_ms": float(p95),
+                    "p99_ms": float(p99),
+                    "fps": 1000.0 / mean if mean > 0 else float("inf"),
+                }
+        return result
+
+    def report(self, baseline=None):
+        """Text table; with a baseline summary it adds the ms saved per stage."""
+        summary = self.summary()
+        lines = [f"{'stage':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}"
+                 + (f"{'saved ms':>10}" if baseline else "")]
+        total = 0.0
+        for stage, stats in summary.items():
+            total += stats["mean_ms"]
+            line = (f"{stage:<12}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                    f"{stats['p99_ms']:>10.2f}{stats['fps']:>10.1f}")
+            if baseline:
+                before = baseline.get(stage, {}).get("mean_ms", 0.0)
+                line += f"{before - stats['mean_ms']:>10.2f}"
+            lines.append(line)
+        # The total is one frame's latency through every stage, not the throughput: with the stages
+        # on separate threads (pipeline.FramePipeline) frames overlap and the frame rate can exceed its fps
+        line = f"{'total':<12}{total:>10.2f}" + " " * 30 + f"{1000.0 / total if total > 0 else float('inf'):>10.1f}"
+        if baseline:
+            before = sum(stats["mean_ms"] for stats in baseline.values())
+            line += f"{before - total:>10.2f}"
+        lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""Loads the Qt Designer windows, preferring Python modules compiled ahead of time.
+
+Compiling skips parsing the .ui XML (and importing PyQt5.uic) at launch:
+    python ui.py            # writes ui_<name>.py next to every .ui file
+A compiled module older than its .ui file is ignored, so a stale build
+never shadows an edited layout.
+"""
+import glob
+import importlib.util
+import io
+import os
+import re
+import sys
+
+
+def compiled_path(ui_path):
+    folder, name = os.path.split(os.path.abspath(ui_path))
+    return os.path.join(folder, "ui_" + os.path.splitext(name)[0] + ".py")
+
+
+def load_ui(ui_path, window):
+    """Builds the .ui layout into window, like uic.loadUi(ui_path, window)."""
+    module_path = compiled_path(ui_path)
+    if os.path.exists(module_path) and os.path.getmtime(module_path) >= os.path.getmtime(ui_path):
+        try:
+            spec = importlib.util.spec_from_file_location(os.path.basename(module_path)[:-3], module_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        except ImportError:
+            module = None  # e.g. a resource module that was not built; parse the XML instead
+        if module is not None:
+            ui_class = next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+            ui = ui_class()
+            ui.setupUi(window)
+            # uic.loadUi exposes the widgets as attributes of the window itself
+            for name, value in vars(ui).items():
+                setattr(window, name, value)
+            return window
+
+    from PyQt5 import uic
+    return uic.loadUi(ui_path, window)
+
+
+def compile_ui(ui_path):
+    """Writes the compiled module for ui_path and returns its path."""
+    from PyQt5 import uic
+
+    source = io.StringIO()
+    uic.compileUi(ui_path, source)
+    code = source.getvalue()
+
+    # Designer keeps <include> entries for .qrc files that may no longer exist;
+    # importing their never-built _rc module would make the compiled file unusable
+    folder = os.path.dirname(os.path.abspath(ui_path))
+    for name in re.findall(r"^import (\w+)_rc$", code, flags=re.MULTILINE):
+        if not os.path.exists(os.path.join(folder, name + ".qrc")):
+            code = code.replace(f"import {name}_rc\n", "")
+
+    path = compiled_path(ui_path)
+    with open(path, "w") as f:
+        f.write(code)
+    return path
+
+
+def main(argv=None):
+    paths = argv if argv else sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.ui")))
+    for ui_path in paths:
+        print(f"{ui_path} -> {compile_ui(ui_path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
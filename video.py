@@ -0,0 +1,94 @@
+"""Offline video ingestion: hardware-accelerated decoding and frame sampling.
+
+Pose inference dominates the cost of a recorded file, and a 60 FPS video
+carries far more frames than rep counting needs. Frames that are not
+sampled are only grab()bed: the demuxer and decoder advance, but the
+frame is never retrieve()d (no color conversion, copy or resize).
+"""
+import cv2
+
+# Frames processed per rep at the exercise's fastest pace (Exercise.min_rep_seconds);
+# with hold=2 this leaves several samples on each side of both thresholds
+SAMPLES_PER_REP = 12
+
+
+def open_video(path, hw_accel=True):
+    """Opens a file, asking the backend for hardware decoding when available.
+
+    Backends without acceleration fall back to software decoding; the
+    acceleration in use is hw_acceleration(cap).
+    """
+    if hw_accel:
+        cap = cv2.VideoCapture(path, cv2.CAP_ANY, [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(path)
+
+
+def hw_acceleration(cap):
+    """Name of the decoder acceleration in use ("none" for software decoding)."""
+    value = int(cap.get(cv2.CAP_PROP_HW_ACCELERATION))
+    names = {getattr(cv2, name): name[len("VIDEO_ACCELERATION_"):].lower()
+             for name in dir(cv2) if name.startswith("VIDEO_ACCELERATION_")}
+    return names.get(value, str(value))
+
+
+def sample_rate(exercise):
+    """Frames per second needed to follow the exercise at its fastest pace."""
+    return SAMPLES_PER_REP / exercise.min_rep_seconds
+
+
+def auto_stride(exercise, fps):
+    """Largest frame stride that still samples the exercise at sample_rate(); 1 if fps is unknown."""
+    if not fps or fps <= 0:
+        return 1
+    return max(1, int(fps / sample_rate(exercise)))
+
+
+class FrameSampler:
+    """Iterates (index, timestamp, frame) over every stride-th frame of cap.
+
+    With interval (seconds) frames are picked by their own timestamps
+    instead: the first frame at or after each multiple of interval, which
+    suits variable frame rate files. size (w, h) resizes each sampled
+    frame into one reused buffer, so a yielded frame is only valid until
+    the next one. Timestamps are stream positions in seconds; frames counts
+    every frame read from the file and sampled the ones yielded.
+    """
+
+    def __init__(self, cap, stride=1, interval=None, size=None):
+        self.cap = cap
+        self.stride = stride
+        self.interval = interval
+        self.size = size
+        self.frames = 0
+        self.sampled = 0
+
+    def __iter__(self):
+        cap = self.cap
+        next_time = 0.0
+        buffer = None
+        resized = None
+        while cap.grab():
+            index = self.frames
+            self.frames += 1
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if self.interval is not None:
+                if timestamp + 1e-6 < next_time:
+                    continue
+                next_time += self.interval
+                if next_time <= timestamp:
+                    next_time = timestamp + self.interval  # skip ahead after a gap
+            elif index % self.stride:
+                continue
+
+            ret, frame = cap.retrieve(buffer)
+            if not ret:
+                break
+            buffer = frame
+            if self.size is not None:
+                resized = cv2.resize(frame, self.size, dst=resized, interpolation=cv2.INTER_AREA)
+                frame = resized
+            self.sampled += 1
+            yield index, timestamp, frame
@@ -0,0 +1,414 @@
+"""Remote viewers: annotated station frames as MJPEG and rep counts over a WebSocket.
+
+A WebServer runs an asyncio HTTP server on its own thread beside a
+server.StationServer, which hands it every processed frame (on_frame) and
+every rep (on_rep). Routes:
+
+    /                 a page with every station's stream and live counts
+    /stream/<id>      multipart/x-mixed-replace MJPEG of station id
+    /frame/<id>.jpg   the next frame of station id as one JPEG
+    /stations         JSON summary of every station
+    /ws               WebSocket pushing JSON: the summaries on connect and every
+                      status_interval seconds, and a message for each rep
+
+Frames are copied out of the pose workers only while someone is watching
+and at most max_fps times a second. Each copied frame is annotated once and
+encoded at most once per quality tier, lazily, on an encoder thread, and
+every viewer at that tier is sent the same bytes. Viewers always get the
+newest frame, so a slow one skips frames instead of queueing them; it steps
+down the quality ladder when it falls behind and back up once it keeps up.
+JPEGs are baseline with 4:2:0 chroma, which the hardware decoders of TVs
+and tablets handle.
+
+Usage:
+    python server.py --station 0:squat --web-port 8080
+"""
+import asyncio
+import collections
+import json
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from drawing import SkeletonRenderer, StatusBox
+from events import ws_accept, ws_frame, ws_mask
+from landmarks import NUM_LANDMARKS, fill_array
+
+# JPEG quality tiers, best first; a frame is encoded at most once per tier
+QUALITIES = (85, 70, 55, 40)
+
+# Late frames in a row before a viewer drops a tier, and frames on time before it climbs back
+STEP_DOWN_AFTER = 3
+STEP_UP_AFTER = 45
+
+# Bytes queued for a viewer, in the stream and in its socket, before a write waits for it to drain;
+# small, so that a slow viewer holds back the writes (and skips frames) instead of filling kernel buffers
+WRITE_BUFFER = 64 * 1024
+
+# WebSocket messages kept for a client that is not reading; older ones are dropped
+MAX_PENDING = 32
+
+BOUNDARY = "landmarksframe"
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>LandMarks</title>
+<style>
+body { margin: 0; background: #111; color: #eee; font-family: sans-serif; display: flex; flex-wrap: wrap; }
+figure { margin: 8px; }
+img { display: block; max-width: 100%; }
+figcaption { font-size: 1.5em; padding: 6px 0; }
+</style></head>
+<body>
+<!-- stations -->
+<script>
+function connect() {
+  const ws = new WebSocket(`ws://${location.host}/ws`);
+  ws.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    for (const s of message.type === "stations" ? message.stations : [message]) {
+      const caption = document.getElementById(`station-${s.station}`);
+      if (caption) caption.textContent = `${s.exercise}: ${s.reps} reps, ${s.faults} with form faults`;
+    }
+  };
+  ws.onclose = () => setTimeout(connect, 2000);
+}
+connect();
+</script>
+</body></html>
+"""
+
+STATUS_SIZE = (250, 90)
+
+
+def jpeg_params(quality):
+    # Baseline (not progressive or optimized) with 4:2:0 chroma: the cheapest to encode and to decode in hardware
+    return [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_PROGRESSIVE, 0, cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+            cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420]
+
+
+class FrameChannel:
+    """The latest frame of one station, annotated once and encoded once per quality tier.
+
+    publish() runs on the station's pose worker (one at a time per station);
+    wait() and jpeg() run on the event loop, and the annotation and encoding
+    on the encoder threads.
+    """
+
+    def __init__(self, station):
+        self.station = station
+        self.viewers = 0
+        self.version = 0
+        self.due = -float("inf")  # time the next frame may be published
+        self._frame = None  # (version, RGB copy, (33, 4) points or None, status values)
+        self._annotated = (0, None)  # (version, BGR frame)
+        self._jpegs = {}  # quality -> (version, future of the JPEG bytes)
+        self._next = None  # resolved on the loop when a newer frame is published
+        self._lock = threading.Lock()
+        self._skeleton = SkeletonRenderer(landmark_color=(0, 0, 255))
+        self._status = StatusBox(STATUS_SIZE, [
+            (station.counter.exercise.name, (10, 22), 0.6, 1),
+            ("REPS", (10, 45), 0.45, 1),
+            ("FAULTS", (130, 45), 0.45, 1),
+        ], [((10, 80), 1.1, 2), ((130, 80), 1.1, 2)])
+
+    def publish(self, image_rgb, landmarks, values):
+        points = None
+        if landmarks is not None:
+            points = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+            fill_array(landmarks, points)
+        self._frame = (self.version + 1, image_rgb.copy(), points, values)
+        self.version += 1
+
+    def wake(self):
+        if self._next is not None and not self._next.done():
+            self._next.set_result(None)
+        self._next = None
+
+    async def wait(self, version):
+        """Returns once a frame newer than version has been published."""
+        while self.version <= version:
+            if self._next is None:
+                self._next = asyncio.get_running_loop().create_future()
+            # Shared by every waiting viewer, so one giving up must not cancel it
+            await asyncio.shield(self._next)
+
+    async def jpeg(self, quality, executor):
+        """(version, JPEG bytes) of the latest frame, encoding it only if no viewer at this quality has."""
+        frame = self._frame
+        cached = self._jpegs.get(quality)
+        if cached is None or cached[0] != frame[0]:
+            cached = self._jpegs[quality] = (
+                frame[0], asyncio.get_running_loop().run_in_executor(executor, self._encode, frame, quality))
+        return cached[0], await asyncio.shield(cached[1])
+
+    def _encode(self, frame, quality):
+        version, image_rgb, points, values = frame
+        with self._lock:
+            if self._annotated[0] != version:
+                image = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+                if points is not None:
+                    self._skeleton.draw_points(image, points)
+                self._status.draw(image, *values)
+                self._annotated = (version, image)
+            image = self._annotated[1]
+        ok, data = cv2.imencode(".jpg", image, jpeg_params(quality))
+        if not ok:
+            raise ValueError(f"unable to encode a frame of station {self.station.id}")
+        return data.tobytes()
+
+
+class _Viewer:
+    # Quality tier of one stream, stepped by whether its frames go out on time and without skips
+
+    def __init__(self):
+        self.tier = 0
+        self._late = 0
+        self._on_time = 0
+
+    def sent(self, seconds, skipped, budget):
+        if skipped or seconds > budget:
+            self._late += 1
+            self._on_time = 0
+            if self._late >= STEP_DOWN_AFTER and self.tier < len(QUALITIES) - 1:
+                self.tier += 1
+                self._late = 0
+        else:
+            self._on_time += 1
+            self._late = 0
+            if self._on_time >= STEP_UP_AFTER and self.tier > 0:
+                self.tier -= 1
+                self._on_time = 0
+
+
+class _Subscriber:
+    # One WebSocket client's outgoing frames; the oldest are dropped while it is not reading
+
+    def __init__(self):
+        self.pending = collections.deque(maxlen=MAX_PENDING)
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def push(self, frame):
+        self.pending.append(frame)
+        self.ready.set()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+class WebServer:
+    """Serves the stations of a StationServer to browsers; pass on_frame and on_rep to it.
+
+    Both callbacks run on the pose workers: on_frame costs nothing while no
+    one watches the station and a frame copy at most max_fps times a second
+    otherwise, on_rep one JSON encode shared by every WebSocket client.
+    """
+
+    def __init__(self, stations, port=8080, host="127.0.0.1", max_fps=15.0, encoders=2, status_interval=1.0):
+        self.channels = {station.id: FrameChannel(station) for station in stations}
+        self.interval = 1.0 / max_fps
+        self.status_interval = status_interval
+        self._subscribers = set()
+        self._encoder = ThreadPoolExecutor(encoders, thread_name_prefix="jpeg-encoder")
+        self._sock = socket.create_server((host, port))
+        self.address = self._sock.getsockname()[:2]
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="web-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(2.0)
+        else:
+            self._sock.close()
+        self._encoder.shutdown(wait=False)
+
+    def on_frame(self, station, image_rgb, result):
+        """StationServer hook: image_rgb is the worker's buffer, so it is copied here when needed."""
+        channel = self.channels[station.id]
+        if not channel.viewers:
+            return
+        now = time.monotonic()
+        if now < channel.due:
+            return
+        # A fixed schedule rather than an interval since the last frame, so jitter does not halve the rate
+        channel.due = max(channel.due, now - self.interval) + self.interval
+        counter = station.counter
+        channel.publish(image_rgb, result.pose_landmarks.landmark if result.pose_landmarks else None,
+                        (str(counter.reps), str(counter.faults)))
+        self._loop.call_soon_threadsafe(channel.wake)
+
+    def on_rep(self, station):
+        """StationServer hook: pushes the station's summary to every WebSocket client."""
+        message = ws_frame(json.dumps({"type": "rep", **station.summary()}).encode("utf-8"))
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _snapshot(self):
+        stations = [channel.station.summary() for channel in self.channels.values()]
+        return ws_frame(json.dumps({"type": "stations", "stations": stations}).encode("utf-8"))
+
+    def _broadcast(self, message):
+        for subscriber in self._subscribers:
+            subscriber.push(message)
+
+    def _run(self):
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(asyncio.start_server(self._handle, sock=self._sock))
+        status = loop.create_task(self._status_loop())
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            status.cancel()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _status_loop(self):
+        while True:
+            await asyncio.sleep(self.status_interval)
+            if self._subscribers:
+                self._broadcast(self._snapshot())
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+            request, *lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request.split(" ", 2)
+            headers = {}
+            for line in lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            path = target.split("?", 1)[0].rstrip("/") or "/"
+            if method != "GET":
+                await self._respond(writer, "405 Method Not Allowed", "text/plain", b"GET only\n")
+            elif path == "/":
+                await self._respond(writer, "200 OK", "text/html; charset=utf-8", self._page())
+            elif path == "/stations":
+                body = json.dumps([channel.station.summary() for channel in self.channels.values()]).encode()
+                await self._respond(writer, "200 OK", "application/json", body)
+            elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            elif path.startswith("/stream/") and self._channel(path[8:]):
+                await self._stream(writer, self._channel(path[8:]))
+            elif path.startswith("/frame/") and path.endswith(".jpg") and self._channel(path[7:-4]):
+                await self._single(writer, self._channel(path[7:-4]))
+            else:
+                await self._respond(writer, "404 Not Found", "text/plain", b"not found\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError,
+                ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _channel(self, station_id):
+        return self.channels.get(int(station_id)) if station_id.isdigit() else None
+
+    def _page(self):
+        figures = "\n".join(f'<figure><img src="/stream/{i}" alt="station {i}">'
+                            f'<figcaption id="station-{i}">{channel.station.counter.exercise.name}</figcaption>'
+                            f'</figure>' for i, channel in self.channels.items())
+        return PAGE.replace("<!-- stations -->", figures).encode("utf-8")
+
+    async def _respond(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+        await writer.drain()
+
+    async def _stream(self, writer, channel):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WRITE_BUFFER)
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary={BOUNDARY}\r\n"
+                     f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode("ascii"))
+        viewer = _Viewer()
+        loop = asyncio.get_running_loop()
+        channel.viewers += 1
+        try:
+            sent = 0
+            while True:
+                await channel.wait(sent)
+                version, data = await channel.jpeg(QUALITIES[viewer.tier], self._encoder)
+                start = loop.time()
+                writer.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n"
+                             .encode("ascii") + data + b"\r\n")
+                await writer.drain()
+                # Frames published since the last one sent were skipped: this viewer is behind
+                viewer.sent(loop.time() - start, sent and version - sent - 1, self.interval)
+                sent = version
+        finally:
+            channel.viewers -= 1
+
+    async def _single(self, writer, channel):
+        channel.viewers += 1
+        try:
+            await asyncio.wait_for(channel.wait(channel.version), 2.0)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            channel.viewers -= 1
+        if not channel.version:
+            await self._respond(writer, "503 Service Unavailable", "text/plain", b"no frame yet\n")
+            return
+        _, data = await channel.jpeg(QUALITIES[0], self._encoder)
+        await self._respond(writer, "200 OK", "image/jpeg", data)
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._respond(writer, "400 Bad Request", "text/plain", b"missing Sec-WebSocket-Key\n")
+            return
+        writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n".encode("ascii"))
+        subscriber = _Subscriber()
+        subscriber.push(self._snapshot())
+        self._subscribers.add(subscriber)
+        reading = asyncio.ensure_future(self._read_websocket(reader, subscriber))
+        try:
+            while True:
+                await subscriber.ready.wait()
+                subscriber.ready.clear()
+                while subscriber.pending:
+                    writer.write(subscriber.pending.popleft())
+                await writer.drain()
+                if subscriber.closed:
+                    break
+        finally:
+            self._subscribers.discard(subscriber)
+            reading.cancel()
+
+    async def _read_websocket(self, reader, subscriber):
+        # Client frames: answer pings and closes, ignore the rest
+        try:
+            while True:
+                head = await reader.readexactly(2)
+                opcode = head[0] & 0x0F
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                key = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+                payload = ws_mask(await reader.readexactly(length), key)
+                if opcode == 0x8:
+                    subscriber.push(ws_frame(payload[:2], opcode=0x8))
+                    break
+                if opcode == 0x9:
+                    subscriber.push(ws_frame(payload, opcode=0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            subscriber.close()